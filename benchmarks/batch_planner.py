@@ -0,0 +1,87 @@
+"""
+Сравнение планировщиков батчей для запросов к LLM.
+
+Для выборки постов (JSON-файл со списком {post_id, object, content} или
+синтетический корпус) выводит по каждому планировщику количество запросов,
+заполнение бюджета входных токенов и прогноз стоимости.
+
+Запуск:
+    python benchmarks/batch_planner.py [--posts posts.json] [--n-posts 2000]
+        [--model deepseek/deepseek-chat] [--max-input-tokens 30000]
+        [--price-input 0.27] [--price-output 1.1]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.batch_planner import PLANNERS, TokenEstimator
+
+WORDS = ('администрация губернатор область проект строительство жители дорога школа больница '
+         'программа бюджет решение совещание развитие предприятие регион город района поддержка '
+         'сообщил заявил отметил рассказал глава министр депутат company project news').split()
+OBJECTS = ('Скоч Андрей', 'Губернатор области', 'Мэрия города', 'Министерство здравоохранения',
+           'Областная дума', 'Завод', 'Университет', 'Прокуратура')
+
+
+def sample_corpus(n_posts, seed=42):
+    """Синтетический корпус: короткие посты соцсетей и длинные статьи СМИ."""
+    rnd = random.Random(seed)
+    posts = []
+    for i in range(n_posts):
+        n_words = int(rnd.lognormvariate(4.0, 1.0)) + 5
+        posts.append({
+            'post_id': str(100000000 + i),
+            'object': rnd.choice(OBJECTS),
+            'content': ' '.join(rnd.choice(WORDS) for _ in range(min(n_words, 3000))),
+        })
+    return posts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', help='JSON-файл со списком постов')
+    parser.add_argument('--n-posts', type=int, default=2000, help='Размер синтетического корпуса')
+    parser.add_argument('--model', default='deepseek/deepseek-chat-v3-0324:free', help='Модель LLM')
+    parser.add_argument('--encoding', help='Кодировка tiktoken (по умолчанию оценка по символам)')
+    parser.add_argument('--max-input-tokens', type=int, default=30000, help='Бюджет входных токенов на батч')
+    parser.add_argument('--max-output-tokens', type=int, default=8000, help='Бюджет ответа на батч')
+    parser.add_argument('--output-tokens-per-post', type=int, default=220, help='Ожидаемый ответ на пост')
+    parser.add_argument('--prompt-tokens', type=int, default=600, help='Токены инструкций промпта')
+    parser.add_argument('--price-input', type=float, default=0.27, help='Цена за 1 млн входных токенов')
+    parser.add_argument('--price-output', type=float, default=1.1, help='Цена за 1 млн выходных токенов')
+    args = parser.parse_args()
+
+    if args.posts:
+        with open(args.posts, encoding='utf-8') as f:
+            posts = json.load(f)
+    else:
+        posts = sample_corpus(args.n_posts)
+
+    estimator = TokenEstimator(args.model, encoding=args.encoding)
+    print(f"Постов: {len(posts)}, объектов: {len({post.get('object') for post in posts})}")
+    print(f"{'планировщик':<12}{'запросов':>10}{'вход, ток':>12}{'выход, ток':>12}"
+          f"{'заполнение':>12}{'стоимость':>12}{'время, мс':>11}")
+
+    for name, planner_class in PLANNERS.items():
+        planner = planner_class(estimator, max_input_tokens=args.max_input_tokens,
+                                max_output_tokens=args.max_output_tokens,
+                                output_tokens_per_post=args.output_tokens_per_post,
+                                prompt_tokens=args.prompt_tokens)
+        started = time.perf_counter()
+        batches = planner.plan(posts)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        # Все планы оцениваются одним оценщиком токенов
+        plan = planner.describe(batches, args.price_input, args.price_output)
+        assert plan['posts'] == len(posts), f"{name}: потеряны посты"
+        print(f"{name:<12}{plan['requests']:>10}{plan['input_tokens']:>12}{plan['output_tokens']:>12}"
+              f"{plan['fill_ratio']:>12.1%}{plan['cost']:>12.4f}{elapsed:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
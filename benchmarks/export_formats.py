@@ -0,0 +1,102 @@
+"""
+Сравнение форматов выгрузки ExportService: время записи, размер файла и время чтения в pandas.
+
+Синтетические строки выгрузки (с результатами анализа) подаются порциями
+в ExportService.write_chunks - тот же путь, что и при выгрузке из БД,
+но без запросов к базе.
+
+Запуск:
+    python benchmarks/export_formats.py [--n-rows 1000000] [--formats parquet,arrow,csv]
+        [--xlsx-rows 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from services.export_service import ExportService
+
+WORDS = ('администрация губернатор область проект строительство жители дорога школа больница '
+         'программа бюджет решение совещание развитие предприятие регион город района поддержка').split()
+HOSTS = ('vk.com', 't.me', 'ria.ru', 'tass.ru', 'dzen.ru', 'ok.ru')
+
+READERS = {
+    'parquet': pd.read_parquet,
+    'arrow': pd.read_feather,
+    'csv': lambda path: pd.read_csv(path, encoding='utf-8-sig'),
+    'xlsx': pd.read_excel,
+}
+
+
+def synthetic_chunks(n_rows, chunk_size=10000, seed=42):
+    """Порции колонок выгрузки с результатами анализа."""
+    rnd = random.Random(seed)
+    tonalities = ExportService.CATEGORIES['tonality'] + [None]
+    host_types = ExportService.CATEGORIES['blog_host_type']
+    start = datetime(2024, 1, 1)
+
+    for offset in range(0, n_rows, chunk_size):
+        size = min(chunk_size, n_rows - offset)
+        published = [start + timedelta(seconds=rnd.randint(0, 365 * 86400)) for _ in range(size)]
+        text = [' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(10, 60))) for _ in range(size)]
+        yield {
+            'post_id': [str(100000000 + offset + i) for i in range(size)],
+            'title': [value[:60] for value in text],
+            'lmm_title': [value[:40] for value in text],
+            'tonality': [rnd.choice(tonalities) for _ in range(size)],
+            'description': [value[:200] for value in text],
+            'published_on': published,
+            'date': [value.date() for value in published],
+            'time': [value.time() for value in published],
+            'blog_host': [rnd.choice(HOSTS) for _ in range(size)],
+            'blog_host_type': [rnd.choice(host_types) for _ in range(size)],
+            'url': [f"https://{rnd.choice(HOSTS)}/post/{offset + i}" for i in range(size)],
+            'content': text,
+            'object_ids': [str(rnd.randint(1, 20)) for _ in range(size)],
+            'object': ['Губернатор области'] * size,
+            'simhash': [str(rnd.getrandbits(63)) for _ in range(size)],
+            'analyzed_at': published,
+            'model_used': ['deepseek/deepseek-chat'] * size,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n-rows', type=int, default=1000000, help='Количество строк')
+    parser.add_argument('--formats', default='parquet,arrow,csv,xlsx', help='Форматы через запятую')
+    parser.add_argument('--xlsx-rows', type=int, default=100000,
+                        help='Количество строк для xlsx (запись xlsx на порядок медленнее)')
+    args = parser.parse_args()
+
+    columns = ExportService.ANALYSIS_COLUMNS
+    print(f"{'формат':<9}{'строк':>10}{'запись, с':>11}{'строк/с':>11}{'размер, МБ':>12}{'чтение, с':>11}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for export_format in args.formats.split(','):
+            n_rows = min(args.n_rows, args.xlsx_rows) if export_format == 'xlsx' else args.n_rows
+            path = os.path.join(tmp_dir, f"export.{export_format}")
+
+            # Генерация данных не входит в замер записи
+            chunks = list(synthetic_chunks(n_rows))
+            started = time.perf_counter()
+            count = ExportService.write_chunks(iter(chunks), columns, export_format, path)
+            write_time = time.perf_counter() - started
+            del chunks
+
+            started = time.perf_counter()
+            READERS[export_format](path)
+            read_time = time.perf_counter() - started
+
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            print(f"{export_format:<9}{count:>10}{write_time:>11.2f}{count / write_time:>11.0f}"
+                  f"{size_mb:>12.1f}{read_time:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
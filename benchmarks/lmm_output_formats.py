@@ -0,0 +1,170 @@
+"""
+Сравнение текстового и JSON-режима ответа LLM: доля разобранных постов и время разбора.
+
+Фикстуры:
+  - записанные: файлы logs/lmm_debug_*.txt (промпт и ответ, сохраняет LmmService);
+    режим определяется по ответу (JSON-объект или размеченный текст);
+  - синтетические: для одних и тех же батчей строятся текстовый и JSON-ответ
+    с типичными дефектами (искаженная строка post_id, пропуски, обрыв ответа).
+
+Пост считается разобранным, если результат с его post_id содержит тональность.
+
+JSON-ответ, не соответствующий схеме, LmmService не разбирает текстовым
+парсером, а запрашивает батч повторно в текстовом формате. Такие ответы
+считаются отдельно (столбец "повторов"); итоговая доля учитывает разбор
+текстового ответа на тот же батч (синтетический или записанный для тех же
+post_id), а при его отсутствии посты батча считаются неразобранными.
+
+Запуск:
+    python benchmarks/lmm_output_formats.py [--logs logs] [--batches 300] [--repeat 5]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loguru import logger
+
+from services.lmm_parser import parse_response, parse_json_response
+
+PROMPT_SEPARATOR = 'Full prompt:\n'
+RESPONSE_SEPARATOR = '==== LMM Response ===='
+RESPONSE_TEXT_SEPARATOR = 'Full response:\n'
+# Строка идентификатора поста в промпте: компактная [post_id] или прежняя post_id: ...
+POST_ID_PATTERN = re.compile(r'^(?:\[([^\]\n]+)\]|post_id: (.+))$', re.MULTILINE)
+
+TONALITIES = ('негативная', 'нейтральная', 'позитивная')
+DESCRIPTION = 'Администрация области объявила о запуске программы. Жители отнеслись к новости с интересом.'
+
+
+def parse_text_mode(text):
+    """Разбор в текстовом режиме."""
+    return parse_response(text)
+
+
+def parse_json_mode(text):
+    """Разбор в JSON-режиме: None, если ответ не по схеме и батч нужно запросить повторно."""
+    return parse_json_response(text)
+
+
+def load_recorded(logs_dir):
+    """Загружает (режим, post_id промпта, ответ) из файлов диагностики LmmService."""
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(logs_dir, 'lmm_debug_*.txt'))):
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        if PROMPT_SEPARATOR not in text or RESPONSE_TEXT_SEPARATOR not in text:
+            continue
+        prompt = text.split(PROMPT_SEPARATOR, 1)[1].split(RESPONSE_SEPARATOR, 1)[0]
+        response = text.split(RESPONSE_TEXT_SEPARATOR, 1)[1].rstrip('\n')
+        mode = 'json' if response.lstrip().startswith(('{', '```')) else 'text'
+        post_ids = [(compact or legacy).strip() for compact, legacy in POST_ID_PATTERN.findall(prompt)]
+        fixtures.append((mode, post_ids, response))
+    return fixtures
+
+
+def synthetic_fixtures(n_batches, defect_rate, seed=42):
+    """Пары текстовых и JSON-ответов на одни и те же батчи."""
+    rnd = random.Random(seed)
+    fixtures = []
+    for _ in range(n_batches):
+        post_ids = [str(rnd.randint(10**8, 10**9)) for _ in range(rnd.randint(5, 30))]
+        answered = [post_id for post_id in post_ids if rnd.random() > defect_rate / 4]
+
+        # Текст: модель иногда пишет в строке маркера номер поста вместо post_id
+        blocks = []
+        for number, post_id in enumerate(answered, 1):
+            header = post_id
+            if rnd.random() < defect_rate:
+                header = rnd.choice((f"{number} (ID: {post_id})", f"Пост {number}", f"**{post_id}**:"))
+            blocks.append(f"### АНАЛИЗ ПОСТА {header}\nТональность: {rnd.choice(TONALITIES)}\n"
+                          f"Краткое описание: {DESCRIPTION}\nЗаголовок: Новость {number}\n")
+        fixtures.append(('text', post_ids, '\n'.join(blocks)))
+
+        # JSON: иногда в блоке кода, изредка ответ обрывается
+        response = json.dumps({'results': [
+            {'post_id': post_id, 'tonality': rnd.choice(TONALITIES), 'description': DESCRIPTION,
+             'title': f"Новость {number}"}
+            for number, post_id in enumerate(answered, 1)
+        ]}, ensure_ascii=False)
+        if rnd.random() < defect_rate:
+            response = f"```json\n{response}\n```"
+        if rnd.random() < defect_rate / 4:
+            response = response[:len(response) * 2 // 3]
+        fixtures.append(('json', post_ids, response))
+    return fixtures
+
+
+def parsed_post_ids(results):
+    """post_id постов, для которых есть результат с тональностью."""
+    return {result['post_id'] for result in results or () if result.get('tonality')}
+
+
+def evaluate(fixtures, parse, text_replies, repeat):
+    """
+    Возвращает (доля разобранных с первого запроса, итоговая доля, повторных запросов,
+    медианное время разбора в мс).
+
+    Ответ, для которого parse вернул None, требует повторного запроса: вместо
+    него разбирается текстовый ответ из text_replies на тот же батч.
+    """
+    requested = first_parsed = parsed = rerequests = 0
+    for _, post_ids, response in fixtures:
+        results = parse(response)
+        requested += len(post_ids)
+        if results is None:
+            rerequests += 1
+            retry = text_replies.get(tuple(post_ids))
+            results = parse_text_mode(retry) if retry is not None else []
+        else:
+            first_parsed += len(parsed_post_ids(results) & set(post_ids))
+        parsed += len(parsed_post_ids(results) & set(post_ids))
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _, post_ids, response in fixtures:
+            if parse(response) is None and tuple(post_ids) in text_replies:
+                parse_text_mode(text_replies[tuple(post_ids)])
+        timings.append((time.perf_counter() - started) * 1000)
+
+    if not requested:
+        return 0.0, 0.0, rerequests, statistics.median(timings)
+    return first_parsed / requested, parsed / requested, rerequests, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logs', default='logs', help='Каталог с файлами lmm_debug_*.txt')
+    parser.add_argument('--batches', type=int, default=300, help='Количество синтетических батчей')
+    parser.add_argument('--defect-rate', type=float, default=0.1, help='Доля дефектов в синтетических ответах')
+    parser.add_argument('--repeat', type=int, default=5, help='Количество повторов замера времени')
+    args = parser.parse_args()
+
+    logger.remove()
+    parsers = {'text': parse_text_mode, 'json': parse_json_mode}
+    corpora = (('записанные', load_recorded(args.logs)),
+               ('синтетические', synthetic_fixtures(args.batches, args.defect_rate)))
+
+    print(f"{'фикстуры':<15}{'режим':<7}{'ответов':>9}{'с 1-го':>9}{'итого':>9}{'повторов':>10}{'время, мс':>11}")
+    for name, fixtures in corpora:
+        # Текстовые ответы на те же батчи - ответы на повторный запрос в текстовом формате
+        text_replies = {tuple(post_ids): response for mode, post_ids, response in fixtures if mode == 'text'}
+        for mode, parse in parsers.items():
+            mode_fixtures = [fixture for fixture in fixtures if fixture[0] == mode]
+            if not mode_fixtures:
+                print(f"{name:<15}{mode:<7}{0:>9}{'-':>9}{'-':>9}{'-':>10}{'-':>11}")
+                continue
+            first, success, rerequests, elapsed = evaluate(mode_fixtures, parse, text_replies, args.repeat)
+            print(f"{name:<15}{mode:<7}{len(mode_fixtures):>9}{first:>9.1%}{success:>9.1%}"
+                  f"{rerequests:>10}{elapsed:>11.1f}")
+
+if __name__ == '__main__':
+    main()
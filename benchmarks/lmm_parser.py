@@ -0,0 +1,235 @@
+"""
+Микробенчмарк парсера ответов LLM.
+
+Сравнивает однопроходный parse_response с прежним парсером (parse_response_legacy) на
+корпусе записанных ответов (файлы logs/lmm_debug_*.txt, которые сохраняет
+LmmService) и синтетическом корпусе с вариантами меток. Проверяет, что
+результаты обоих парсеров совпадают полностью.
+
+Запуск:
+    python benchmarks/lmm_parser.py [--logs logs] [--synthetic 500] [--repeat 5]
+"""
+import argparse
+import glob
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import traceback
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loguru import logger
+
+from services.lmm_parser import parse_response
+
+RESPONSE_SEPARATOR = 'Full response:\n'
+
+TONALITIES = ('негативная', 'нейтральная', 'позитивная')
+SENTENCES = ('Администрация области объявила о запуске программы.',
+             'Жители района выразили недовольство состоянием дорог.',
+             'Губернатор провел совещание с главами муниципалитетов.',
+             'Эксперты отмечают рост инвестиций в регион.',
+             'Проект вызвал широкий общественный резонанс.')
+
+
+def parse_response_legacy(response_text):
+    """Прежний парсер ответа LMM (последовательный перебор регулярных выражений) - эталон для сравнения."""
+    try:
+        results = []
+
+        # Если ответ пустой или слишком короткий
+        if not response_text or len(response_text) < 50:
+            logger.warning(f"Слишком короткий ответ LMM: {response_text}")
+            return results
+
+        # Проверка на нераспознанные форматы ответов
+        if "### АНАЛИЗ ПОСТА" not in response_text:
+            logger.warning("Ответ не содержит ожидаемого маркера '### АНАЛИЗ ПОСТА'")
+
+            # Попробуем найти альтернативные маркеры
+            alternative_marker = False
+            for marker in ["Пост", "Анализ поста", "Post analysis"]:
+                if marker in response_text:
+                    logger.info(f"Найден альтернативный маркер: {marker}")
+                    alternative_marker = True
+                    break
+
+            if not alternative_marker:
+                logger.error("Не удалось найти маркеры анализа поста в ответе")
+                return results
+
+        # Регулярные выражения для извлечения данных
+        post_blocks = re.split(r'###\s+АНАЛИЗ\s+ПОСТА\s+|Анализ\s+поста\s+|Пост\s+\d+:|Post\s+analysis\s+', response_text)
+
+        # Пропускаем первый элемент, если он пустой (перед первым ###)
+        if post_blocks and not post_blocks[0].strip():
+            post_blocks = post_blocks[1:]
+
+        for block in post_blocks:
+            if not block.strip():
+                continue
+
+            try:
+                # Извлекаем post_id из первой строки разными способами
+                post_id_patterns = [
+                    r'([^\n]+)',  # Любая строка до первого перевода строки
+                    r'(\d+)',     # Любое число
+                    r'post_id:\s*([^\n]+)',  # Явно указанный post_id
+                    r'ID:\s*([^\n]+)'  # Альтернативное указание ID
+                ]
+
+                post_id = "unknown"
+                for pattern in post_id_patterns:
+                    match = re.search(pattern, block.strip())
+                    if match:
+                        post_id = match.group(1).strip()
+                        break
+
+                # Извлекаем тональность разными способами
+                tonality_patterns = [
+                    r'Тональность:\s*([^\n]+)',
+                    r'Тональность\s*[-:]\s*([^\n]+)',
+                    r'Тон[^:]*:\s*([^\n]+)',
+                    r'Sentiment:\s*([^\n]+)'
+                ]
+
+                tonality = ""
+                for pattern in tonality_patterns:
+                    match = re.search(pattern, block)
+                    if match:
+                        tonality = match.group(1).strip()
+                        break
+
+                # Извлекаем краткое описание разными способами
+                description_patterns = [
+                    r'Краткое описание:\s*([^\n]+(?:\n[^\n]+)*?)(?=\nЗаголовок:|$)',
+                    r'Описание:\s*([^\n]+(?:\n[^\n]+)*?)(?=\nЗаголовок:|$)',
+                    r'Краткое содержание:\s*([^\n]+(?:\n[^\n]+)*?)(?=\nЗаголовок:|$)',
+                    r'Description:\s*([^\n]+(?:\n[^\n]+)*?)(?=\nTitle:|$)'
+                ]
+
+                description = ""
+                for pattern in description_patterns:
+                    match = re.search(pattern, block, re.DOTALL)
+                    if match:
+                        description = match.group(1).strip()
+                        break
+
+                # Извлекаем заголовок разными способами
+                title_patterns = [
+                    r'Заголовок:\s*([^\n]+)',
+                    r'Заголовок\s*[-:]\s*([^\n]+)',
+                    r'Тема:\s*([^\n]+)',
+                    r'Title:\s*([^\n]+)'
+                ]
+
+                title = ""
+                for pattern in title_patterns:
+                    match = re.search(pattern, block)
+                    if match:
+                        title = match.group(1).strip()
+                        break
+
+                # Проверяем, что получены хотя бы некоторые данные
+                if any([tonality, description, title]) or post_id != "unknown":
+                    results.append({
+                        "post_id": post_id,
+                        "tonality": tonality,
+                        "description": description,
+                        "title": title
+                    })
+                else:
+                    logger.warning(f"Не удалось извлечь данные из блока: {block[:100]}...")
+
+            except Exception as e:
+                logger.error(f"Ошибка при парсинге блока ответа: {e}")
+                logger.error(f"Содержимое блока: {block[:200]}...")
+                logger.error(traceback.format_exc())
+
+        return results
+    except Exception as e:
+        logger.error(f"Ошибка при парсинге ответа LMM: {e}")
+        logger.error(traceback.format_exc())
+        return []
+
+
+def load_recorded(logs_dir):
+    """Загружает ответы модели из файлов диагностики LmmService."""
+    responses = []
+    for path in sorted(glob.glob(os.path.join(logs_dir, 'lmm_debug_*.txt'))):
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        if RESPONSE_SEPARATOR in text:
+            responses.append(text.split(RESPONSE_SEPARATOR, 1)[1].rstrip('\n'))
+    return responses
+
+
+def synthetic_response(rnd, n_posts=20):
+    """Ответ модели в ожидаемом формате с типичными отклонениями."""
+    parts = [rnd.choice(('', 'Вот результаты анализа:\n\n'))]
+    for i in range(n_posts):
+        post_id = str(rnd.randint(10**8, 10**9))
+        marker = rnd.choices(('### АНАЛИЗ ПОСТА ', '###  АНАЛИЗ ПОСТА ', 'Анализ поста ', 'Post analysis '),
+                             weights=(90, 4, 4, 2))[0]
+        tonality_label = rnd.choices(('Тональность:', 'Тональность -', 'Тон текста:', 'Sentiment:'),
+                                     weights=(90, 4, 4, 2))[0]
+        description_label = rnd.choices(('Краткое описание:', 'Описание:', 'Краткое содержание:'),
+                                        weights=(90, 5, 5))[0]
+        title_label = rnd.choices(('Заголовок:', 'Заголовок -', 'Тема:'), weights=(90, 5, 5))[0]
+        description = '\n'.join(' '.join(rnd.sample(SENTENCES, 3)) for _ in range(rnd.choice((1, 1, 2))))
+
+        block = f"{marker}{post_id}\n{tonality_label} {rnd.choice(TONALITIES)}\n"
+        block += f"{description_label} {description}\n"
+        # Иногда модель пропускает поле или добавляет пустую строку
+        if rnd.random() > 0.03:
+            block += f"{title_label} Заголовок поста {i}\n"
+        parts.append(block + rnd.choice(('\n', '\n\n', '')))
+    return ''.join(parts)
+
+
+def measure(parser, corpus, repeat):
+    """Медианное время разбора всего корпуса в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in corpus:
+            parser(text)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logs', default='logs', help='Каталог с файлами lmm_debug_*.txt')
+    parser.add_argument('--synthetic', type=int, default=500, help='Количество синтетических ответов')
+    parser.add_argument('--repeat', type=int, default=5, help='Количество повторов замера')
+    args = parser.parse_args()
+
+    logger.remove()
+    rnd = random.Random(42)
+    recorded = load_recorded(args.logs)
+    synthetic = [synthetic_response(rnd) for _ in range(args.synthetic)]
+
+    for name, corpus in (('записанные', recorded), ('синтетические', synthetic)):
+        if not corpus:
+            print(f"{name}: нет ответов (LmmService сохраняет ответы модели в {args.logs}/lmm_debug_*.txt)")
+            continue
+
+        mismatches = [i for i, text in enumerate(corpus) if parse_response(text) != parse_response_legacy(text)]
+        legacy_ms = measure(parse_response_legacy, corpus, args.repeat)
+        new_ms = measure(parse_response, corpus, args.repeat)
+        blocks = sum(len(parse_response(text)) for text in corpus)
+
+        print(f"{name}: {len(corpus)} ответов, {blocks} блоков, расхождений: {len(mismatches)}")
+        print(f"  прежний парсер:      {legacy_ms:10.1f} мс")
+        print(f"  однопроходный парсер:{new_ms:10.1f} мс  (x{legacy_ms / new_ms:.1f})")
+        if mismatches:
+            print(f"  ответы с расхождениями: {mismatches[:20]}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
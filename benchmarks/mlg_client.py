@@ -0,0 +1,63 @@
+"""
+Замер времени создания клиента API Медиалогии.
+
+Измеряет три случая:
+  - холодный старт: пустой дисковый кэш, WSDL/XSD загружаются по сети;
+  - новый процесс: дисковый кэш заполнен, WSDL разбирается без сети;
+  - повторный вызов: клиент берется из кэша процесса.
+
+Запуск:
+    python benchmarks/mlg_client.py <WSDL_URL> [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.mlg_service import get_mlg_client, reset_mlg_clients
+
+
+def measure(build, repeat):
+    """Возвращает медианное время вызова build() в секундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        build()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('wsdl', help='URL WSDL API Медиалогии')
+    parser.add_argument('--repeat', type=int, default=5, help='Количество повторов каждого замера')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        def cold():
+            reset_mlg_clients()
+            cache_path = os.path.join(tmp_dir, f'cold_{time.monotonic_ns()}.db')
+            get_mlg_client(args.wsdl, cache_path=cache_path)
+
+        cache_path = os.path.join(tmp_dir, 'warm.db')
+        reset_mlg_clients()
+        get_mlg_client(args.wsdl, cache_path=cache_path)
+
+        def disk_warm():
+            reset_mlg_clients()
+            get_mlg_client(args.wsdl, cache_path=cache_path)
+
+        def process_warm():
+            get_mlg_client(args.wsdl, cache_path=cache_path)
+
+        print(f"Холодный старт (сеть):         {measure(cold, args.repeat) * 1000:10.1f} мс")
+        print(f"Новый процесс (дисковый кэш):  {measure(disk_warm, args.repeat) * 1000:10.1f} мс")
+        print(f"Повторный вызов (кэш процесса):{measure(process_warm, args.repeat) * 1000:10.3f} мс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Отчет о размере промптов анализа: прежний формат против системного префикса
+и компактной кодировки постов.
+
+Батчи строятся планировщиком батчей на выборке постов (JSON-файл со списком
+{post_id, object, content} или синтетический корпус). Для каждого формата
+выводятся символы и оценка токенов на батч; для нового формата отдельно -
+неизменный системный префикс, который провайдер может кэшировать.
+
+Запуск:
+    python benchmarks/prompt_size.py [--posts posts.json] [--n-posts 2000]
+        [--model deepseek/deepseek-chat] [--output-format text]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.batch_planner import BinPackingBatchPlanner, TokenEstimator
+from services.lmm_prompt import INSTRUCTIONS, TEXT_FORMAT_INSTRUCTIONS, build_posts_prompt, build_system_prompt
+from batch_planner import sample_corpus
+
+
+def legacy_prompt(batch):
+    """Промпт в прежнем формате: инструкции и разметка каждого поста в одном сообщении."""
+    prompt = INSTRUCTIONS + TEXT_FORMAT_INSTRUCTIONS + "\nАнализируемые посты:\n"
+
+    object_groups = {}
+    for post in batch:
+        object_groups.setdefault(post.get('object', 'неизвестно'), []).append(post)
+
+    post_counter = 1
+    for obj, posts in object_groups.items():
+        prompt += f"\n--- Группа постов о '{obj}' ---\n"
+        for post in posts:
+            prompt += f"\n--- Пост {post_counter} (ID: {post.get('post_id', '')}) ---\n"
+            prompt += f"post_id: {post.get('post_id', '')}\n"
+            prompt += f"object: {obj}\n"
+            content = post.get('content', '').strip() or "Контент отсутствует"
+            prompt += f"content: {content}\n"
+            post_counter += 1
+    return prompt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', help='JSON-файл со списком постов')
+    parser.add_argument('--n-posts', type=int, default=2000, help='Размер синтетического корпуса')
+    parser.add_argument('--model', default='deepseek/deepseek-chat-v3-0324:free', help='Модель LLM')
+    parser.add_argument('--encoding', help='Кодировка tiktoken (по умолчанию оценка по символам)')
+    parser.add_argument('--output-format', default='text', choices=('text', 'json'), help='Формат ответа')
+    parser.add_argument('--max-input-tokens', type=int, default=30000, help='Бюджет входных токенов на батч')
+    args = parser.parse_args()
+
+    if args.posts:
+        with open(args.posts, encoding='utf-8') as f:
+            posts = json.load(f)
+    else:
+        posts = sample_corpus(args.n_posts)
+
+    estimator = TokenEstimator(args.model, encoding=args.encoding)
+    system_prompt = build_system_prompt(args.output_format)
+    planner = BinPackingBatchPlanner(estimator, max_input_tokens=args.max_input_tokens,
+                                     prompt_tokens=estimator.count(system_prompt))
+    batches = planner.plan(posts)
+
+    prefix_chars, prefix_tokens = len(system_prompt), estimator.count(system_prompt)
+    legacy_chars, legacy_tokens, new_chars, new_tokens = [], [], [], []
+    legacy_time = new_time = 0.0
+    for batch in batches:
+        started = time.perf_counter()
+        old = legacy_prompt(batch)
+        legacy_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        new = build_posts_prompt(batch)
+        new_time += time.perf_counter() - started
+
+        legacy_chars.append(len(old))
+        legacy_tokens.append(estimator.count(old))
+        new_chars.append(prefix_chars + len(new))
+        new_tokens.append(prefix_tokens + estimator.count(new))
+
+    def per_batch(values):
+        return statistics.mean(values) if values else 0
+
+    print(f"Постов: {len(posts)}, батчей: {len(batches)}")
+    print(f"Системный префикс (кэшируемый): {prefix_chars} символов, ~{prefix_tokens} токенов")
+    print(f"{'формат':<12}{'символов/батч':>15}{'токенов/батч':>14}{'сборка, мс':>12}")
+    print(f"{'прежний':<12}{per_batch(legacy_chars):>15.0f}{per_batch(legacy_tokens):>14.0f}{legacy_time * 1000:>12.1f}")
+    print(f"{'компактный':<12}{per_batch(new_chars):>15.0f}{per_batch(new_tokens):>14.0f}{new_time * 1000:>12.1f}")
+
+    saved_chars = per_batch(legacy_chars) - per_batch(new_chars)
+    saved_tokens = per_batch(legacy_tokens) - per_batch(new_tokens)
+    print(f"Экономия на батч: {saved_chars:.0f} символов ({saved_chars / per_batch(legacy_chars):.1%}), "
+          f"~{saved_tokens:.0f} токенов ({saved_tokens / per_batch(legacy_tokens):.1%})")
+    print(f"Кэшируемый префикс: ~{prefix_tokens} токенов на батч "
+          f"({prefix_tokens / per_batch(new_tokens):.1%} входа компактного промпта)")
+
+
+if __name__ == '__main__':
+    main()
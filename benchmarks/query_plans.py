@@ -0,0 +1,158 @@
+"""
+Проверка планов запросов PostFilter: каждое сочетание фильтров должно читать таблицы по индексам.
+
+Для всех сочетаний фильтров (поисковая строка, тональность, объект, период)
+строится EXPLAIN страницы списка постов и выгрузки с результатами анализа.
+SQLite: строка плана "SCAN <таблица>" без индекса считается ошибкой.
+PostgreSQL: план строится с enable_seqscan = off, поэтому "Seq Scan"
+в плане означает, что подходящего индекса нет.
+
+На синтетической БД SQLite планы проверяются тестами (tests/test_query_plans.py);
+скрипт нужен для проверки существующей БД, в том числе PostgreSQL
+(--database-url, БД не изменяется). Без --database-url создается
+временная БД SQLite с синтетическими постами.
+
+Запуск:
+    python benchmarks/query_plans.py [--database-url postgresql://...] [--n-posts 20000] [--verbose]
+
+Код возврата 1, если хотя бы один план читает таблицу целиком.
+"""
+import argparse
+import itertools
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from config import Config
+from models.database import db
+from models.post_model import Post
+from models.analysis_model import PostAnalysis, TonalityType
+from models.object_model import Object, post_objects
+from services.post_filter import PostFilter
+from services.search_service import SearchService
+
+WORDS = ('администрация губернатор область проект строительство жители дорога школа больница '
+         'программа бюджет решение совещание развитие предприятие регион город района поддержка').split()
+
+# Полный просмотр таблицы в плане (подзапросы и виртуальные таблицы FTS не учитываются)
+CHECKED_TABLES = {Post.__tablename__, PostAnalysis.__tablename__, Object.__tablename__, post_objects.name}
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(\w+)(?!.*\bUSING\b)(?!.*\bVIRTUAL TABLE\b)'),
+    'postgresql': re.compile(r'\bSeq Scan on (\w+)'),
+}
+
+def make_app(database_url):
+    """Минимальное приложение Flask для работы с БД."""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    db.init_app(app)
+    return app
+
+def seed(n_posts, seed_value=42):
+    """Синтетические посты, результаты анализа и связи с объектами."""
+    rnd = random.Random(seed_value)
+    db.create_all()
+    PostFilter.ensure_indexes()
+    SearchService().ensure_index()
+
+    objects = [Object(object_id=str(9000 + i), name=f'Объект {i}') for i in range(20)]
+    db.session.add_all(objects)
+    db.session.commit()
+
+    start = datetime(2024, 1, 1)
+    db.session.execute(Post.__table__.insert(), [{
+        'post_id': str(100000000 + i),
+        'title': ' '.join(rnd.choices(WORDS, k=6)),
+        'content': ' '.join(rnd.choices(WORDS, k=80)),
+        'published_on': start + timedelta(seconds=rnd.randint(0, 365 * 86400)),
+        'object_ids': objects[i % len(objects)].object_id,
+    } for i in range(n_posts)])
+    db.session.execute(post_objects.insert(), [
+        {'post_id': i + 1, 'object_id': objects[i % len(objects)].id} for i in range(n_posts)
+    ])
+    db.session.execute(PostAnalysis.__table__.insert(), [
+        {'post_id': i + 1, 'tonality': rnd.choice(list(TonalityType)).name, 'lmm_title': 'заголовок'}
+        for i in range(0, n_posts, 2)
+    ])
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+
+def explain(query):
+    """Строки плана запроса в текущей БД."""
+    dialect = db.engine.dialect
+    sql = str(query.statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    if dialect.name == 'sqlite':
+        return [row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}'))]
+
+    db.session.execute(db.text('SET LOCAL enable_seqscan = off'))
+    plan = [row[0] for row in db.session.execute(db.text(f'EXPLAIN {sql}'))]
+    db.session.rollback()
+    return plan
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='Проверяемая БД (по умолчанию - временная SQLite)')
+    parser.add_argument('--n-posts', type=int, default=20000, help='Количество синтетических постов')
+    parser.add_argument('--verbose', action='store_true', help='Печатать планы всех запросов')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tmp_dir.name, 'query_plans.db')
+    app = make_app(database_url)
+
+    failures = 0
+    with app.app_context():
+        if not args.database_url:
+            seed(args.n_posts)
+
+        full_scan = FULL_SCAN_PATTERNS[db.engine.dialect.name]
+        object_id = db.session.query(Object.object_id).order_by(Object.id).limit(1).scalar()
+        values = {
+            'search_query': 'губернатор',
+            'tonality': TonalityType.NEGATIVE.name,
+            'object_id': object_id,
+            'period': ('2024-03-01', '2024-03-31'),
+        }
+
+        post_filter = PostFilter()
+        for include_analysis, *enabled in itertools.product((False, True), repeat=5):
+            params = {'search_query': '', 'tonality': '', 'object_id': '', 'date_from': '', 'date_to': ''}
+            names = []
+            for name, on in zip(values, enabled):
+                if not on:
+                    continue
+                names.append(name)
+                if name == 'period':
+                    params['date_from'], params['date_to'] = values[name]
+                else:
+                    params[name] = values[name]
+
+            query = post_filter.build_query(params, include_analysis=include_analysis).limit(20)
+            plan = explain(query)
+            scans = sorted({
+                match.group(1) for line in plan for match in [full_scan.search(line)]
+                if match and match.group(1) in CHECKED_TABLES
+            })
+
+            label = f"{'выгрузка' if include_analysis else 'список'}: {', '.join(names) or 'без фильтров'}"
+            print(f"{'ОШИБКА' if scans else 'ok':<7}{label}" + (f" - полный просмотр {', '.join(scans)}" if scans else ''))
+            if scans or args.verbose:
+                for line in plan:
+                    print(f"{'':<9}{line}")
+            failures += bool(scans)
+
+    tmp_dir.cleanup()
+    print(f"Планов с полным просмотром таблиц: {failures}")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Сравнение прежней очистки текста (clean_html_and_emoji) с модулем utils.text_cleaning.
+
+На синтетическом корпусе русскоязычных постов с HTML-разметкой, эмодзи и
+лишними пробелами замеряются: прежняя функция (выражение эмодзи
+компилируется при каждом вызове, три прохода re.sub), clean_text по одному
+тексту, пакетные clean_texts и clean_series, а также векторные операции
+pandas .str и очистка одной склеенной строки - для сравнения. Результаты
+сверяются с прежней функцией.
+
+Запуск:
+    python benchmarks/text_cleaning.py [--n-posts 100000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from utils.text_cleaning import HTML_TAG_PATTERN, EMOJI_PATTERN, clean_text, clean_texts, clean_series
+
+WORDS = ('администрация губернатор область проект строительство жители дорога школа больница '
+         'программа бюджет решение совещание развитие предприятие регион город района поддержка '
+         'сообщил заявил отметил рассказал глава министр депутат').split()
+MARKUP = ('<p>', '</p>', '<br>', '<b>', '</b>', '<a href="https://example.ru/news">', '</a>',
+          '😀', '🔥', '👍🏻', '✅', '🇷🇺', '  ', '\n', '\t', '&nbsp;')
+
+
+def legacy_clean_html_and_emoji(text):
+    """Прежняя реализация clean_html_and_emoji."""
+    if text is None:
+        return ""
+
+    text = re.sub(r'<[^>]+>', '', text)
+
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F600-\U0001F64F"
+        "\U0001F300-\U0001F5FF"
+        "\U0001F680-\U0001F6FF"
+        "\U0001F700-\U0001F77F"
+        "\U0001F780-\U0001F7FF"
+        "\U0001F800-\U0001F8FF"
+        "\U0001F900-\U0001F9FF"
+        "\U0001FA00-\U0001FA6F"
+        "\U0001FA70-\U0001FAFF"
+        "\U00002702-\U000027B0"
+        "\U000024C2-\U0001F251"
+        "]+", flags=re.UNICODE)
+
+    text = emoji_pattern.sub(r'', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def pandas_str_clean(series):
+    """Очистка векторными операциями pandas .str."""
+    return (series.fillna('')
+            .str.replace(HTML_TAG_PATTERN, '', regex=True)
+            .str.replace(EMOJI_PATTERN, '', regex=True)
+            .str.replace(r'\s+', ' ', regex=True)
+            .str.strip())
+
+
+def joined_clean(posts):
+    """Очистка одной строкой: тексты склеиваются через \\x00 и разделяются после очистки."""
+    joined = '\x00'.join(post or '' for post in posts)
+    joined = re.sub(r'<[^>\x00]+>', '', joined)
+    joined = EMOJI_PATTERN.sub('', joined)
+    joined = ' '.join(joined.split()).replace(' \x00', '\x00').replace('\x00 ', '\x00')
+    return joined.split('\x00')
+
+
+def sample_posts(n_posts, seed=42):
+    """Синтетические посты: текст из русских слов с вкраплениями разметки и эмодзи."""
+    rnd = random.Random(seed)
+    posts = []
+    for _ in range(n_posts):
+        n_words = int(rnd.lognormvariate(3.5, 0.9)) + 3
+        parts = []
+        for _ in range(min(n_words, 1500)):
+            parts.append(rnd.choice(WORDS))
+            if rnd.random() < 0.08:
+                parts.append(rnd.choice(MARKUP))
+        posts.append(None if rnd.random() < 0.01 else ' '.join(parts))
+    return posts
+
+
+def measure(func, repeat):
+    """Медианное время вызова в мс и результат последнего вызова."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n-posts', type=int, default=100000, help='Размер синтетического корпуса')
+    parser.add_argument('--repeat', type=int, default=3, help='Количество повторов замера')
+    args = parser.parse_args()
+
+    posts = sample_posts(args.n_posts)
+    series = pd.Series(posts, dtype=object)
+    print(f"Постов: {len(posts)}, символов: {sum(len(post) for post in posts if post)}")
+
+    variants = (
+        ('прежняя', lambda: [legacy_clean_html_and_emoji(post) for post in posts]),
+        ('clean_text', lambda: [clean_text(post) for post in posts]),
+        ('clean_texts', lambda: clean_texts(posts)),
+        ('clean_series', lambda: clean_series(series).tolist()),
+        ('pandas .str', lambda: pandas_str_clean(series).tolist()),
+        ('одна строка', lambda: joined_clean(posts)),
+    )
+
+    expected = None
+    baseline = None
+    print(f"{'вариант':<14}{'время, мс':>11}{'ускорение':>11}{'совпадает':>11}")
+    for name, func in variants:
+        elapsed, result = measure(func, args.repeat)
+        if expected is None:
+            expected, baseline = result, elapsed
+        print(f"{name:<14}{elapsed:>11.1f}{baseline / elapsed:>10.2f}x{str(result == expected):>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,28 @@ def make_celery(app):
     )
     celery.conf.update(app.config)
     
+    beat_schedule = {}
+    
+    # Периодическая инкрементальная синхронизация отчета Медиалогии
+    sync_interval = app.config.get('MEDIALOGIA_SYNC_INTERVAL')
+    if sync_interval and app.config.get('MEDIALOGIA_REPORT_ID'):
+        beat_schedule['sync-medialogia-report'] = {
+            'task': 'sync_report_task',
+            'schedule': sync_interval * 60,
+            'args': (app.config['MEDIALOGIA_REPORT_ID'],),
+        }
+    
+    # Периодическое удаление устаревших файлов выгрузок
+    cleanup_interval = app.config.get('EXPORT_CLEANUP_INTERVAL')
+    if cleanup_interval:
+        beat_schedule['cleanup-exports'] = {
+            'task': 'cleanup_exports_task',
+            'schedule': cleanup_interval * 60,
+        }
+    
+    if beat_schedule:
+        celery.conf.beat_schedule = beat_schedule
+    
     class ContextTask(celery.Task):
         def __call__(self, *args, **kwargs):
             with app.app_context():
@@ -41,5 +63,7 @@ def init_celery(app):
     
     # Импортируем задачи, чтобы Celery о них знал
     import services.lmm_service
+    import services.ingestion_service
+    import services.export_service
     
     return celery
\ No newline at end of file
@@ -28,10 +28,61 @@ class Config:
     MEDIALOGIA_PASSWORD = os.environ.get('MEDIALOGIA_PASSWORD')
     MEDIALOGIA_WSDL_URL = os.environ.get('MEDIALOGIA_WSDL_URL')
     MEDIALOGIA_REPORT_ID = os.environ.get('MEDIALOGIA_REPORT_ID')
+    # Дисковый кэш WSDL/XSD Медиалогии (время жизни в секундах, пусто - без ограничения)
+    MEDIALOGIA_WSDL_CACHE = os.environ.get('MEDIALOGIA_WSDL_CACHE') or os.path.join(
+        os.environ.get('DATA_DIRECTORY') or 'data', 'wsdl_cache.db')
+    MEDIALOGIA_WSDL_CACHE_TIMEOUT = int(os.environ['MEDIALOGIA_WSDL_CACHE_TIMEOUT']) \
+        if os.environ.get('MEDIALOGIA_WSDL_CACHE_TIMEOUT') else None
+    
+    # Настройки загрузки постов из Медиалогии
+    MEDIALOGIA_FETCH_WORKERS = int(os.environ.get('MEDIALOGIA_FETCH_WORKERS', 4))
+    MEDIALOGIA_SLICE_MAX_POSTS = int(os.environ.get('MEDIALOGIA_SLICE_MAX_POSTS', 2000))
+    MEDIALOGIA_SYNC_LOOKBACK_HOURS = int(os.environ.get('MEDIALOGIA_SYNC_LOOKBACK_HOURS', 24))
+    MEDIALOGIA_SYNC_OVERLAP_MINUTES = int(os.environ.get('MEDIALOGIA_SYNC_OVERLAP_MINUTES', 10))
+    # Интервал периодической синхронизации отчета MEDIALOGIA_REPORT_ID в минутах (0 - отключена)
+    MEDIALOGIA_SYNC_INTERVAL = int(os.environ.get('MEDIALOGIA_SYNC_INTERVAL', 0))
     
     # Настройки OpenRouter API для LLM
     OPENROUTER_API_KEY = os.environ.get('OPENROUTER_API_KEY')
     LMM_MODEL = os.environ.get('LMM_MODEL', 'deepseek/deepseek-chat-v3-0324:free')
+    # Максимальное расстояние Хэмминга simhash для почти-дубликатов (-1 - отключить)
+    LMM_SIMHASH_DISTANCE = int(os.environ.get('LMM_SIMHASH_DISTANCE', 3))
+    # Постоянный кэш результатов LLM: redis://... или sqlite:///path (время жизни в секундах)
+    LMM_CACHE_URL = os.environ.get('LMM_CACHE_URL') or 'sqlite:///' + os.path.join(
+        os.environ.get('DATA_DIRECTORY') or 'data', 'lmm_cache.db')
+    LMM_CACHE_TTL = int(os.environ.get('LMM_CACHE_TTL', 30 * 24 * 3600))
+    LMM_CACHE_MAX_ENTRIES = int(os.environ.get('LMM_CACHE_MAX_ENTRIES', 100000))
+    # Количество одновременных запросов к LLM в одном воркере (1 - по одному батчу на задачу)
+    LMM_CONCURRENCY = int(os.environ.get('LMM_CONCURRENCY', 1))
+    # Лимит запросов в минуту на API ключ в одном процессе (0 - без ограничения)
+    LMM_REQUESTS_PER_MINUTE = int(os.environ.get('LMM_REQUESTS_PER_MINUTE', 0))
+    # Сколько раз посты, пропущенные моделью, отправляются повторно (затем - в analysis_failures)
+    LMM_MAX_RETRY_DEPTH = int(os.environ.get('LMM_MAX_RETRY_DEPTH', 2))
+    # Потоковый режим ответа LLM: результаты сохраняются по мере получения блоков
+    LMM_STREAMING = os.environ.get('LMM_STREAMING', 'False') == 'True'
+    # Формат ответа LLM: text (размеченный текст) или json (ответ по JSON-схеме)
+    LMM_OUTPUT_FORMAT = os.environ.get('LMM_OUTPUT_FORMAT', 'text')
+    # Планировщик батчей: binpack (упаковка по токенам) или greedy (прежний алгоритм)
+    LMM_BATCH_PLANNER = os.environ.get('LMM_BATCH_PLANNER', 'binpack')
+    # Кодировка tiktoken для точного подсчета токенов (если не задана - оценка по символам)
+    LMM_TOKENIZER_ENCODING = os.environ.get('LMM_TOKENIZER_ENCODING')
+    # Бюджет ответа модели на батч и ожидаемая длина ответа на один пост (в токенах)
+    LMM_MAX_OUTPUT_TOKENS = int(os.environ.get('LMM_MAX_OUTPUT_TOKENS', 8000))
+    LMM_OUTPUT_TOKENS_PER_POST = int(os.environ.get('LMM_OUTPUT_TOKENS_PER_POST', 220))
+    # Бюджет токенов на текст одного поста: длинные тексты обрезаются вокруг упоминаний объекта (0 - без обрезки)
+    LMM_MAX_POST_TOKENS = int(os.environ.get('LMM_MAX_POST_TOKENS', 2000))
+    # Цена за 1 млн входных и выходных токенов (для прогноза стоимости)
+    LMM_PRICE_INPUT = float(os.environ.get('LMM_PRICE_INPUT', 0))
+    LMM_PRICE_OUTPUT = float(os.environ.get('LMM_PRICE_OUTPUT', 0))
+    
+    # Полнотекстовый поиск по постам: конфигурация текстового поиска PostgreSQL (стемминг)
+    SEARCH_LANGUAGE = os.environ.get('SEARCH_LANGUAGE', 'russian')
+    
+    # Список постов: предельный размер страницы; общее количество по фильтру
+    # кэшируется на POSTS_COUNT_CACHE_TTL секунд (0 - не подсчитывается) и считается до POSTS_COUNT_LIMIT (0 - без предела)
+    POSTS_PER_PAGE_MAX = int(os.environ.get('POSTS_PER_PAGE_MAX', 100))
+    POSTS_COUNT_CACHE_TTL = int(os.environ.get('POSTS_COUNT_CACHE_TTL', 300))
+    POSTS_COUNT_LIMIT = int(os.environ.get('POSTS_COUNT_LIMIT', 10000))
     
     # Настройки Celery для асинхронных задач
     CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL') or 'redis://localhost:6379/0'
@@ -40,6 +91,13 @@ class Config:
     # Директории для хранения данных
     DATA_DIRECTORY = os.environ.get('DATA_DIRECTORY') or 'data'
     EXPORT_DIRECTORY = os.path.join(DATA_DIRECTORY, 'exports')
+    # Количество строк, загружаемых из БД за один раз при потоковом экспорте
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))
+    # Хранение файлов выгрузок: часы с последнего обращения и предельный суммарный размер в МБ
+    EXPORT_RETENTION_HOURS = int(os.environ.get('EXPORT_RETENTION_HOURS', 24))
+    EXPORT_MAX_TOTAL_MB = int(os.environ.get('EXPORT_MAX_TOTAL_MB', 1024))
+    # Интервал периодической очистки файлов выгрузок в минутах (0 - только после каждой выгрузки)
+    EXPORT_CLEANUP_INTERVAL = int(os.environ.get('EXPORT_CLEANUP_INTERVAL', 60))
     
     # Создаем директории, если они не существуют
     @staticmethod
@@ -1,4 +1,5 @@
 import os
+import click
 from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, send_file
 from flask_login import LoginManager, login_required, current_user, login_user, logout_user
 from werkzeug.utils import secure_filename
@@ -12,10 +13,13 @@ from models.database import db, migrate
 from models.user_model import User
 from models.post_model import Post, BlogHostType
 from routes.auth import auth_bp
-from routes.posts import posts_bp
+from routes.post import posts_bp
 from routes.export import export_bp
 from services.mlg_service import MlgService
 from services.lmm_service import LmmService
+from services.object_service import ObjectService
+from services.search_service import SearchService
+from services.post_filter import PostFilter
 from utils.auth import load_user
 from celery_app import init_celery
 
@@ -42,6 +46,28 @@ def create_app(config_class=Config):
     app.register_blueprint(posts_bp, url_prefix='/posts')
     app.register_blueprint(export_bp, url_prefix='/export')
     
+    # Разовое заполнение таблицы post_objects по полю posts.object_ids
+    @app.cli.command('backfill-post-objects')
+    def backfill_post_objects():
+        """Заполняет связи постов с объектами для фильтрации по объекту."""
+        stats = ObjectService().backfill_post_objects()
+        print(f"Обработано постов: {stats['posts']}, связей: {stats['links']}")
+    
+    # Создание или пересоздание полнотекстового индекса постов
+    @app.cli.command('init-search-index')
+    @click.option('--rebuild', is_flag=True, help='Пересоздать индекс')
+    def init_search_index(rebuild):
+        """Создает полнотекстовый индекс для поиска по постам."""
+        ready = SearchService().ensure_index(rebuild=rebuild)
+        print('Индекс готов' if ready else 'Индекс не создан, поиск выполняется через ILIKE')
+    
+    # Создание индексов фильтрации постов в существующей БД
+    @app.cli.command('create-indexes')
+    def create_indexes():
+        """Создает недостающие индексы для фильтров списка постов и выгрузки."""
+        PostFilter.ensure_indexes()
+        print('Индексы созданы')
+    
     # Обработчик корневого маршрута
     @app.route('/')
     def index():
@@ -76,6 +102,8 @@ def init_db(app):
     """Инициализация базы данных."""
     with app.app_context():
         db.create_all()
+        PostFilter.ensure_indexes()
+        SearchService().ensure_index()
         # Создаем тестового пользователя, если его нет
         if not User.query.filter_by(username='admin').first():
             admin = User(username='admin', email='admin@example.com', is_admin=True)
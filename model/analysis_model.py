@@ -26,6 +26,11 @@ class PostAnalysis(db.Model):
     analyzed_at = db.Column(db.DateTime, default=datetime.utcnow)
     model_used = db.Column(db.String(255), nullable=True)
     
+    # Фильтр постов по тональности
+    __table_args__ = (
+        db.Index('ix_post_analyses_tonality_post_id', 'tonality', 'post_id'),
+    )
+    
     def __repr__(self):
         return f'<PostAnalysis for post_id={self.post_id}>'
     
@@ -39,4 +44,37 @@ class PostAnalysis(db.Model):
             'description': self.description,
             'analyzed_at': self.analyzed_at.isoformat() if self.analyzed_at else None,
             'model_used': self.model_used,
-        }
\ No newline at end of file
+        }
+
+class AnalysisFailure(db.Model):
+    """Модель поста, который модель так и не проанализировала (dead-letter)."""
+    __tablename__ = 'analysis_failures'
+
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.String(128), unique=True, nullable=False, index=True)
+    object_name = db.Column(db.String(255), nullable=True)
+
+    # Причина и количество неудачных попыток
+    reason = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, default=1)
+    model_used = db.Column(db.String(255), nullable=True)
+
+    # Метаданные
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AnalysisFailure for post_id={self.post_id}>'
+
+    def to_dict(self):
+        """Преобразует запись в словарь."""
+        return {
+            'id': self.id,
+            'post_id': self.post_id,
+            'object_name': self.object_name,
+            'reason': self.reason,
+            'attempts': self.attempts,
+            'model_used': self.model_used,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -0,0 +1,57 @@
+from datetime import datetime
+import enum
+from sqlalchemy import Enum
+
+from models.database import db
+
+class ExportStatus(enum.Enum):
+    PENDING = 'ожидает'
+    RUNNING = 'выполняется'
+    DONE = 'завершен'
+    FAILED = 'ошибка'
+    EXPIRED = 'удален'
+
+class ExportJob(db.Model):
+    """Модель фоновой выгрузки постов и ее файла."""
+    __tablename__ = 'export_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Хэш параметров фильтра, формата и версии данных: одинаковые выгрузки используют один файл
+    key = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    params = db.Column(db.Text, nullable=False)
+    export_format = db.Column(db.String(8), nullable=False, default='xlsx')
+
+    # Состояние выполнения
+    status = db.Column(Enum(ExportStatus), default=ExportStatus.PENDING, nullable=False)
+    task_id = db.Column(db.String(64), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    total_rows = db.Column(db.Integer, default=0)
+    processed_rows = db.Column(db.Integer, default=0)
+
+    # Файл выгрузки
+    file_path = db.Column(db.Text, nullable=True)
+    file_size = db.Column(db.BigInteger, default=0)
+
+    # Метаданные
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    last_accessed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ExportJob {self.id} {self.status.name if self.status else None}>'
+
+    def to_dict(self):
+        """Преобразует выгрузку в словарь."""
+        return {
+            'id': self.id,
+            'export_format': self.export_format,
+            'status': self.status.name if self.status else None,
+            'error': self.error,
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'progress': round(100 * self.processed_rows / self.total_rows) if self.total_rows else 0,
+            'file_size': self.file_size,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
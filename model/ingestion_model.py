@@ -0,0 +1,91 @@
+from datetime import datetime
+import enum
+from sqlalchemy import Enum
+
+from models.database import db
+
+class SliceStatus(enum.Enum):
+    PENDING = 'ожидает'
+    RUNNING = 'выполняется'
+    DONE = 'завершен'
+    FAILED = 'ошибка'
+
+class IngestionSlice(db.Model):
+    """Модель временного среза загрузки постов из Медиалогии."""
+    __tablename__ = 'ingestion_slices'
+    __table_args__ = (
+        db.UniqueConstraint('report_id', 'date_from', 'date_to', name='uq_ingestion_slice_period'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    report_id = db.Column(db.String(64), nullable=False, index=True)
+    date_from = db.Column(db.DateTime, nullable=False)
+    date_to = db.Column(db.DateTime, nullable=False)
+
+    # Ожидаемое количество постов по статистике Медиалогии
+    expected_posts = db.Column(db.Integer, default=0)
+
+    # Состояние выполнения
+    status = db.Column(Enum(SliceStatus), default=SliceStatus.PENDING, nullable=False)
+    attempts = db.Column(db.Integer, default=0)
+    task_id = db.Column(db.String(64), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    # Результаты загрузки
+    inserted = db.Column(db.Integer, default=0)
+    updated = db.Column(db.Integer, default=0)
+    unchanged = db.Column(db.Integer, default=0)
+
+    # Метаданные
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<IngestionSlice {self.report_id} {self.date_from}..{self.date_to}>'
+
+    def to_dict(self):
+        """Преобразует срез в словарь."""
+        return {
+            'id': self.id,
+            'report_id': self.report_id,
+            'date_from': self.date_from.isoformat() if self.date_from else None,
+            'date_to': self.date_to.isoformat() if self.date_to else None,
+            'expected_posts': self.expected_posts,
+            'status': self.status.name if self.status else None,
+            'attempts': self.attempts,
+            'error': self.error,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+        }
+
+class SyncState(db.Model):
+    """Модель состояния инкрементальной синхронизации отчета Медиалогии."""
+    __tablename__ = 'sync_states'
+
+    id = db.Column(db.Integer, primary_key=True)
+    report_id = db.Column(db.String(64), unique=True, nullable=False, index=True)
+
+    # Дата публикации последнего полностью загруженного поста (московское время, как published_on)
+    last_published_on = db.Column(db.DateTime, nullable=True)
+    last_synced_at = db.Column(db.DateTime, nullable=True)
+
+    # Результаты последней синхронизации
+    inserted = db.Column(db.Integer, default=0)
+    updated = db.Column(db.Integer, default=0)
+    unchanged = db.Column(db.Integer, default=0)
+
+    def __repr__(self):
+        return f'<SyncState {self.report_id} {self.last_published_on}>'
+
+    def to_dict(self):
+        """Преобразует состояние синхронизации в словарь."""
+        return {
+            'id': self.id,
+            'report_id': self.report_id,
+            'last_published_on': self.last_published_on.isoformat() if self.last_published_on else None,
+            'last_synced_at': self.last_synced_at.isoformat() if self.last_synced_at else None,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+        }
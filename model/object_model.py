@@ -29,8 +29,11 @@ class Object(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
 
-# Ассоциативная таблица для связи постов и объектов (многие-ко-многим)
+# Ассоциативная таблица для связи постов и объектов (многие-ко-многим).
+# Первичный ключ (post_id, object_id) обслуживает поиск объектов поста,
+# индекс (object_id, post_id) - фильтрацию постов по объекту.
 post_objects = db.Table('post_objects',
     db.Column('post_id', db.Integer, db.ForeignKey('posts.id'), primary_key=True),
-    db.Column('object_id', db.Integer, db.ForeignKey('objects.id'), primary_key=True)
-)
\ No newline at end of file
+    db.Column('object_id', db.Integer, db.ForeignKey('objects.id'), primary_key=True),
+    db.Index('ix_post_objects_object_id_post_id', 'object_id', 'post_id')
+)
@@ -46,6 +46,11 @@ class Post(db.Model):
     # Взаимосвязи с аналитическими данными
     analysis = db.relationship('PostAnalysis', backref='post', uselist=False, cascade='all, delete-orphan')
     
+    # Фильтр по периоду и сортировка списков постов (сначала новые)
+    __table_args__ = (
+        db.Index('ix_posts_published_on_id', 'published_on', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Post {self.post_id}>'
     
@@ -79,4 +84,20 @@ class Post(db.Model):
             'object_ids': self.object_ids,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-        }
\ No newline at end of file
+        }
+
+class PostText(db.Model):
+    """Очищенный текст поста для анализа LLM (вычисляется один раз на версию контента)."""
+    __tablename__ = 'post_texts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), nullable=False, unique=True)
+
+    # Хэш исходного контента и версии нормализации: при их изменении текст пересчитывается
+    content_hash = db.Column(db.String(64), nullable=False)
+    clean_content = db.Column(db.Text, nullable=True)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PostText for post_id={self.post_id}>'
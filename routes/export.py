@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file
+from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file, jsonify, abort
 from flask_login import login_required, current_user
 import os
 from datetime import datetime
@@ -6,7 +6,9 @@ from datetime import datetime
 from models.database import db
 from models.post_model import Post
 from models.analysis_model import PostAnalysis, TonalityType
+from models.export_model import ExportJob, ExportStatus
 from services.export_service import ExportService
+from services.post_filter import PostFilter
 from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file, current_app
 
 export_bp = Blueprint('export', __name__)
@@ -15,83 +17,61 @@ export_bp = Blueprint('export', __name__)
 @login_required
 def export_page():
     """Страница экспорта данных."""
-    return render_template('export.html', title='Экспорт данных')
+    return render_template('export.html', title='Экспорт данных',
+                           export_formats=ExportService.available_formats())
 
 @export_bp.route('/export-posts', methods=['POST'])
 @login_required
 def export_posts():
-    """Экспорт постов в Excel."""
+    """Запуск фоновой выгрузки постов (Excel, CSV, Parquet или Arrow)."""
     try:
         # Получаем параметры из формы
-        include_analysis = 'include_analysis' in request.form
-        search_query = request.form.get('search_query', '')
-        tonality = request.form.get('tonality', '')
-        object_id = request.form.get('object_id', '')
-        date_from = request.form.get('date_from', '')
-        date_to = request.form.get('date_to', '')
+        params, errors = PostFilter.parse(request.form)
+        for error in errors:
+            flash(error, 'warning')
+        params['include_analysis'] = 'include_analysis' in request.form
+        export_format = request.form.get('export_format', 'xlsx')
         
-        # Базовый запрос
-        query = db.session.query(Post)
+        # Фильтр тональности применяется только вместе с результатами анализа
+        if not params['include_analysis']:
+            params['tonality'] = ''
         
-        # Применяем фильтры, если они указаны
-        if search_query:
-            query = query.filter(
-                db.or_(
-                    Post.title.ilike(f'%{search_query}%'),
-                    Post.content.ilike(f'%{search_query}%')
-                )
-            )
-        
-        if tonality and include_analysis:
-            query = query.join(PostAnalysis).filter(PostAnalysis.tonality == TonalityType[tonality])
-        
-        if object_id:
-            query = query.filter(Post.object_ids.ilike(f'%{object_id}%'))
-        
-        if date_from:
-            try:
-                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
-                query = query.filter(Post.published_on >= date_from_obj)
-            except ValueError:
-                flash('Неверный формат даты начала', 'warning')
-        
-        if date_to:
-            try:
-                date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
-                date_to_obj = date_to_obj.replace(hour=23, minute=59, second=59)
-                query = query.filter(Post.published_on <= date_to_obj)
-            except ValueError:
-                flash('Неверный формат даты окончания', 'warning')
-        
-        # Если нужно включить результаты анализа, загружаем их
-        if include_analysis:
-            query = query.outerjoin(PostAnalysis)
-        
-        # Сортировка по дате публикации (сначала новые)
-        query = query.order_by(Post.published_on.desc())
-        
-        # Получаем посты
-        posts = query.all()
-        
-        if not posts:
-            flash('Нет данных для экспорта', 'warning')
-            return redirect(url_for('export.export_page'))
-        
-        # Формируем имя файла
-        current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
-        export_dir = os.path.join(current_app.config['EXPORT_DIRECTORY'])
-        os.makedirs(export_dir, exist_ok=True)
-        output_file = os.path.join(export_dir, f"export_{current_datetime}.xlsx")
-        
-        # Экспортируем данные
-        export_service = ExportService()
-        count = export_service.export_posts_to_excel(posts, output_file, include_analysis)
-        
-        flash(f'Успешно экспортировано {count} записей в файл', 'success')
-        
-        # Отправляем файл пользователю
-        return send_file(output_file, as_attachment=True)
+        job = ExportService().start_export(params, export_format)
+        return redirect(url_for('export.export_job_page', job_id=job.id))
     
     except Exception as e:
         flash(f'Ошибка при экспорте: {str(e)}', 'danger')
-        return redirect(url_for('export.export_page'))
\ No newline at end of file
+        return redirect(url_for('export.export_page'))
+
+@export_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def export_job_page(job_id):
+    """Страница прогресса выгрузки."""
+    job = db.session.get(ExportJob, job_id)
+    if job is None:
+        abort(404)
+    return render_template('export_job.html', title='Экспорт данных', job=job)
+
+@export_bp.route('/api/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def export_job_status(job_id):
+    """API для проверки прогресса выгрузки."""
+    job = db.session.get(ExportJob, job_id)
+    if job is None:
+        return jsonify({'error': 'Выгрузка не найдена'}), 404
+    return jsonify(job.to_dict())
+
+@export_bp.route('/jobs/<int:job_id>/download', methods=['GET'])
+@login_required
+def download_export(job_id):
+    """Скачивание файла выгрузки."""
+    job = db.session.get(ExportJob, job_id)
+    if job is None or job.status != ExportStatus.DONE or not job.file_path or not os.path.exists(job.file_path):
+        flash('Файл выгрузки недоступен, запустите экспорт повторно', 'warning')
+        return redirect(url_for('export.export_page'))
+    
+    job.last_accessed_at = datetime.utcnow()
+    db.session.commit()
+    
+    filename = f"export_{job.created_at.strftime('%Y%m%d_%H%M%S')}.{job.export_format}"
+    return send_file(job.file_path, as_attachment=True, download_name=filename)
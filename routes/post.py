@@ -1,14 +1,17 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
+from sqlalchemy.orm import selectinload
 
 from models.database import db
 from models.post_model import Post, BlogHostType
 from models.analysis_model import PostAnalysis, TonalityType
 from services.mlg_service import MlgService
+from services.ingestion_service import IngestionService
 from services.lmm_service import LmmService
 from services.object_service import ObjectService
+from services.post_filter import PostFilter
 from models.database import db
 from models.post_model import Post, BlogHostType
 from models.analysis_model import PostAnalysis, TonalityType
@@ -37,7 +40,13 @@ def dashboard():
             tonality_data[tonality.name] = count
     
     # Получаем последние посты
-    latest_posts = db.session.query(Post).order_by(Post.created_at.desc()).limit(5).all()
+    latest_posts = (
+        db.session.query(Post)
+        .options(selectinload(Post.analysis))
+        .order_by(Post.created_at.desc())
+        .limit(5)
+        .all()
+    )
     
     return render_template('dashboard.html', 
                            title='Панель управления',
@@ -50,58 +59,28 @@ def dashboard():
 @login_required
 def posts_list():
     """Список постов с фильтрацией и пагинацией."""
-    # Параметры для фильтрации и пагинации
-    page = request.args.get('page', 1, type=int)
+    # Параметры пагинации: курсор страницы и ограниченный размер страницы
+    cursor = request.args.get('cursor') or None
     per_page = request.args.get('per_page', 20, type=int)
+    per_page = max(1, min(per_page, current_app.config.get('POSTS_PER_PAGE_MAX', 100)))
     
     # Фильтры
-    search_query = request.args.get('q', '')
-    tonality = request.args.get('tonality', '')
-    object_id = request.args.get('object_id', '')
-    date_from = request.args.get('date_from', '')
-    date_to = request.args.get('date_to', '')
+    params, errors = PostFilter.parse(request.args, search_key='q')
+    for error in errors:
+        flash(error, 'warning')
     
-    # Базовый запрос
-    query = db.session.query(Post)
-    
-    # Применяем фильтры, если они указаны
-    if search_query:
-        query = query.filter(
-            db.or_(
-                Post.title.ilike(f'%{search_query}%'),
-                Post.content.ilike(f'%{search_query}%')
-            )
-        )
-    
-    if tonality:
-        query = query.join(PostAnalysis).filter(PostAnalysis.tonality == TonalityType[tonality])
-    
-    if object_id:
-        query = query.filter(Post.object_ids.ilike(f'%{object_id}%'))
-    
-    if date_from:
-        try:
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
-            query = query.filter(Post.published_on >= date_from_obj)
-        except ValueError:
-            flash('Неверный формат даты начала', 'warning')
-    
-    if date_to:
-        try:
-            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
-            date_to_obj = date_to_obj.replace(hour=23, minute=59, second=59)
-            query = query.filter(Post.published_on <= date_to_obj)
-        except ValueError:
-            flash('Неверный формат даты окончания', 'warning')
-    
-    # Сортировка по дате публикации (сначала новые)
-    query = query.order_by(Post.published_on.desc())
-    
-    # Выполняем запрос с пагинацией
-    posts_pagination = query.paginate(page=page, per_page=per_page)
+    # Страница постов по курсору (сначала новые; при поиске - по релевантности)
+    post_filter = PostFilter()
+    try:
+        posts_pagination = post_filter.paginate(params, per_page, cursor)
+    except ValueError:
+        flash('Ссылка на страницу устарела, показана первая страница', 'warning')
+        posts_pagination = post_filter.paginate(params, per_page)
     
-    # Получаем сервис объектов для отображения имен
-    object_service = ObjectService()
+    # Имена объектов всех постов страницы - одним запросом
+    object_names = post_filter.object_service.get_object_names_batch(
+        post.object_ids for post in posts_pagination.items
+    )
     
     # Получаем доступные объекты для фильтра
     objects = db.session.query(Object).all()
@@ -109,12 +88,13 @@ def posts_list():
     return render_template('posts.html',
                            title='Список постов',
                            posts_pagination=posts_pagination,
-                           search_query=search_query,
-                           tonality=tonality,
-                           object_id=object_id,
-                           date_from=date_from,
-                           date_to=date_to,
-                           object_service=object_service,
+                           search_query=params['search_query'],
+                           tonality=params['tonality'],
+                           object_id=params['object_id'],
+                           date_from=params['date_from'],
+                           date_to=params['date_to'],
+                           per_page=per_page,
+                           object_names=object_names,
                            objects=objects)
 
 @posts_bp.route('/posts/<string:post_id>', methods=['GET'])
@@ -143,12 +123,20 @@ def fetch_posts():
         date_to = request.form.get('date_to')
         time_from = request.form.get('time_from')
         time_to = request.form.get('time_to')
+        mode = request.form.get('mode', 'sync')
         
         # Проверка обязательных параметров
         if not report_id:
             flash('ID отчета Медиалогии обязателен', 'danger')
             return redirect(url_for('posts.dashboard'))
         
+        # Инкрементальная синхронизация с сохраненной отметки
+        if mode == 'incremental':
+            stats = IngestionService().sync_incremental(report_id)
+            flash(f'Синхронизация завершена: новых {stats["inserted"]}, '
+                  f'обновленных {stats["updated"]}, без изменений {stats["unchanged"]}', 'success')
+            return redirect(url_for('posts.posts_list'))
+        
         # Определяем период
         if days_ago is not None:
             date_from_obj, date_to_obj = MlgService.get_msk_date_range(days_ago, time_from, time_to)
@@ -174,6 +162,13 @@ def fetch_posts():
             flash('Необходимо указать либо количество дней назад, либо конкретный период', 'danger')
             return redirect(url_for('posts.dashboard'))
         
+        # Фоновая загрузка временными срезами отдельными задачами
+        if mode == 'backfill':
+            result = IngestionService().start_backfill(report_id, date_from_obj, date_to_obj)
+            flash(f'Запущена фоновая загрузка: срезов {result["slices"]}, задач {result["dispatched"]}, '
+                  f'уже загружено {result["skipped"]}', 'success')
+            return redirect(url_for('posts.dashboard'))
+        
         # Инициализируем сервис Медиалогии
         mlg_service = MlgService()
         
@@ -184,16 +179,37 @@ def fetch_posts():
             flash('Нет постов за указанный период', 'warning')
             return redirect(url_for('posts.dashboard'))
         
-        # Получаем посты
-        posts = mlg_service.get_posts(report_id, date_from_obj, date_to_obj)
+        # Получаем посты с пакетным сохранением по страницам
+        stats = mlg_service.ingest_posts(report_id, date_from_obj, date_to_obj)
         
-        flash(f'Успешно получено {len(posts)} постов из Медиалогии', 'success')
+        flash(f'Успешно получено постов из Медиалогии: новых {stats["inserted"]}, '
+              f'обновленных {stats["updated"]}, без изменений {stats["unchanged"]}', 'success')
         return redirect(url_for('posts.posts_list'))
     
     except Exception as e:
         flash(f'Ошибка при получении постов: {str(e)}', 'danger')
         return redirect(url_for('posts.dashboard'))
 
+@posts_bp.route('/api/backfill-status', methods=['GET'])
+@login_required
+def backfill_status():
+    """API для проверки прогресса фоновой загрузки срезами."""
+    report_id = request.args.get('report_id', '')
+    return jsonify(IngestionService().get_progress(report_id))
+
+@posts_bp.route('/backfill/resume', methods=['POST'])
+@login_required
+def resume_backfill():
+    """Перезапуск незавершенных срезов фоновой загрузки."""
+    report_id = request.form.get('report_id')
+    if not report_id:
+        flash('ID отчета Медиалогии обязателен', 'danger')
+        return redirect(url_for('posts.dashboard'))
+    
+    result = IngestionService().resume_backfill(report_id)
+    flash(f'Перезапущено срезов: {result["dispatched"]}', 'success')
+    return redirect(url_for('posts.dashboard'))
+
 @posts_bp.route('/analyze-posts', methods=['POST'])
 @login_required
 def analyze_posts():
@@ -202,67 +218,32 @@ def analyze_posts():
         # Получаем параметры из формы
         post_ids = request.form.getlist('post_ids')
         
-        if not post_ids:
+        if post_ids:
+            query = db.session.query(Post).filter(Post.post_id.in_(post_ids))
+        else:
             # Проверяем, указан ли фильтр для анализа всех отфильтрованных постов
-            search_query = request.form.get('search_query', '')
-            tonality = request.form.get('tonality', '')
-            object_id = request.form.get('object_id', '')
-            date_from = request.form.get('date_from', '')
-            date_to = request.form.get('date_to', '')
-            
-            # Базовый запрос
-            query = db.session.query(Post)
-            
-            # Применяем фильтры, если они указаны
-            if search_query:
-                query = query.filter(
-                    db.or_(
-                        Post.title.ilike(f'%{search_query}%'),
-                        Post.content.ilike(f'%{search_query}%')
-                    )
-                )
-            
-            if tonality:
-                query = query.join(PostAnalysis).filter(PostAnalysis.tonality == TonalityType[tonality])
-            
-            if object_id:
-                query = query.filter(Post.object_ids.ilike(f'%{object_id}%'))
-            
-            if date_from:
-                try:
-                    date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
-                    query = query.filter(Post.published_on >= date_from_obj)
-                except ValueError:
-                    flash('Неверный формат даты начала', 'warning')
-            
-            if date_to:
-                try:
-                    date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
-                    date_to_obj = date_to_obj.replace(hour=23, minute=59, second=59)
-                    query = query.filter(Post.published_on <= date_to_obj)
-                except ValueError:
-                    flash('Неверный формат даты окончания', 'warning')
-            
-            # Получаем все ID постов по фильтру
-            posts = query.all()
-            post_ids = [post.post_id for post in posts]
+            params, errors = PostFilter.parse(request.form)
+            for error in errors:
+                flash(error, 'warning')
+            query = PostFilter().build_query(params)
         
-        if not post_ids:
+        # Получаем данные постов для анализа одним запросом
+        posts = query.with_entities(Post.post_id, Post.content, Post.object_ids, Post.simhash).all()
+        
+        if not posts:
             flash('Не выбраны посты для анализа', 'danger')
             return redirect(url_for('posts.posts_list'))
         
-        # Получаем данные постов для анализа
-        posts_data = []
-        object_service = ObjectService()
-        
-        for post_id in post_ids:
-            post = Post.query.filter_by(post_id=post_id).first()
-            if post:
-                posts_data.append({
-                    'post_id': post.post_id,
-                    'content': post.content,
-                    'object': object_service.get_object_names(post.object_ids)
-                })
+        object_names = ObjectService().get_object_names_batch(post.object_ids for post in posts)
+        posts_data = [
+            {
+                'post_id': post.post_id,
+                'content': post.content,
+                'object': object_names[post.object_ids],
+                'simhash': post.simhash
+            }
+            for post in posts
+        ]
         
         # Инициализируем сервис LMM
         lmm_service = LmmService()
@@ -272,7 +253,8 @@ def analyze_posts():
         
         # Здесь можно сохранить task_ids для последующей проверки статуса
         
-        flash(f'Запущен анализ {len(posts_data)} постов. Результаты будут доступны после завершения обработки.', 'success')
+        flash(f'Запущен анализ {len(posts_data)} постов (из кэша: {result["cache_hits"]}). '
+              f'Результаты будут доступны после завершения обработки.', 'success')
         return redirect(url_for('posts.posts_list'))
     
     except Exception as e:
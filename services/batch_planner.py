@@ -0,0 +1,279 @@
+import re
+from typing import List, Dict, Any, Optional
+from loguru import logger
+from flask import current_app
+
+class TokenEstimator:
+    """
+    Оценка количества токенов текста.
+
+    Если установлен tiktoken, используется его токенизатор. Иначе токены
+    считаются по калиброванным коэффициентам символов на токен отдельно для
+    кириллицы, латиницы и цифр/знаков: кириллица в BPE-токенизаторах
+    дробится заметно мельче латиницы, поэтому единая оценка len/4
+    занижает размер русских текстов примерно в полтора раза.
+    """
+
+    # Символов на токен: (кириллица, латиница, цифры и знаки)
+    MODEL_RATIOS = {
+        'default': (2.6, 4.0, 1.6),
+        'deepseek': (2.9, 4.2, 1.6),
+        'openai': (2.6, 4.0, 1.6),
+        'anthropic': (2.3, 3.8, 1.5),
+        'google': (3.2, 4.3, 1.7),
+    }
+
+    CYRILLIC_PATTERN = re.compile(r'[Ѐ-ӿ]')
+    LATIN_PATTERN = re.compile(r'[A-Za-z]')
+    SPACE_PATTERN = re.compile(r'\s')
+
+    def __init__(self, model: Optional[str] = None, encoding: Optional[str] = None):
+        """
+        Инициализация оценщика.
+
+        Args:
+            model: Модель LLM (например, deepseek/deepseek-chat), определяет коэффициенты.
+            encoding: Кодировка tiktoken (например, o200k_base). Если не задана, tiktoken не используется.
+        """
+        self.model = model or ''
+        vendor = self.model.split('/', 1)[0] if '/' in self.model else 'default'
+        self.ratios = self.MODEL_RATIOS.get(vendor, self.MODEL_RATIOS['default'])
+        self.encoder = None
+
+        if encoding:
+            try:
+                import tiktoken
+                self.encoder = tiktoken.get_encoding(encoding)
+            except Exception as e:
+                logger.warning(f"Токенизатор {encoding} недоступен, используется оценка по символам: {e}")
+
+    def count(self, text: str) -> int:
+        """
+        Оценивает количество токенов в тексте.
+
+        Args:
+            text: Текст.
+
+        Returns:
+            int: Количество токенов.
+        """
+        if not text:
+            return 0
+        if self.encoder is not None:
+            return len(self.encoder.encode(text, disallowed_special=()))
+
+        cyrillic = len(self.CYRILLIC_PATTERN.findall(text))
+        latin = len(self.LATIN_PATTERN.findall(text))
+        spaces = len(self.SPACE_PATTERN.findall(text))
+        other = len(text) - cyrillic - latin - spaces
+        cyr_ratio, lat_ratio, other_ratio = self.ratios
+        return max(1, round(cyrillic / cyr_ratio + latin / lat_ratio + other / other_ratio))
+
+
+class BatchPlanner:
+    """
+    Базовый планировщик батчей постов для запросов к LLM.
+
+    Планировщик оценивает входные токены каждого поста (текст и разметка
+    промпта) и ожидаемую длину ответа, а затем раскладывает посты по батчам.
+    """
+
+    # Разметка промпта на один пост ("[post_id]" и переводы строк, см. services.lmm_prompt)
+    POST_OVERHEAD_TOKENS = 4
+    # Разметка промпта на группу постов одного объекта ("=== Объект: ... ===")
+    GROUP_OVERHEAD_TOKENS = 8
+    # Минимальная оценка входных токенов поста
+    MIN_POST_TOKENS = 50
+
+    def __init__(self, estimator: TokenEstimator, max_input_tokens: int = 30000,
+                 max_output_tokens: int = 8000, output_tokens_per_post: int = 220,
+                 prompt_tokens: int = 0, max_posts_per_batch: int = 50):
+        """
+        Инициализация планировщика.
+
+        Args:
+            estimator: Оценщик токенов.
+            max_input_tokens: Максимальное количество входных токенов в батче (с учетом промпта).
+            max_output_tokens: Максимальное ожидаемое количество токенов ответа на батч.
+            output_tokens_per_post: Ожидаемое количество токенов ответа на один пост.
+            prompt_tokens: Токены постоянной части промпта (инструкции).
+            max_posts_per_batch: Максимальное количество постов в батче.
+        """
+        self.estimator = estimator
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.output_tokens_per_post = output_tokens_per_post
+        self.prompt_tokens = prompt_tokens
+        self.max_posts_per_batch = max(1, min(max_posts_per_batch, max_output_tokens // max(1, output_tokens_per_post)))
+
+    def post_tokens(self, post: Dict) -> int:
+        """Оценивает входные токены поста вместе с разметкой промпта."""
+        content = (post.get('content') or '').strip()
+        tokens = (self.estimator.count(content) + self.estimator.count(str(post.get('post_id', '')))
+                  + self.POST_OVERHEAD_TOKENS)
+        return max(self.MIN_POST_TOKENS, tokens)
+
+    def group_tokens(self, obj: str) -> int:
+        """Оценивает входные токены заголовка группы постов объекта."""
+        return self.estimator.count(obj or '') + self.GROUP_OVERHEAD_TOKENS
+
+    def plan(self, posts: List[Dict]) -> List[List[Dict]]:
+        """
+        Раскладывает посты по батчам.
+
+        Args:
+            posts: Список постов для анализа.
+
+        Returns:
+            List[List[Dict]]: Список батчей.
+        """
+        raise NotImplementedError
+
+    def describe(self, batches: List[List[Dict]], input_price: float = 0.0,
+                 output_price: float = 0.0) -> Dict[str, Any]:
+        """
+        Считает показатели плана: число запросов, заполнение и прогноз стоимости.
+
+        Args:
+            batches: Список батчей.
+            input_price: Цена за 1 млн входных токенов.
+            output_price: Цена за 1 млн выходных токенов.
+
+        Returns:
+            Dict[str, Any]: Показатели плана.
+        """
+        input_tokens = 0
+        for batch in batches:
+            input_tokens += self.prompt_tokens + sum(self.post_tokens(post) for post in batch)
+            input_tokens += sum(self.group_tokens(obj) for obj in {post.get('object', '') for post in batch})
+        output_tokens = sum(len(batch) for batch in batches) * self.output_tokens_per_post
+        capacity = len(batches) * self.max_input_tokens
+
+        return {
+            'requests': len(batches),
+            'posts': sum(len(batch) for batch in batches),
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'fill_ratio': round(input_tokens / capacity, 4) if capacity else 0.0,
+            'cost': round((input_tokens * input_price + output_tokens * output_price) / 1_000_000, 6),
+        }
+
+
+class GreedyBatchPlanner(BatchPlanner):
+    """
+    Прежний жадный алгоритм: оценка len/4, не более 20 постов в батче,
+    батч закрывается, как только в нем 5 постов и пятая часть лимита токенов.
+    """
+
+    def plan(self, posts: List[Dict]) -> List[List[Dict]]:
+        batches = []
+        current_batch = []
+        current_batch_tokens = 0
+        max_posts_per_batch = 20
+        min_batch_tokens = self.max_input_tokens // 5
+
+        for post in posts:
+            post_tokens = max(50, (len(post.get('content', '')) + len(post.get('object', ''))) // 4)
+
+            if (not current_batch or
+                (current_batch_tokens + post_tokens <= self.max_input_tokens and
+                 len(current_batch) < max_posts_per_batch)):
+                current_batch.append(post)
+                current_batch_tokens += post_tokens
+            else:
+                batches.append(current_batch)
+                current_batch = [post]
+                current_batch_tokens = post_tokens
+
+            if current_batch_tokens >= min_batch_tokens and len(current_batch) >= 5:
+                batches.append(current_batch)
+                current_batch = []
+                current_batch_tokens = 0
+
+        if current_batch:
+            batches.append(current_batch)
+        return batches
+
+
+class BinPackingBatchPlanner(BatchPlanner):
+    """
+    Упаковка постов в батчи методом First Fit Decreasing.
+
+    Посты одного объекта образуют группу и по возможности попадают в один
+    батч (промпт группирует посты по объектам). Группа, не помещающаяся в
+    батч целиком, делится на части. Части раскладываются по убыванию размера
+    в первый батч, где хватает бюджета входных токенов и ответа.
+    """
+
+    def _split_groups(self, posts: List[Dict]) -> List[Dict[str, Any]]:
+        """Делит посты на группы объектов, помещающиеся в один батч."""
+        groups: Dict[str, List[Dict]] = {}
+        for post in posts:
+            groups.setdefault(post.get('object', 'неизвестно'), []).append(post)
+
+        budget = self.max_input_tokens - self.prompt_tokens
+        items = []
+        for obj, group_posts in groups.items():
+            header = self.group_tokens(obj)
+            item = {'object': obj, 'posts': [], 'tokens': header}
+            for post in group_posts:
+                tokens = self.post_tokens(post)
+                if item['posts'] and (item['tokens'] + tokens > budget
+                                      or len(item['posts']) >= self.max_posts_per_batch):
+                    items.append(item)
+                    item = {'object': obj, 'posts': [], 'tokens': header}
+                item['posts'].append(post)
+                item['tokens'] += tokens
+            items.append(item)
+        return items
+
+    def plan(self, posts: List[Dict]) -> List[List[Dict]]:
+        items = sorted(self._split_groups(posts), key=lambda item: item['tokens'], reverse=True)
+
+        bins: List[Dict[str, Any]] = []
+        for item in items:
+            for current in bins:
+                if (current['tokens'] + item['tokens'] <= self.max_input_tokens
+                        and len(current['posts']) + len(item['posts']) <= self.max_posts_per_batch):
+                    current['posts'].extend(item['posts'])
+                    current['tokens'] += item['tokens']
+                    break
+            else:
+                bins.append({'posts': list(item['posts']), 'tokens': self.prompt_tokens + item['tokens']})
+
+        return [current['posts'] for current in bins]
+
+
+# Доступные планировщики (ключ - значение LMM_BATCH_PLANNER)
+PLANNERS = {
+    'greedy': GreedyBatchPlanner,
+    'binpack': BinPackingBatchPlanner,
+}
+
+def create_batch_planner(model: str, max_input_tokens: int, prompt_text: str = '',
+                         name: Optional[str] = None) -> BatchPlanner:
+    """
+    Создает планировщик батчей по настройкам приложения.
+
+    Args:
+        model: Модель LLM.
+        max_input_tokens: Максимальное количество входных токенов в батче.
+        prompt_text: Постоянная часть промпта (инструкции).
+        name: Название планировщика (по умолчанию LMM_BATCH_PLANNER).
+
+    Returns:
+        BatchPlanner: Планировщик батчей.
+    """
+    config = current_app.config
+    name = name or config.get('LMM_BATCH_PLANNER', 'binpack')
+    if name not in PLANNERS:
+        raise ValueError(f"Неизвестный планировщик батчей: {name}")
+
+    estimator = TokenEstimator(model, encoding=config.get('LMM_TOKENIZER_ENCODING'))
+    return PLANNERS[name](
+        estimator,
+        max_input_tokens=max_input_tokens,
+        max_output_tokens=config.get('LMM_MAX_OUTPUT_TOKENS', 8000),
+        output_tokens_per_post=config.get('LMM_OUTPUT_TOKENS_PER_POST', 220),
+        prompt_tokens=estimator.count(prompt_text),
+    )
@@ -0,0 +1,291 @@
+import hashlib
+import html
+import re
+import traceback
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Dict, Optional
+from loguru import logger
+from flask import current_app
+
+from models.database import db
+from models.post_model import Post, PostText
+from services.batch_planner import TokenEstimator
+from utils.sql import dialect_insert, supports_upsert
+
+# Версия нормализации: при изменении правил очистки сохраненные тексты пересчитываются
+NORMALIZER_VERSION = '1'
+
+# Теги, после которых в тексте начинается новая строка
+BLOCK_TAG_PATTERN = re.compile(r'<\s*(?:br|hr|/?p|/?div|/?li|/?tr|/?h[1-6]|/?blockquote)\b[^<>]*>', re.IGNORECASE)
+TAG_PATTERN = re.compile(r'<[a-zA-Z/!][^<>]*>')
+
+# Эмодзи, модификаторы и невидимые символы
+EMOJI_PATTERN = re.compile(
+    "["
+    "\U0001F000-\U0001FAFF"  # пиктограммы, смайлики, транспорт, флаги
+    "\U00002600-\U000027BF"  # разные символы и dingbats
+    "\U00002B00-\U00002BFF"  # стрелки и геометрические фигуры
+    "\U0000FE0E\U0000FE0F"   # селекторы варианта
+    "\U0000200B-\U0000200F"  # пробелы нулевой ширины, ZWJ, метки направления
+    "\U00002060\U0000FEFF"
+    "]+"
+)
+INLINE_SPACE_PATTERN = re.compile(r'[^\S\n]+')
+NEWLINE_PATTERN = re.compile(r'\s*\n\s*')
+# Ключ сравнения строк при поиске повторов: только буквы и цифры
+DEDUP_KEY_PATTERN = re.compile(r'[\W_]+')
+# Строки короче этого ключа удаляются только при точном повторе
+DEDUP_MIN_CONTAINED = 20
+
+SENTENCE_SPLIT_PATTERN = re.compile(r'(?<=[.!?…])\s+|\n+')
+OBJECT_WORD_PATTERN = re.compile(r'\w{3,}')
+
+def content_hash(content: Optional[str]) -> str:
+    """Хэш исходного контента с учетом версии нормализации."""
+    return hashlib.sha1(f"{NORMALIZER_VERSION}\0{content or ''}".encode('utf-8')).hexdigest()
+
+def normalize_content(content: Optional[str]) -> str:
+    """
+    Очищает текст поста перед анализом.
+
+    Удаляет HTML-разметку и эмодзи, раскрывает HTML-сущности, схлопывает
+    пробелы и удаляет повторяющиеся строки. Текст с картинок
+    (Images.CubusImage.Body) добавляется к контенту при загрузке отдельными
+    строками и часто повторяет сам пост или другие картинки, поэтому строка,
+    уже встречавшаяся в тексте целиком, отбрасывается.
+
+    Args:
+        content: Исходный текст поста.
+
+    Returns:
+        str: Очищенный текст (строки разделены переводом строки).
+    """
+    if not content:
+        return ''
+
+    text = BLOCK_TAG_PATTERN.sub('\n', content)
+    text = TAG_PATTERN.sub('', text)
+    text = html.unescape(text)
+    text = EMOJI_PATTERN.sub('', text)
+    text = INLINE_SPACE_PATTERN.sub(' ', text)
+
+    lines = []
+    seen = set()
+    seen_text = ''
+    for line in NEWLINE_PATTERN.split(text):
+        line = line.strip()
+        key = DEDUP_KEY_PATTERN.sub('', line.lower())
+        if not key or key in seen:
+            continue
+        if len(key) >= DEDUP_MIN_CONTAINED and key in seen_text:
+            continue
+        seen.add(key)
+        seen_text += key + '\n'
+        lines.append(line)
+
+    return '\n'.join(lines)
+
+@lru_cache(maxsize=1024)
+def object_mention_pattern(object_names: str) -> Optional[re.Pattern]:
+    """
+    Регулярное выражение для поиска упоминаний объектов в тексте.
+
+    Слова названий сравниваются по началу (без двух последних букв у длинных
+    слов), чтобы находить падежные формы: "Скоч Андрей" - "Скоча", "Андрею".
+
+    Args:
+        object_names: Названия объектов через запятую.
+
+    Returns:
+        Optional[re.Pattern]: Выражение или None, если в названиях нет слов.
+    """
+    stems = set()
+    for word in OBJECT_WORD_PATTERN.findall(object_names or ''):
+        word = word.lower()
+        stems.add(word[:-2] if len(word) > 5 else word)
+    if not stems:
+        return None
+    alternatives = '|'.join(re.escape(stem) for stem in sorted(stems, key=len, reverse=True))
+    return re.compile(rf'\b(?:{alternatives})', re.IGNORECASE)
+
+class ContentNormalizer:
+    """
+    Подготовка текстов постов к анализу LLM.
+
+    Очищенный текст хранится в таблице post_texts и пересчитывается только
+    при изменении контента поста или версии нормализации. Перед отправкой
+    текст обрезается до бюджета токенов на пост, при этом сохраняются
+    предложения с упоминанием объекта и ближайший к ним контекст.
+    """
+
+    def __init__(self, max_post_tokens: Optional[int] = None, estimator: Optional[TokenEstimator] = None):
+        """
+        Инициализация нормализатора.
+
+        Args:
+            max_post_tokens: Бюджет токенов на текст одного поста (0 - без обрезки).
+            estimator: Оценщик токенов (по умолчанию - для модели LMM_MODEL).
+        """
+        self.max_post_tokens = (max_post_tokens if max_post_tokens is not None
+                                else current_app.config.get('LMM_MAX_POST_TOKENS', 2000))
+        self.estimator = estimator or TokenEstimator(current_app.config.get('LMM_MODEL'),
+                                                     current_app.config.get('LMM_TOKENIZER_ENCODING'))
+
+    def prepare(self, posts: List[Dict]) -> List[Dict]:
+        """
+        Заменяет контент постов очищенным и обрезанным текстом.
+
+        Args:
+            posts: Посты для анализа (post_id, content, object).
+
+        Returns:
+            List[Dict]: Копии постов с подготовленным контентом.
+        """
+        clean_texts = self.load_clean_texts(posts)
+
+        prepared = []
+        truncated = 0
+        for post in posts:
+            clean = clean_texts.get(str(post.get('post_id', '')))
+            if clean is None:
+                clean = normalize_content(post.get('content'))
+            content = self.truncate(clean, post.get('object', ''))
+            truncated += len(content) < len(clean)
+            prepared.append(dict(post, content=content))
+
+        raw_chars = sum(len(post.get('content') or '') for post in posts)
+        clean_chars = sum(len(post['content']) for post in prepared)
+        logger.info(f"Нормализация текстов: {raw_chars} -> {clean_chars} символов, обрезано постов: {truncated}")
+        return prepared
+
+    def load_clean_texts(self, posts: List[Dict]) -> Dict[str, str]:
+        """
+        Возвращает очищенные тексты постов, вычисляя и сохраняя недостающие.
+
+        Args:
+            posts: Посты (post_id, content).
+
+        Returns:
+            Dict[str, str]: Очищенный текст по post_id.
+        """
+        hashes = {str(post.get('post_id', '')): content_hash(post.get('content')) for post in posts}
+        contents = {str(post.get('post_id', '')): post.get('content') for post in posts}
+        clean_texts = {}
+
+        try:
+            stored = (
+                db.session.query(Post.post_id, Post.id, PostText.content_hash, PostText.clean_content)
+                .outerjoin(PostText, PostText.post_id == Post.id)
+                .filter(Post.post_id.in_(list(hashes)))
+                .all()
+            )
+
+            rows = []
+            now = datetime.utcnow()
+            for post_id, post_pk, stored_hash, stored_clean in stored:
+                if stored_hash == hashes[post_id]:
+                    clean_texts[post_id] = stored_clean or ''
+                    continue
+                clean_texts[post_id] = normalize_content(contents[post_id])
+                rows.append({'post_id': post_pk, 'content_hash': hashes[post_id],
+                             'clean_content': clean_texts[post_id], 'updated_at': now})
+
+            if rows:
+                self._save_clean_texts(rows)
+            logger.info(f"Очищенные тексты: из БД {len(stored) - len(rows)}, пересчитано {len(rows)}")
+        except Exception as e:
+            logger.error(f"Ошибка загрузки очищенных текстов: {e}")
+            logger.error(traceback.format_exc())
+            db.session.rollback()
+
+        return clean_texts
+
+    def _save_clean_texts(self, rows: List[Dict]):
+        """Сохраняет очищенные тексты одним INSERT ... ON CONFLICT (или построчно)."""
+        if supports_upsert():
+            stmt = dialect_insert(PostText.__table__).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['post_id'],
+                set_={column: stmt.excluded[column] for column in ('content_hash', 'clean_content', 'updated_at')}
+            )
+            db.session.execute(stmt)
+        else:
+            existing = {
+                text.post_id: text
+                for text in PostText.query.filter(PostText.post_id.in_([row['post_id'] for row in rows]))
+            }
+            for row in rows:
+                text = existing.get(row['post_id'])
+                if text is None:
+                    db.session.add(PostText(**row))
+                else:
+                    text.content_hash = row['content_hash']
+                    text.clean_content = row['clean_content']
+        db.session.commit()
+
+    def truncate(self, text: str, object_names: str = '') -> str:
+        """
+        Обрезает текст до бюджета токенов, сохраняя упоминания объекта.
+
+        Сначала отбираются предложения с упоминанием объекта (если их нет -
+        начало текста), затем соседние предложения по мере удаления от них,
+        пока хватает бюджета. Пропуски между выбранными фрагментами
+        обозначаются многоточием.
+
+        Args:
+            text: Очищенный текст поста.
+            object_names: Названия объектов поста через запятую.
+
+        Returns:
+            str: Текст в пределах бюджета.
+        """
+        if not text or self.max_post_tokens <= 0:
+            return text
+        if self.estimator.count(text) <= self.max_post_tokens:
+            return text
+
+        sentences = [sentence for sentence in SENTENCE_SPLIT_PATTERN.split(text) if sentence.strip()]
+        tokens = [self.estimator.count(sentence) for sentence in sentences]
+
+        pattern = object_mention_pattern(object_names)
+        anchors = [i for i, sentence in enumerate(sentences) if pattern and pattern.search(sentence)] or [0]
+
+        # Расстояние каждого предложения до ближайшего упоминания объекта
+        distance = [len(sentences)] * len(sentences)
+        for anchor in anchors:
+            distance[anchor] = 0
+        for i in range(1, len(sentences)):
+            distance[i] = min(distance[i], distance[i - 1] + 1)
+        for i in range(len(sentences) - 2, -1, -1):
+            distance[i] = min(distance[i], distance[i + 1] + 1)
+
+        selected = set()
+        budget = self.max_post_tokens
+        for i in sorted(range(len(sentences)), key=lambda i: (distance[i], i)):
+            if tokens[i] <= budget:
+                selected.add(i)
+                budget -= tokens[i]
+            elif distance[i] > 0:
+                break
+
+        if not selected:
+            # Даже первое опорное предложение не помещается - обрезаем его по символам
+            sentence = sentences[anchors[0]]
+            return sentence[:len(sentence) * self.max_post_tokens // tokens[anchors[0]]].rstrip() + ' …'
+
+        return self._join_fragments(sentences, sorted(selected))
+
+    @staticmethod
+    def _join_fragments(sentences: List[str], indices: List[int]) -> str:
+        """Склеивает выбранные предложения, отмечая пропуски многоточием."""
+        parts = ['… '] if indices[0] > 0 else []
+        for position, i in enumerate(indices):
+            if position and i != indices[position - 1] + 1:
+                parts.append(' … ')
+            elif position:
+                parts.append(' ')
+            parts.append(sentences[i])
+        if indices[-1] < len(sentences) - 1:
+            parts.append(' …')
+        return ''.join(parts)
@@ -1,22 +1,98 @@
+import csv
+import hashlib
+import json
 import os
+import tempfile
 import traceback
-import re
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Tuple, Callable
+from datetime import datetime, timedelta
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
 from loguru import logger
 from flask import current_app
+from celery_app import celery
 
+from models.database import db
 from models.post_model import Post, BlogHostType
 from models.analysis_model import PostAnalysis, TonalityType
+from models.export_model import ExportJob, ExportStatus
 from services.object_service import ObjectService
+from services.post_filter import PostFilter
+from utils.text_cleaning import clean_text, clean_texts, clean_series
+
+@celery.task(name='export_posts_task')
+def export_posts_task(job_id):
+    """
+    Celery-задача формирования файла выгрузки.
+    
+    Args:
+        job_id: ID выгрузки.
+    """
+    job = db.session.get(ExportJob, job_id)
+    if job is None:
+        logger.warning(f"Выгрузка {job_id} не найдена")
+        return
+    
+    export_service = ExportService()
+    try:
+        export_service.run_export(job)
+    except Exception as e:
+        logger.error(f"Ошибка при выгрузке {job_id}: {e}")
+        logger.error(traceback.format_exc())
+        db.session.rollback()
+        
+        job.status = ExportStatus.FAILED
+        job.error = str(e)
+        db.session.commit()
+        return
+    
+    # Заодно удаляем устаревшие файлы
+    export_service.cleanup_exports()
+
+@celery.task(name='cleanup_exports_task')
+def cleanup_exports_task():
+    """Celery-задача удаления устаревших файлов выгрузок."""
+    return ExportService().cleanup_exports()
 
 class ExportService:
     """Сервис для экспорта данных из БД."""
     
+    EXPORT_FORMATS = ('xlsx', 'csv', 'parquet', 'arrow')
+    # Форматы, для которых нужен необязательный пакет pyarrow
+    COLUMNAR_FORMATS = ('parquet', 'arrow')
+    
+    # Строк в группе строк Parquet и в пакете записи Arrow IPC
+    COLUMNAR_ROW_GROUP_SIZE = 65536
+    
+    # Фиксированные словари категориальных колонок для Parquet/Arrow
+    CATEGORIES = {
+        'tonality': [tonality.value for tonality in TonalityType],
+        'blog_host_type': [host_type.name for host_type in BlogHostType],
+    }
+    
+    # Порядок колонок выгрузки
+    POST_COLUMNS = [
+        "post_id", "title", "published_on", "date", "time", "blog_host", "blog_host_type", 
+        "url", "content", "object_ids", "object", "simhash"
+    ]
+    ANALYSIS_COLUMNS = [
+        "post_id", "title", "lmm_title", "tonality", "description",
+        "published_on", "date", "time", "blog_host", "blog_host_type", 
+        "url", "content", "object_ids", "object", "simhash",
+        "analyzed_at", "model_used"
+    ]
+    
     def __init__(self):
         """Инициализация сервиса экспорта."""
         self.object_service = ObjectService()
+        self._object_names_cache: Dict[Optional[str], str] = {}
     
     def clean_html_and_emoji(self, text: str) -> str:
         """
@@ -28,34 +104,7 @@ class ExportService:
         Returns:
             str: Очищенный текст.
         """
-        if text is None:
-            return ""
-        
-        # Удаление HTML-тегов
-        text = re.sub(r'<[^>]+>', '', text)
-        
-        # Удаление эмодзи
-        emoji_pattern = re.compile(
-            "["
-            "\U0001F600-\U0001F64F"  # смайлики
-            "\U0001F300-\U0001F5FF"  # символы и пиктограммы
-            "\U0001F680-\U0001F6FF"  # транспорт и символы карт
-            "\U0001F700-\U0001F77F"  # алхимические символы
-            "\U0001F780-\U0001F7FF"  # геометрические фигуры
-            "\U0001F800-\U0001F8FF"  # дополнительные стрелки
-            "\U0001F900-\U0001F9FF"  # дополнительные символы и пиктограммы
-            "\U0001FA00-\U0001FA6F"  # символы шахмат
-            "\U0001FA70-\U0001FAFF"  # символы эмодзи
-            "\U00002702-\U000027B0"  # разные символы
-            "\U000024C2-\U0001F251" 
-            "]+", flags=re.UNICODE)
-        
-        text = emoji_pattern.sub(r'', text)
-        
-        # Удаление лишних пробелов
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        return clean_text(text)
     
     def export_posts_to_excel(self, posts: List[Post], output_file: str, include_analysis: bool = True) -> int:
         """
@@ -72,21 +121,22 @@ class ExportService:
         try:
             logger.info(f"Экспорт {len(posts)} постов в файл: {output_file}")
             
-            # Подготовка данных для экспорта
+            # Подготовка данных для экспорта (имена объектов - одним запросом на все посты)
+            object_names = self.object_service.get_object_names_batch(post.object_ids for post in posts)
             posts_data = []
             for post in posts:
                 # Базовые данные поста
                 post_dict = {
                     "post_id": post.post_id,
                     "title": post.title,
-                    "content": self.clean_html_and_emoji(post.content),
+                    "content": post.content,
                     "blog_host": post.blog_host,
                     "blog_host_type": post.blog_host_type.name if post.blog_host_type else "OTHER",
                     "published_on": post.published_on,
                     "simhash": post.simhash,
                     "url": post.url,
                     "object_ids": post.object_ids,
-                    "object": self.object_service.get_object_names(post.object_ids)
+                    "object": object_names[post.object_ids]
                 }
                 
                 # Если требуется включить результаты анализа
@@ -104,6 +154,10 @@ class ExportService:
             # Создаем DataFrame
             df = pd.DataFrame(posts_data)
             
+            # Контент очищается одним пакетом для всего столбца
+            if 'content' in df.columns:
+                df['content'] = clean_series(df['content'])
+            
             # Обработка столбца published_on: разделение на дату и время
             if 'published_on' in df.columns and not df['published_on'].empty:
                 # Создаем отдельные столбцы для даты и времени
@@ -111,18 +165,7 @@ class ExportService:
                 df['time'] = df['published_on'].dt.time
             
             # Упорядочиваем колонки для лучшей читаемости
-            if include_analysis:
-                columns_order = [
-                    "post_id", "title", "lmm_title", "tonality", "description",
-                    "published_on", "date", "time", "blog_host", "blog_host_type", 
-                    "url", "content", "object_ids", "object", "simhash",
-                    "analyzed_at", "model_used"
-                ]
-            else:
-                columns_order = [
-                    "post_id", "title", "published_on", "date", "time", "blog_host", "blog_host_type", 
-                    "url", "content", "object_ids", "object", "simhash"
-                ]
+            columns_order = self.ANALYSIS_COLUMNS if include_analysis else self.POST_COLUMNS
             
             # Переупорядочиваем колонки, если они есть в DataFrame
             existing_columns = [col for col in columns_order if col in df.columns]
@@ -139,4 +182,486 @@ class ExportService:
         except Exception as e:
             logger.error(f"Ошибка при экспорте в Excel: {e}")
             logger.error(traceback.format_exc())
-            raise
\ No newline at end of file
+            raise
+    
+    def iter_export_chunks(self, query, include_analysis: bool = True,
+                           chunk_size: Optional[int] = None) -> Iterator[Dict[str, List]]:
+        """
+        Порционная выгрузка постов для экспорта без загрузки всей выборки в память.
+        
+        Из БД выбираются только нужные колонки (без ORM-объектов) порциями
+        по chunk_size строк (yield_per, на PostgreSQL - серверный курсор);
+        контент каждой порции очищается одним пакетом.
+        
+        Args:
+            query: Запрос постов с фильтрами (при include_analysis - с outerjoin(PostAnalysis)).
+            include_analysis: Включать ли результаты анализа.
+            chunk_size: Количество строк в порции (по умолчанию EXPORT_CHUNK_SIZE).
+            
+        Yields:
+            Dict[str, List]: Значения колонок export_columns для строк порции.
+        """
+        chunk_size = chunk_size or current_app.config.get('EXPORT_CHUNK_SIZE', 1000)
+        entities = [
+            Post.post_id, Post.title, Post.content, Post.blog_host, Post.blog_host_type,
+            Post.published_on, Post.simhash, Post.url, Post.object_ids,
+        ]
+        if include_analysis:
+            entities += [
+                PostAnalysis.id.label('analysis_id'), PostAnalysis.lmm_title, PostAnalysis.tonality,
+                PostAnalysis.description, PostAnalysis.analyzed_at, PostAnalysis.model_used,
+            ]
+        
+        chunk = []
+        for row in query.with_entities(*entities).yield_per(chunk_size):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield self._format_chunk(chunk, include_analysis)
+                chunk = []
+        if chunk:
+            yield self._format_chunk(chunk, include_analysis)
+    
+    def iter_export_rows(self, query, include_analysis: bool = True,
+                         chunk_size: Optional[int] = None) -> Iterator[Tuple]:
+        """
+        Построчная выгрузка постов для экспорта (см. iter_export_chunks).
+        
+        Yields:
+            Tuple: Значения строки в порядке колонок export_columns.
+        """
+        columns = self.export_columns(include_analysis)
+        for chunk in self.iter_export_chunks(query, include_analysis, chunk_size):
+            yield from zip(*(chunk[column] for column in columns))
+    
+    def export_columns(self, include_analysis: bool = True) -> List[str]:
+        """Возвращает колонки выгрузки."""
+        return self.ANALYSIS_COLUMNS if include_analysis else self.POST_COLUMNS
+    
+    def _object_names(self, object_ids_list: List[Optional[str]]) -> List[str]:
+        """Имена объектов для порции строк (новые наборы ID разрешаются одним запросом на порцию)."""
+        missing = {object_ids for object_ids in object_ids_list if object_ids not in self._object_names_cache}
+        if missing:
+            self._object_names_cache.update(self.object_service.get_object_names_batch(missing))
+        return [self._object_names_cache[object_ids] for object_ids in object_ids_list]
+    
+    def _format_chunk(self, rows: List, include_analysis: bool) -> Dict[str, List]:
+        """Преобразует порцию строк запроса в колонки выгрузки."""
+        published = [row.published_on for row in rows]
+        chunk = {
+            "post_id": [row.post_id for row in rows],
+            "title": [row.title for row in rows],
+            "content": clean_texts(row.content for row in rows),
+            "blog_host": [row.blog_host for row in rows],
+            "blog_host_type": [row.blog_host_type.name if row.blog_host_type else "OTHER" for row in rows],
+            "published_on": published,
+            "date": [value.date() if value else None for value in published],
+            "time": [value.time() if value else None for value in published],
+            "simhash": [row.simhash for row in rows],
+            "url": [row.url for row in rows],
+            "object_ids": [row.object_ids for row in rows],
+            "object": self._object_names([row.object_ids for row in rows]),
+        }
+        if include_analysis:
+            # Колонки анализа пустые у постов без анализа (outer join)
+            chunk.update({
+                "lmm_title": [row.lmm_title for row in rows],
+                "tonality": [
+                    (row.tonality.value if row.tonality else "неизвестно") if row.analysis_id is not None else None
+                    for row in rows
+                ],
+                "description": [row.description for row in rows],
+                "analyzed_at": [row.analyzed_at for row in rows],
+                "model_used": [row.model_used for row in rows],
+            })
+        return chunk
+    
+    def build_query(self, params: Dict[str, Any]):
+        """
+        Строит запрос постов для выгрузки по параметрам фильтра.
+        
+        Args:
+            params: Параметры фильтра (search_query, tonality, object_id,
+                date_from, date_to в формате YYYY-MM-DD, include_analysis).
+                
+        Returns:
+            Query: Запрос постов, отсортированный по дате публикации (сначала новые;
+                при поиске - после релевантности).
+        """
+        # Результаты анализа присоединяются к выгрузке (посты без анализа тоже выгружаются)
+        return PostFilter().build_query(params, include_analysis=params.get('include_analysis', True))
+    
+    def data_version(self) -> str:
+        """
+        Возвращает версию данных для выгрузки.
+        
+        Версия меняется при добавлении, изменении и удалении постов и
+        результатов анализа.
+        
+        Returns:
+            str: Строка версии данных.
+        """
+        posts = db.session.query(db.func.count(Post.id), db.func.max(Post.updated_at)).one()
+        analyses = db.session.query(db.func.count(PostAnalysis.id), db.func.max(PostAnalysis.analyzed_at)).one()
+        return '|'.join(str(value) for value in (*posts, *analyses))
+    
+    def export_key(self, params: Dict[str, Any], export_format: str) -> str:
+        """
+        Вычисляет ключ файла выгрузки.
+        
+        Args:
+            params: Параметры фильтра.
+            export_format: Формат файла (xlsx или csv).
+            
+        Returns:
+            str: SHA-256 параметров, формата и версии данных.
+        """
+        payload = json.dumps({'params': params, 'format': export_format, 'data_version': self.data_version()},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    @classmethod
+    def available_formats(cls) -> List[str]:
+        """Возвращает форматы выгрузки, доступные в текущем окружении."""
+        return [export_format for export_format in cls.EXPORT_FORMATS
+                if pa is not None or export_format not in cls.COLUMNAR_FORMATS]
+    
+    def start_export(self, params: Dict[str, Any], export_format: str = 'xlsx') -> ExportJob:
+        """
+        Запускает фоновую выгрузку или возвращает уже готовую.
+        
+        Если файл для тех же параметров и той же версии данных уже сформирован
+        и лежит на диске, новая выгрузка не запускается. Выполняющаяся
+        выгрузка с тем же ключом тоже переиспользуется.
+        
+        Args:
+            params: Параметры фильтра.
+            export_format: Формат файла (xlsx, csv, parquet или arrow).
+            
+        Returns:
+            ExportJob: Выгрузка.
+            
+        Raises:
+            ValueError: Формат Parquet/Arrow запрошен без установленного pyarrow.
+        """
+        export_format = export_format if export_format in self.EXPORT_FORMATS else 'xlsx'
+        if export_format not in self.available_formats():
+            raise ValueError("Для выгрузки в Parquet/Arrow требуется пакет pyarrow")
+        key = self.export_key(params, export_format)
+        job = ExportJob.query.filter_by(key=key).first()
+        
+        if job is not None:
+            if job.status == ExportStatus.DONE and job.file_path and os.path.exists(job.file_path):
+                logger.info(f"Выгрузка {job.id} уже сформирована, используется файл {job.file_path}")
+                job.last_accessed_at = datetime.utcnow()
+                db.session.commit()
+                return job
+            if job.status in (ExportStatus.PENDING, ExportStatus.RUNNING):
+                logger.info(f"Выгрузка {job.id} уже выполняется")
+                return job
+        else:
+            job = ExportJob(key=key, params=json.dumps(params, ensure_ascii=False), export_format=export_format)
+            db.session.add(job)
+        
+        job.status = ExportStatus.PENDING
+        job.error = None
+        job.processed_rows = 0
+        job.total_rows = 0
+        job.file_path = None
+        job.file_size = 0
+        job.last_accessed_at = datetime.utcnow()
+        db.session.commit()
+        
+        task = export_posts_task.delay(job.id)
+        job.task_id = task.id
+        db.session.commit()
+        logger.info(f"Запущена выгрузка {job.id} ({export_format})")
+        return job
+    
+    def run_export(self, job: ExportJob):
+        """
+        Формирует файл выгрузки с обновлением прогресса.
+        
+        Файл пишется во временный и переименовывается после записи последней
+        строки, поэтому недописанный файл никогда не отдается клиенту.
+        
+        Args:
+            job: Выгрузка.
+        """
+        params = json.loads(job.params)
+        include_analysis = params.get('include_analysis', True)
+        query = self.build_query(params)
+        
+        job.status = ExportStatus.RUNNING
+        job.total_rows = query.order_by(None).count()
+        db.session.commit()
+        
+        export_dir = current_app.config['EXPORT_DIRECTORY']
+        os.makedirs(export_dir, exist_ok=True)
+        path = os.path.join(export_dir, f"export_{job.key[:16]}.{job.export_format}")
+        fd, tmp_path = tempfile.mkstemp(suffix=f'.{job.export_format}.tmp', dir=export_dir)
+        os.close(fd)
+        
+        on_progress = self._progress_writer(job)
+        
+        try:
+            count = self.write_export(query, include_analysis, job.export_format, tmp_path, on_progress)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        job.status = ExportStatus.DONE
+        job.processed_rows = count
+        job.file_path = path
+        job.file_size = os.path.getsize(path)
+        job.finished_at = datetime.utcnow()
+        job.last_accessed_at = job.finished_at
+        db.session.commit()
+        logger.info(f"Выгрузка {job.id} завершена: {count} записей, {job.file_size} байт")
+    
+    @staticmethod
+    def _progress_writer(job: ExportJob) -> Callable[[int], None]:
+        """
+        Возвращает функцию сохранения прогресса выгрузки.
+        
+        Выгрузка читается потоком (yield_per), на PostgreSQL - из серверного
+        курсора, который закрылся бы при коммите сессии, поэтому прогресс
+        пишется отдельным соединением. В SQLite курсоров на сервере нет, а
+        запись из другого соединения ждала бы окончания чтения, поэтому
+        прогресс коммитится в сессии.
+        
+        Args:
+            job: Выгрузка.
+            
+        Returns:
+            Callable[[int], None]: Функция, принимающая количество записанных строк.
+        """
+        if db.engine.dialect.name == 'sqlite':
+            def on_progress(count):
+                job.processed_rows = count
+                db.session.commit()
+            return on_progress
+        
+        jobs_table = ExportJob.__table__
+        
+        def on_progress(count):
+            with db.engine.begin() as connection:
+                connection.execute(
+                    jobs_table.update().where(jobs_table.c.id == job.id).values(processed_rows=count)
+                )
+        return on_progress
+    
+    def write_export(self, query, include_analysis: bool, export_format: str, path: str,
+                     on_progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Записывает выгрузку в файл.
+        
+        Args:
+            query: Запрос постов с фильтрами.
+            include_analysis: Включать ли результаты анализа.
+            export_format: Формат файла (xlsx, csv, parquet или arrow).
+            path: Путь к файлу.
+            on_progress: Вызывается с количеством записанных строк после каждой порции.
+            
+        Returns:
+            int: Количество записанных строк.
+        """
+        chunks = self.iter_export_chunks(query, include_analysis)
+        return self.write_chunks(chunks, self.export_columns(include_analysis), export_format, path, on_progress)
+    
+    @classmethod
+    def write_chunks(cls, chunks: Iterable[Dict[str, List]], columns: List[str], export_format: str,
+                     path: str, on_progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Записывает порции колонок в файл заданного формата.
+        
+        Args:
+            chunks: Порции выгрузки (колонка - список значений).
+            columns: Колонки в порядке записи.
+            export_format: Формат файла (xlsx, csv, parquet или arrow).
+            path: Путь к файлу.
+            on_progress: Вызывается с количеством записанных строк после каждой порции.
+            
+        Returns:
+            int: Количество записанных строк.
+        """
+        writers = {
+            'csv': cls._write_csv,
+            'xlsx': cls._write_excel,
+            'parquet': cls._write_parquet,
+            'arrow': cls._write_arrow,
+        }
+        return writers[export_format](chunks, columns, path, on_progress or (lambda count: None))
+    
+    @staticmethod
+    def _write_csv(chunks, columns, path, on_progress) -> int:
+        """Построчная запись в CSV (UTF-8 с BOM для Excel)."""
+        count = 0
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for chunk in chunks:
+                rows = list(zip(*(chunk[column] for column in columns)))
+                writer.writerows(rows)
+                count += len(rows)
+                on_progress(count)
+        return count
+    
+    @staticmethod
+    def _write_excel(chunks, columns, path, on_progress) -> int:
+        """
+        Построчная запись в Excel.
+        
+        Книга создается в режиме write-only: openpyxl не хранит строки в
+        памяти, а сразу пишет их на диск.
+        """
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Sheet1')
+        sheet.append(columns)
+        
+        count = 0
+        for chunk in chunks:
+            for row in zip(*(chunk[column] for column in columns)):
+                # Управляющие символы недопустимы в XML ячеек
+                sheet.append([ILLEGAL_CHARACTERS_RE.sub('', value) if isinstance(value, str) else value
+                              for value in row])
+                count += 1
+            on_progress(count)
+        workbook.save(path)
+        return count
+    
+    @classmethod
+    def _write_parquet(cls, chunks, columns, path, on_progress) -> int:
+        """Запись в Parquet (сжатие zstd, группы строк по COLUMNAR_ROW_GROUP_SIZE)."""
+        schema = cls._arrow_schema(columns)
+        with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+            return cls._write_columnar(chunks, schema, writer.write_table, on_progress)
+    
+    @classmethod
+    def _write_arrow(cls, chunks, columns, path, on_progress) -> int:
+        """Запись в файл Arrow IPC (Feather v2, сжатие zstd)."""
+        schema = cls._arrow_schema(columns)
+        options = pa.ipc.IpcWriteOptions(compression='zstd')
+        with pa.ipc.new_file(path, schema, options=options) as writer:
+            return cls._write_columnar(chunks, schema, writer.write_table, on_progress)
+    
+    @classmethod
+    def _write_columnar(cls, chunks, schema, write_table, on_progress) -> int:
+        """Собирает порции в группы строк и передает их писателю Arrow."""
+        count = 0
+        pending = []
+        pending_rows = 0
+        for chunk in chunks:
+            batch = cls._arrow_batch(chunk, schema)
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows >= cls.COLUMNAR_ROW_GROUP_SIZE:
+                write_table(pa.Table.from_batches(pending, schema))
+                count += pending_rows
+                pending, pending_rows = [], 0
+                on_progress(count)
+        if pending:
+            write_table(pa.Table.from_batches(pending, schema))
+            count += pending_rows
+            on_progress(count)
+        return count
+    
+    @classmethod
+    def _arrow_schema(cls, columns: List[str]):
+        """
+        Типизированная схема Arrow для колонок выгрузки.
+        
+        Даты - временные метки, тональность и тип блога - словарные колонки
+        с фиксированным словарем (одинаковым во всех группах строк).
+        """
+        if pa is None:
+            raise RuntimeError("Для выгрузки в Parquet/Arrow требуется пакет pyarrow")
+        types = {
+            'published_on': pa.timestamp('us'),
+            'analyzed_at': pa.timestamp('us'),
+            'date': pa.date32(),
+            'time': pa.time64('us'),
+            'tonality': pa.dictionary(pa.int8(), pa.string()),
+            'blog_host_type': pa.dictionary(pa.int8(), pa.string()),
+        }
+        return pa.schema([(column, types.get(column, pa.string())) for column in columns])
+    
+    @classmethod
+    def _arrow_batch(cls, chunk: Dict[str, List], schema):
+        """Преобразует порцию колонок в RecordBatch по схеме."""
+        arrays = []
+        for field in schema:
+            values = chunk[field.name]
+            categories = cls.CATEGORIES.get(field.name)
+            if categories is not None:
+                index = {category: i for i, category in enumerate(categories)}
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array([index.get(value) for value in values], type=pa.int8()),
+                    pa.array(categories, type=pa.string()),
+                ))
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+    
+    def cleanup_exports(self, retention_hours: Optional[int] = None,
+                        max_total_mb: Optional[int] = None) -> Dict[str, int]:
+        """
+        Удаляет старые файлы выгрузок.
+        
+        Удаляются файлы, к которым не обращались дольше retention_hours, затем,
+        если суммарный размер превышает max_total_mb, - давно не
+        использовавшиеся файлы. Файлы export_* без записи о выгрузке (в том
+        числе от прежних синхронных выгрузок) удаляются по времени изменения.
+        
+        Args:
+            retention_hours: Время хранения файла с последнего обращения (по умолчанию EXPORT_RETENTION_HOURS).
+            max_total_mb: Максимальный суммарный размер файлов (по умолчанию EXPORT_MAX_TOTAL_MB).
+            
+        Returns:
+            Dict[str, int]: Количество удаленных файлов и освобожденных байт.
+        """
+        retention_hours = retention_hours or current_app.config.get('EXPORT_RETENTION_HOURS', 24)
+        max_total_mb = max_total_mb or current_app.config.get('EXPORT_MAX_TOTAL_MB', 1024)
+        cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+        stats = {'removed': 0, 'freed': 0}
+        
+        jobs = (ExportJob.query
+                .filter(ExportJob.status == ExportStatus.DONE)
+                .order_by(ExportJob.last_accessed_at.asc())
+                .all())
+        total_size = sum(job.file_size or 0 for job in jobs)
+        
+        for job in jobs:
+            if job.last_accessed_at and job.last_accessed_at >= cutoff and total_size <= max_total_mb * 1024 * 1024:
+                continue
+            total_size -= job.file_size or 0
+            stats['freed'] += self._remove_file(job.file_path)
+            stats['removed'] += 1
+            job.status = ExportStatus.EXPIRED
+            job.file_path = None
+        db.session.commit()
+        
+        # Файлы без записи о выгрузке и брошенные временные файлы
+        export_dir = current_app.config['EXPORT_DIRECTORY']
+        known = {job.file_path for job in jobs if job.file_path}
+        if os.path.isdir(export_dir):
+            for name in os.listdir(export_dir):
+                path = os.path.join(export_dir, name)
+                if path in known or not (name.startswith('export_') or name.endswith('.tmp')):
+                    continue
+                if datetime.utcfromtimestamp(os.path.getmtime(path)) < cutoff:
+                    stats['freed'] += self._remove_file(path)
+                    stats['removed'] += 1
+        
+        logger.info(f"Очистка выгрузок: удалено файлов {stats['removed']}, освобождено {stats['freed']} байт")
+        return stats
+    
+    @staticmethod
+    def _remove_file(path: Optional[str]) -> int:
+        """Удаляет файл и возвращает его размер (0, если файла нет)."""
+        if not path or not os.path.exists(path):
+            return 0
+        size = os.path.getsize(path)
+        os.remove(path)
+        return size
@@ -0,0 +1,326 @@
+import math
+import traceback
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from loguru import logger
+from flask import current_app
+from celery_app import celery
+
+from models.database import db
+from models.ingestion_model import IngestionSlice, SliceStatus, SyncState
+from services.mlg_service import MlgService
+
+MSK = ZoneInfo('Europe/Moscow')
+UTC = ZoneInfo('UTC')
+
+@celery.task(name='ingest_slice_task', bind=True, max_retries=3, default_retry_delay=30)
+def ingest_slice_task(self, slice_id):
+    """
+    Celery-задача загрузки одного временного среза постов.
+
+    При ошибке срез помечается как ошибочный и перезапускается отдельно
+    от остальных срезов с экспоненциальной задержкой.
+
+    Args:
+        slice_id: ID среза загрузки.
+
+    Returns:
+        Dict[str, int]: Количество вставленных, обновленных и неизмененных постов.
+    """
+    ingestion_slice = db.session.get(IngestionSlice, slice_id)
+    if ingestion_slice is None:
+        logger.warning(f"Срез загрузки {slice_id} не найден")
+        return {}
+
+    if ingestion_slice.status == SliceStatus.DONE:
+        logger.info(f"Срез загрузки {slice_id} уже загружен, пропускаем")
+        return {}
+
+    ingestion_slice.status = SliceStatus.RUNNING
+    ingestion_slice.attempts = (ingestion_slice.attempts or 0) + 1
+    ingestion_slice.task_id = self.request.id
+    db.session.commit()
+
+    try:
+        logger.info(f"Загрузка среза {ingestion_slice}")
+
+        mlg_service = MlgService()
+        stats = mlg_service.ingest_posts(
+            ingestion_slice.report_id,
+            ingestion_slice.date_from.replace(tzinfo=UTC),
+            ingestion_slice.date_to.replace(tzinfo=UTC),
+        )
+
+        ingestion_slice.status = SliceStatus.DONE
+        ingestion_slice.error = None
+        ingestion_slice.inserted = stats['inserted']
+        ingestion_slice.updated = stats['updated']
+        ingestion_slice.unchanged = stats['unchanged']
+        db.session.commit()
+
+        return stats
+    except Exception as e:
+        logger.error(f"Ошибка при загрузке среза {slice_id}: {e}")
+        logger.error(traceback.format_exc())
+        db.session.rollback()
+
+        ingestion_slice.status = SliceStatus.FAILED
+        ingestion_slice.error = str(e)
+        db.session.commit()
+
+        raise self.retry(exc=e, countdown=self.default_retry_delay * 2 ** self.request.retries)
+
+
+@celery.task(name='sync_report_task')
+def sync_report_task(report_id):
+    """
+    Celery-задача инкрементальной синхронизации отчета (для периодического запуска).
+
+    Args:
+        report_id: ID отчета в Медиалогии.
+
+    Returns:
+        Dict[str, Any]: Результаты синхронизации.
+    """
+    try:
+        return IngestionService().sync_incremental(report_id)
+    except Exception as e:
+        logger.error(f"Ошибка при синхронизации отчета {report_id}: {e}")
+        logger.error(traceback.format_exc())
+        return {}
+
+
+class IngestionService:
+    """Сервис планирования загрузки постов из Медиалогии временными срезами."""
+
+    def __init__(self, max_posts_per_slice=None):
+        """
+        Инициализация сервиса.
+
+        Args:
+            max_posts_per_slice: Максимальное ожидаемое количество постов в одном срезе.
+        """
+        self.max_posts_per_slice = max_posts_per_slice or current_app.config.get('MEDIALOGIA_SLICE_MAX_POSTS', 2000)
+
+    def plan_slices(self, stats: List[Tuple[Any, int]], date_from: datetime,
+                    date_to: datetime) -> List[Dict[str, Any]]:
+        """
+        Разбивает период на срезы по дням, а загруженные дни - по часам.
+
+        Дни без постов по статистике пропускаются. Если статистика не содержит
+        дат, период разбивается на дни без учета количества постов.
+
+        Args:
+            stats: Статистика постов по дням из GetPostsStatsByDate.
+            date_from: Начальная дата периода.
+            date_to: Конечная дата периода.
+
+        Returns:
+            List[Dict[str, Any]]: Срезы с ключами date_from, date_to (UTC) и expected_posts.
+        """
+        date_from = self._as_msk(date_from)
+        date_to = self._as_msk(date_to)
+
+        # Количество постов по календарным дням (по московскому времени)
+        counts: Optional[Dict] = {}
+        for day, posts_count in stats:
+            if day is None:
+                counts = None
+                break
+            day = day.date() if isinstance(day, datetime) else day
+            counts[day] = counts.get(day, 0) + (posts_count or 0)
+
+        slices = []
+        day_start = date_from.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        while day_start <= date_to:
+            next_day = day_start + timedelta(days=1)
+            start = max(day_start, date_from)
+            end = min(next_day - timedelta(seconds=1), date_to)
+            posts_count = counts.get(day_start.date(), 0) if counts is not None else 0
+
+            if counts is not None and posts_count == 0:
+                day_start = next_day
+                continue
+
+            # Разбиваем загруженный день на часовые срезы
+            parts = max(1, math.ceil(posts_count / self.max_posts_per_slice))
+            step = timedelta(hours=max(1, math.ceil(24 / parts)))
+
+            part_start = start
+            while part_start <= end:
+                part_end = min(part_start.replace(minute=0, second=0, microsecond=0) + step - timedelta(seconds=1), end)
+                slices.append({
+                    'date_from': self._as_utc_naive(part_start),
+                    'date_to': self._as_utc_naive(part_end),
+                    'expected_posts': posts_count // parts,
+                })
+                part_start = part_end + timedelta(seconds=1)
+
+            day_start = next_day
+
+        logger.info(f"Запланировано {len(slices)} срезов загрузки")
+        return slices
+
+    def start_backfill(self, report_id: str, date_from: datetime, date_to: datetime) -> Dict[str, int]:
+        """
+        Планирует срезы за период и запускает их загрузку отдельными задачами.
+
+        Уже загруженные срезы того же периода повторно не запускаются.
+
+        Args:
+            report_id: ID отчета в Медиалогии.
+            date_from: Начальная дата периода.
+            date_to: Конечная дата периода.
+
+        Returns:
+            Dict[str, int]: Количество срезов, запущенных задач и пропущенных срезов.
+        """
+        mlg_service = MlgService()
+        stats = mlg_service.get_posts_stats(report_id, date_from, date_to)
+        planned = self.plan_slices(stats, date_from, date_to)
+        if not planned:
+            return {'slices': 0, 'dispatched': 0, 'skipped': 0}
+
+        existing = {
+            (s.date_from, s.date_to): s
+            for s in IngestionSlice.query.filter(
+                IngestionSlice.report_id == report_id,
+                IngestionSlice.date_from >= planned[0]['date_from'],
+                IngestionSlice.date_to <= planned[-1]['date_to'],
+            )
+        }
+
+        slices = []
+        for plan in planned:
+            ingestion_slice = existing.get((plan['date_from'], plan['date_to']))
+            if ingestion_slice is None:
+                ingestion_slice = IngestionSlice(report_id=report_id, **plan)
+                db.session.add(ingestion_slice)
+            else:
+                ingestion_slice.expected_posts = plan['expected_posts']
+            slices.append(ingestion_slice)
+        db.session.commit()
+
+        result = self._dispatch(slices)
+        result['slices'] = len(slices)
+        return result
+
+    def sync_incremental(self, report_id: str, date_to: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Загружает только новые посты отчета, начиная с сохраненной отметки.
+
+        Период начинается с даты публикации последнего загруженного поста
+        (с небольшим перекрытием для постов, проиндексированных с опозданием).
+        Отметка сдвигается только после успешной загрузки всего периода.
+
+        Args:
+            report_id: ID отчета в Медиалогии.
+            date_to: Конечная дата периода (по умолчанию текущее время).
+
+        Returns:
+            Dict[str, Any]: Период синхронизации и количество вставленных, обновленных и неизмененных постов.
+        """
+        state = SyncState.query.filter_by(report_id=report_id).first()
+        if state is None:
+            state = SyncState(report_id=report_id)
+            db.session.add(state)
+
+        date_to = date_to or datetime.now(UTC)
+        if state.last_published_on:
+            overlap = timedelta(minutes=current_app.config.get('MEDIALOGIA_SYNC_OVERLAP_MINUTES', 10))
+            date_from = state.last_published_on.replace(tzinfo=MSK) - overlap
+        else:
+            lookback = timedelta(hours=current_app.config.get('MEDIALOGIA_SYNC_LOOKBACK_HOURS', 24))
+            date_from = date_to - lookback
+
+        logger.info(f"Инкрементальная синхронизация отчета {report_id}: {date_from} - {date_to}")
+
+        stats = MlgService().ingest_posts(report_id, date_from, date_to)
+
+        if stats['max_published_on'] and (
+                state.last_published_on is None or stats['max_published_on'] > state.last_published_on):
+            state.last_published_on = stats['max_published_on']
+        state.last_synced_at = datetime.utcnow()
+        state.inserted = stats['inserted']
+        state.updated = stats['updated']
+        state.unchanged = stats['unchanged']
+        db.session.commit()
+
+        logger.info(f"Синхронизация отчета {report_id} завершена, отметка: {state.last_published_on}")
+        return dict(stats, date_from=date_from, date_to=date_to)
+
+    def resume_backfill(self, report_id: str) -> Dict[str, int]:
+        """
+        Перезапускает все незавершенные срезы отчета.
+
+        Args:
+            report_id: ID отчета в Медиалогии.
+
+        Returns:
+            Dict[str, int]: Количество запущенных задач и пропущенных срезов.
+        """
+        slices = IngestionSlice.query.filter(
+            IngestionSlice.report_id == report_id,
+            IngestionSlice.status != SliceStatus.DONE,
+        ).all()
+        return self._dispatch(slices)
+
+    def get_progress(self, report_id: str) -> Dict[str, int]:
+        """
+        Возвращает количество срезов отчета в каждом статусе.
+
+        Args:
+            report_id: ID отчета в Медиалогии.
+
+        Returns:
+            Dict[str, int]: Словарь, где ключ - статус среза, значение - количество срезов.
+        """
+        progress = {status.name: 0 for status in SliceStatus}
+        rows = db.session.query(
+            IngestionSlice.status,
+            db.func.count(IngestionSlice.id)
+        ).filter(IngestionSlice.report_id == report_id).group_by(IngestionSlice.status).all()
+
+        for status, count in rows:
+            progress[status.name] = count
+        return progress
+
+    def _dispatch(self, slices: List[IngestionSlice]) -> Dict[str, int]:
+        """Запускает задачи загрузки для незавершенных срезов."""
+        pending = [ingestion_slice for ingestion_slice in slices if ingestion_slice.status != SliceStatus.DONE]
+        skipped = len(slices) - len(pending)
+
+        # Статус сохраняется до запуска задач: иначе коммит мог бы перезаписать
+        # статус, уже выставленный задачей (RUNNING или DONE)
+        for ingestion_slice in pending:
+            ingestion_slice.status = SliceStatus.PENDING
+        db.session.commit()
+
+        slice_ids = [ingestion_slice.id for ingestion_slice in pending]
+        for slice_id in slice_ids:
+            task = ingest_slice_task.delay(slice_id)
+            # ID задачи записывается, только пока срез не взят в работу
+            IngestionSlice.query.filter(
+                IngestionSlice.id == slice_id,
+                IngestionSlice.status == SliceStatus.PENDING,
+            ).update({'task_id': task.id}, synchronize_session=False)
+            db.session.commit()
+
+        dispatched = len(slice_ids)
+        logger.info(f"Запущено задач загрузки срезов: {dispatched}, пропущено загруженных: {skipped}")
+        return {'dispatched': dispatched, 'skipped': skipped}
+
+    @staticmethod
+    def _as_msk(value: datetime) -> datetime:
+        """Приводит дату к московскому времени (наивные даты считаются московскими)."""
+        if value.tzinfo is None:
+            return value.replace(tzinfo=MSK)
+        return value.astimezone(MSK)
+
+    @staticmethod
+    def _as_utc_naive(value: datetime) -> datetime:
+        """Приводит дату к UTC без временной зоны для хранения в БД."""
+        return value.astimezone(UTC).replace(tzinfo=None)
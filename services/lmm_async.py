@@ -0,0 +1,214 @@
+import asyncio
+import random
+import threading
+import time
+import traceback
+from typing import List, Dict, Optional, Callable
+
+import aiohttp
+from loguru import logger
+from flask import current_app
+
+# Ограничители частоты запросов процесса (ключ - API ключ)
+_rate_limiters: Dict[str, 'RateLimiter'] = {}
+_rate_limiters_lock = threading.Lock()
+
+class RateLimiter:
+    """Ограничитель частоты запросов на один API ключ (token bucket)."""
+
+    def __init__(self, requests_per_minute: int):
+        """
+        Инициализация ограничителя.
+
+        Args:
+            requests_per_minute: Максимальное количество запросов в минуту.
+        """
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, requests_per_minute // 6)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Забирает токен, если он есть; иначе возвращает время ожидания в секундах."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        """Ожидает, пока запрос можно отправить без превышения лимита."""
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+def get_rate_limiter(api_key: str, requests_per_minute: int) -> Optional[RateLimiter]:
+    """
+    Возвращает общий для процесса ограничитель частоты для API ключа.
+
+    Args:
+        api_key: API ключ OpenRouter.
+        requests_per_minute: Лимит запросов в минуту (0 - без ограничения).
+
+    Returns:
+        Optional[RateLimiter]: Ограничитель или None, если лимит не задан.
+    """
+    if not requests_per_minute:
+        return None
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(api_key)
+        if limiter is None:
+            limiter = RateLimiter(requests_per_minute)
+            _rate_limiters[api_key] = limiter
+    return limiter
+
+
+class AsyncLmmEngine:
+    """
+    Асинхронный движок анализа: держит несколько запросов к OpenRouter
+    одновременно в рамках одного воркера.
+
+    Промпты и разбор ответов берутся из LmmService, запросы идут через общий
+    пул соединений aiohttp с ограничением частоты на API ключ и повторными
+    попытками с экспоненциальной задержкой и случайным разбросом.
+    """
+
+    # Коды ответа, после которых запрос имеет смысл повторить
+    RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+    def __init__(self, lmm_service, concurrency=None, requests_per_minute=None,
+                 max_retries=None, base_delay=None, max_delay=60):
+        """
+        Инициализация движка.
+
+        Args:
+            lmm_service: Экземпляр LmmService (промпты, разбор ответов, параметры API).
+            concurrency: Максимальное количество одновременных запросов.
+            requests_per_minute: Лимит запросов в минуту на API ключ (0 - без лимита).
+            max_retries: Максимальное количество попыток запроса.
+            base_delay: Базовая задержка перед повтором в секундах.
+            max_delay: Максимальная задержка перед повтором в секундах.
+        """
+        self.lmm = lmm_service
+        self.concurrency = concurrency or current_app.config.get('LMM_CONCURRENCY', 4)
+        self.requests_per_minute = requests_per_minute if requests_per_minute is not None \
+            else current_app.config.get('LMM_REQUESTS_PER_MINUTE', 0)
+        self.max_retries = max_retries or lmm_service.max_retries
+        self.base_delay = base_delay or lmm_service.retry_delay
+        self.max_delay = max_delay
+
+    def run(self, batches: List[List[Dict]],
+            on_batch_done: Optional[Callable[[List[Dict], List[Dict]], None]] = None) -> List[List[Dict]]:
+        """
+        Синхронная обертка для запуска анализа из Celery-задачи.
+
+        Args:
+            batches: Список батчей постов.
+            on_batch_done: Функция, вызываемая с (батч, результаты) по завершении каждого батча.
+
+        Returns:
+            List[List[Dict]]: Результаты анализа для каждого батча (в порядке батчей).
+        """
+        return asyncio.run(self.analyze_batches(batches, on_batch_done))
+
+    async def analyze_batches(self, batches: List[List[Dict]],
+                              on_batch_done: Optional[Callable[[List[Dict], List[Dict]], None]] = None
+                              ) -> List[List[Dict]]:
+        """
+        Анализирует батчи, держа до concurrency запросов одновременно.
+
+        Args:
+            batches: Список батчей постов.
+            on_batch_done: Функция, вызываемая с (батч, результаты) по завершении каждого батча.
+
+        Returns:
+            List[List[Dict]]: Результаты анализа для каждого батча (в порядке батчей).
+        """
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = get_rate_limiter(self.lmm.api_key, self.requests_per_minute)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        # Результаты батчей сохраняются по одному: у потоков записи общая сессия БД
+        done_lock = asyncio.Lock()
+
+        async with aiohttp.ClientSession(connector=connector, headers=self.lmm._build_headers()) as session:
+            async def analyze(batch):
+                async with semaphore:
+                    results = await self._analyze_batch(session, limiter, batch)
+                if on_batch_done is not None:
+                    try:
+                        # Синхронная запись в БД выполняется в потоке, чтобы не останавливать
+                        # цикл событий с остальными запросами (контекст приложения копируется в поток)
+                        async with done_lock:
+                            await asyncio.to_thread(on_batch_done, batch, results)
+                    except Exception as e:
+                        logger.error(f"Ошибка при обработке результатов батча: {e}")
+                        logger.error(traceback.format_exc())
+                return results
+
+            all_results = await asyncio.gather(*(analyze(batch) for batch in batches))
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Асинхронно проанализировано {len(batches)} батчей за {elapsed:.1f} с "
+                    f"(одновременно до {self.concurrency} запросов)")
+        return list(all_results)
+
+    async def _analyze_batch(self, session: aiohttp.ClientSession, limiter: Optional[RateLimiter],
+                             batch: List[Dict], output_format: Optional[str] = None) -> List[Dict]:
+        """Отправляет один батч и разбирает ответ (ответ не по JSON-схеме запрашивается повторно текстом)."""
+        prompt = self.lmm._create_prompt(batch)
+        payload = self.lmm._build_payload(prompt, output_format)
+        timeout = aiohttp.ClientTimeout(total=self.lmm._request_timeout(prompt))
+
+        for attempt in range(self.max_retries):
+            try:
+                if limiter is not None:
+                    await limiter.acquire()
+
+                logger.info(f"Асинхронный запрос в LMM для {len(batch)} постов (попытка {attempt+1})")
+                async with session.post(self.lmm.api_url, json=payload, timeout=timeout) as response:
+                    if response.status in self.RETRY_STATUSES:
+                        retry_after = response.headers.get('Retry-After')
+                        raise _RetryableError(f"Статус ответа {response.status}",
+                                              float(retry_after) if retry_after and retry_after.isdigit() else None)
+                    response.raise_for_status()
+                    response_data = await response.json(content_type=None)
+
+                content = self.lmm._extract_content(response_data)
+                self.lmm._save_debug(prompt, content)
+                results = self.lmm._parse_lmm_response(content, output_format)
+                if results is None:
+                    return await self._analyze_batch(session, limiter, batch, output_format='text')
+
+                logger.info(f"Успешно получен ответ с {len(results)} результатами")
+                return results
+            except Exception as e:
+                logger.error(f"Ошибка при асинхронном запросе к LMM: {e}")
+
+                if attempt < self.max_retries - 1:
+                    delay = self._backoff_delay(attempt, getattr(e, 'retry_after', None))
+                    logger.info(f"Повторная попытка через {delay:.1f} секунд...")
+                    await asyncio.sleep(delay)
+                else:
+                    logger.error("Исчерпаны все попытки")
+        return []
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Экспоненциальная задержка со случайным разбросом (full jitter)."""
+        if retry_after:
+            return min(self.max_delay, retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class _RetryableError(Exception):
+    """Ошибка ответа API, после которой запрос можно повторить."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
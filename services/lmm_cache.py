@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import List, Dict, Any
+from loguru import logger
+from flask import current_app
+
+class LmmResultCache:
+    """
+    Постоянный кэш результатов анализа LLM, общий для всех воркеров.
+
+    Ключ кэша - хэш нормализованного полного текста поста, названия объекта,
+    модели и версии промпта. Хранилище - Redis (URL вида redis://...) или
+    файл SQLite (URL вида sqlite:///path/to/cache.db).
+    """
+
+    WHITESPACE_PATTERN = re.compile(r'\s+')
+
+    def __init__(self, url=None, ttl=None, max_entries=None):
+        """
+        Инициализация кэша.
+
+        Args:
+            url: URL хранилища (redis://... или sqlite:///...).
+            ttl: Время жизни записи в секундах.
+            max_entries: Максимальное количество записей (старые вытесняются).
+        """
+        self.url = url or current_app.config['LMM_CACHE_URL']
+        self.ttl = ttl or current_app.config.get('LMM_CACHE_TTL', 30 * 24 * 3600)
+        self.max_entries = max_entries or current_app.config.get('LMM_CACHE_MAX_ENTRIES', 100000)
+        self.hits = 0
+        self.misses = 0
+
+        if self.url.startswith('redis://') or self.url.startswith('rediss://'):
+            self.backend = _RedisBackend(self.url, self.ttl, self.max_entries)
+        elif self.url.startswith('sqlite:///'):
+            self.backend = _SqliteBackend(self.url[len('sqlite:///'):], self.ttl, self.max_entries)
+        else:
+            raise ValueError(f"Неподдерживаемый URL кэша LLM: {self.url}")
+
+    @classmethod
+    def make_key(cls, content: str, object_name: str, model: str, prompt_version: str) -> str:
+        """
+        Создает ключ кэша для поста.
+
+        Args:
+            content: Полный текст поста.
+            object_name: Название объекта анализа.
+            model: Модель LLM.
+            prompt_version: Версия промпта.
+
+        Returns:
+            str: Ключ кэша.
+        """
+        normalized = unicodedata.normalize('NFC', content or '')
+        normalized = cls.WHITESPACE_PATTERN.sub(' ', normalized).strip()
+        payload = '\x1f'.join([normalized, object_name or '', model or '', prompt_version or ''])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Получает результаты по списку ключей.
+
+        Args:
+            keys: Ключи кэша.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Найденные результаты по ключам.
+        """
+        if not keys:
+            return {}
+        try:
+            found = self.backend.get_many(list(dict.fromkeys(keys)))
+        except Exception as e:
+            logger.error(f"Ошибка чтения кэша LLM: {e}")
+            found = {}
+
+        hits = sum(1 for key in keys if key in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def set_many(self, items: Dict[str, Dict[str, Any]]):
+        """
+        Сохраняет результаты в кэш.
+
+        Args:
+            items: Словарь, где ключ - ключ кэша, значение - результат анализа.
+        """
+        if not items:
+            return
+        try:
+            self.backend.set_many(items)
+        except Exception as e:
+            logger.error(f"Ошибка записи в кэш LLM: {e}")
+
+    @property
+    def hit_rate(self) -> float:
+        """Доля попаданий в кэш."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Возвращает статистику попаданий и промахов."""
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': round(self.hit_rate, 4)}
+
+
+class _SqliteBackend:
+    """Хранилище кэша в файле SQLite (общее для процессов одного хоста)."""
+
+    # Вытеснение проверяется раз в указанное количество записей
+    EVICT_EVERY = 100
+
+    def __init__(self, path: str, ttl: int, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.writes = 0
+        self.local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS lmm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_lmm_cache_accessed_at ON lmm_cache (accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        conn = self._connection()
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f"SELECT key, value FROM lmm_cache WHERE key IN ({placeholders}) AND created_at >= ?",
+                (*chunk, now - self.ttl)
+            ).fetchall()
+            found.update((key, json.loads(value)) for key, value in rows)
+
+        if found:
+            with conn:
+                conn.executemany("UPDATE lmm_cache SET accessed_at = ? WHERE key = ?",
+                                 [(now, key) for key in found])
+        return found
+
+    def set_many(self, items: Dict[str, Dict[str, Any]]):
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO lmm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps(value, ensure_ascii=False), now, now) for key, value in items.items()]
+            )
+
+        self.writes += len(items)
+        if self.writes >= self.EVICT_EVERY:
+            self.writes = 0
+            self._evict(now)
+
+    def _evict(self, now: float):
+        """Удаляет просроченные записи и самые давно использованные сверх лимита."""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM lmm_cache WHERE created_at < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM lmm_cache WHERE key IN ("
+                "SELECT key FROM lmm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+
+class _RedisBackend:
+    """Хранилище кэша в Redis (общее для всех хостов)."""
+
+    PREFIX = 'lmm_cache:'
+    INDEX_KEY = 'lmm_cache:index'
+
+    def __init__(self, url: str, ttl: int, max_entries: int):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        values = self.client.mget([self.PREFIX + key for key in keys])
+        found = {key: json.loads(value) for key, value in zip(keys, values) if value is not None}
+
+        if found:
+            now = time.time()
+            self.client.zadd(self.INDEX_KEY, {key: now for key in found})
+        return found
+
+    def set_many(self, items: Dict[str, Dict[str, Any]]):
+        now = time.time()
+        pipe = self.client.pipeline()
+        for key, value in items.items():
+            pipe.set(self.PREFIX + key, json.dumps(value, ensure_ascii=False), ex=self.ttl)
+        pipe.zadd(self.INDEX_KEY, {key: now for key in items})
+        pipe.zremrangebyscore(self.INDEX_KEY, '-inf', now - self.ttl)
+        pipe.execute()
+
+        # Вытесняем самые давно использованные записи сверх лимита
+        overflow = self.client.zcard(self.INDEX_KEY) - self.max_entries
+        if overflow > 0:
+            evicted = [key.decode() for key, _ in self.client.zpopmin(self.INDEX_KEY, overflow)]
+            if evicted:
+                self.client.delete(*[self.PREFIX + key for key in evicted])
@@ -0,0 +1,219 @@
+import json
+import re
+import traceback
+from typing import List, Dict, Optional
+from loguru import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Маркеры начала блока анализа поста (разделители блоков)
+MARKER_PATTERN = re.compile(r'###\s+АНАЛИЗ\s+ПОСТА\s+|Анализ\s+поста\s+|Пост\s+\d+:|Post\s+analysis\s+')
+
+# Блок в ожидаемом формате промпта разбирается одним сопоставлением. В строках
+# post_id и тональности нет двоеточий, поэтому более ранних меток в блоке нет
+# и результат совпадает с перебором вариантов меток.
+CANONICAL_BLOCK_PATTERN = re.compile(
+    r'\s*(?P<post_id>[^\s:][^\n:]*)\n'
+    r'Тональность:[ \t]*(?P<tonality>[^\s:][^\n:]*)\n'
+    r'Краткое описание:[ \t]*(?P<description>\S[^\n]*(?:\n[^\n]+)*?)\nЗаголовок:'
+    r'[ \t]*(?P<title>\S[^\n]*)'
+)
+
+# JSON-схема ответа в режиме структурированного вывода
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "post_id": {"type": "string"},
+                    "tonality": {"type": "string", "enum": ["негативная", "нейтральная", "позитивная"]},
+                    "description": {"type": "string"},
+                    "title": {"type": "string"}
+                },
+                "required": ["post_id", "tonality", "description", "title"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["results"],
+    "additionalProperties": False
+}
+
+# Варианты меток каждого поля в порядке приоритета
+TONALITY_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'Тональность:\s*([^\n]+)',
+    r'Тональность\s*[-:]\s*([^\n]+)',
+    r'Тон[^:]*:\s*([^\n]+)',
+    r'Sentiment:\s*([^\n]+)',
+))
+DESCRIPTION_PATTERNS = tuple(re.compile(pattern, re.DOTALL) for pattern in (
+    r'Краткое описание:\s*([^\n]+(?:\n[^\n]+)*?)(?=\nЗаголовок:|$)',
+    r'Описание:\s*([^\n]+(?:\n[^\n]+)*?)(?=\nЗаголовок:|$)',
+    r'Краткое содержание:\s*([^\n]+(?:\n[^\n]+)*?)(?=\nЗаголовок:|$)',
+    r'Description:\s*([^\n]+(?:\n[^\n]+)*?)(?=\nTitle:|$)',
+))
+TITLE_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'Заголовок:\s*([^\n]+)',
+    r'Заголовок\s*[-:]\s*([^\n]+)',
+    r'Тема:\s*([^\n]+)',
+    r'Title:\s*([^\n]+)',
+))
+
+def _search_field(block: str, patterns) -> str:
+    """Возвращает значение поля по первому сработавшему варианту метки."""
+    for pattern in patterns:
+        match = pattern.search(block)
+        if match:
+            return match.group(1).strip()
+    return ""
+
+def _parse_variant_block(block: str) -> Optional[Dict]:
+    """
+    Разбирает блок с отклонениями от ожидаемого формата.
+
+    Args:
+        block: Текст блока без маркера.
+
+    Returns:
+        Optional[Dict]: Результат анализа или None, если данных нет.
+    """
+    stripped = block.strip()
+    if not stripped:
+        return None
+
+    # post_id - первая строка блока
+    post_id = stripped.split('\n', 1)[0].strip()
+    tonality = _search_field(block, TONALITY_PATTERNS)
+    description = _search_field(block, DESCRIPTION_PATTERNS)
+    title = _search_field(block, TITLE_PATTERNS)
+
+    # Проверяем, что получены хотя бы некоторые данные
+    if any([tonality, description, title]) or post_id != "unknown":
+        return {
+            "post_id": post_id,
+            "tonality": tonality,
+            "description": description,
+            "title": title
+        }
+
+    logger.warning(f"Не удалось извлечь данные из блока: {block[:100]}...")
+    return None
+
+def parse_response(response_text: str) -> List[Dict]:
+    """
+    Парсит ответ LMM в структурированном текстовом формате.
+
+    Ответ делится на блоки одним проходом скомпилированного шаблона маркеров.
+    Блок в ожидаемом формате разбирается за один линейный проход одним
+    скомпилированным шаблоном, извлекающим все поля сразу. Блоки с
+    отклонениями (другие метки, пропущенные поля) разбираются перебором
+    вариантов меток. Результат совпадает с прежним парсером, перебиравшим
+    регулярные выражения для каждого поля (см. benchmarks/lmm_parser.py).
+
+    Args:
+        response_text: Текстовый ответ от LMM.
+
+    Returns:
+        List[Dict]: Список словарей с результатами анализа.
+    """
+    try:
+        results = []
+
+        # Если ответ пустой или слишком короткий
+        if not response_text or len(response_text) < 50:
+            logger.warning(f"Слишком короткий ответ LMM: {response_text}")
+            return results
+
+        # Проверка на нераспознанные форматы ответов
+        if "### АНАЛИЗ ПОСТА" not in response_text:
+            logger.warning("Ответ не содержит ожидаемого маркера '### АНАЛИЗ ПОСТА'")
+
+            alternative_marker = next((marker for marker in ("Пост", "Анализ поста", "Post analysis")
+                                       if marker in response_text), None)
+            if alternative_marker is None:
+                logger.error("Не удалось найти маркеры анализа поста в ответе")
+                return results
+            logger.info(f"Найден альтернативный маркер: {alternative_marker}")
+
+        match_block = CANONICAL_BLOCK_PATTERN.match
+        for block in MARKER_PATTERN.split(response_text):
+            match = match_block(block)
+            # Ранняя метка заголовка внутри описания меняет результат - такой блок разбирается полностью
+            if match is not None and block.find('Заголовок:', match.start(3), match.end(3)) == -1:
+                post_id, tonality, description, title = match.groups()
+                results.append({
+                    "post_id": post_id.strip(),
+                    "tonality": tonality.strip(),
+                    "description": description.strip(),
+                    "title": title.strip()
+                })
+                continue
+
+            try:
+                result = _parse_variant_block(block)
+                if result is not None:
+                    results.append(result)
+            except Exception as e:
+                logger.error(f"Ошибка при парсинге блока ответа: {e}")
+                logger.error(f"Содержимое блока: {block[:200]}...")
+                logger.error(traceback.format_exc())
+
+        return results
+    except Exception as e:
+        logger.error(f"Ошибка при парсинге ответа LMM: {e}")
+        logger.error(traceback.format_exc())
+        return []
+
+def parse_json_response(response_text: str) -> Optional[List[Dict]]:
+    """
+    Разбирает ответ LMM в формате JSON-схемы ANALYSIS_SCHEMA.
+
+    Результаты сопоставляются постам по полю post_id; для повторяющегося
+    post_id берется первый результат.
+
+    Args:
+        response_text: Текстовый ответ от LMM.
+
+    Returns:
+        Optional[List[Dict]]: Список результатов анализа или None, если ответ
+            не является JSON по схеме (тогда батч запрашивается повторно в текстовом формате).
+    """
+    text = (response_text or '').strip()
+
+    # Модели иногда оборачивают JSON в блок кода или добавляют пояснения
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end < start:
+        return None
+
+    try:
+        data = orjson.loads(text[start:end + 1]) if orjson is not None else json.loads(text[start:end + 1])
+    except ValueError as e:
+        logger.warning(f"Не удалось декодировать JSON-ответ LMM: {e}")
+        return None
+
+    items = data.get('results') if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        logger.warning("В JSON-ответе LMM нет списка results")
+        return None
+
+    results: Dict[str, Dict] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        post_id = str(item.get('post_id') or '').strip()
+        if not post_id or post_id in results:
+            continue
+        results[post_id] = {
+            "post_id": post_id,
+            "tonality": str(item.get('tonality') or '').strip(),
+            "description": str(item.get('description') or '').strip(),
+            "title": str(item.get('title') or '').strip()
+        }
+
+    return list(results.values())
@@ -0,0 +1,79 @@
+from typing import List, Dict
+
+# Инструкции анализа. Текст одинаков для всех запросов и отправляется отдельным
+# системным сообщением, чтобы провайдер мог кэшировать этот префикс.
+INSTRUCTIONS = """Проанализируй посты из сообщения пользователя.
+Посты сгруппированы по объектам: строка "=== Объект: <название> ===" открывает группу, каждый пост группы начинается со строки "[<post_id>]", за которой следует текст поста.
+
+Для каждого поста:
+
+1. Определи тональность текста: "негативная", "нейтральная" или "позитивная".
+2. Проведи NER-анализ, где главная сущность - объект группы, в которой находится пост.
+3. Найди другие сущности в тексте и их отношения к главной сущности.
+4. Сгенерируй краткое описание из 3-5 предложений на основе NER-анализа.
+5. Создай заголовок для поста.
+
+КРИТИЧЕСКИ ВАЖНО: Для ОДИНАКОВЫХ наборов сущностей и отношений между ними нужно генерировать ПОЛНОСТЬЮ ИДЕНТИЧНЫЕ тональности, описания и заголовки.
+Например, если в двух постах упоминается "Скоч Андрей" и его благотворительная деятельность, описания и заголовки для этих постов должны быть идентичными.
+
+Если сходные (не обязательно идентичные) посты упоминают одинаковые объекты и действия, тональность и общий смысл описаний должны совпадать.
+Проанализируй посты как группу и установи общую схему именования и формулировок для похожих типов контента.
+"""
+
+# Требования к формату ответа в текстовом режиме (разбирается services.lmm_parser.parse_response)
+TEXT_FORMAT_INSTRUCTIONS = """
+ВАЖНО: Ответ должен быть строго в следующем формате (без отклонений), где {post_id} - идентификатор поста из строки [<post_id>] без скобок:
+
+### АНАЛИЗ ПОСТА {post_id}
+Тональность: [негативная/нейтральная/позитивная]
+Краткое описание: [3-5 предложений]
+Заголовок: [заголовок]
+"""
+
+# Требования к формату ответа в режиме JSON (дополняют response_format со схемой ANALYSIS_SCHEMA)
+JSON_FORMAT_INSTRUCTIONS = """
+ВАЖНО: Ответ должен быть строго JSON-объектом без пояснений и разметки:
+
+{"results": [{"post_id": "<post_id из строки [<post_id>] без скобок>", "tonality": "негативная|нейтральная|позитивная", "description": "<3-5 предложений>", "title": "<заголовок>"}]}
+
+Для каждого поста в "results" должен быть ровно один элемент с его post_id.
+"""
+
+def build_system_prompt(output_format: str = 'text') -> str:
+    """
+    Возвращает системную часть промпта (инструкции и формат ответа).
+
+    Args:
+        output_format: Формат ответа модели: text или json.
+
+    Returns:
+        str: Системный промпт.
+    """
+    return INSTRUCTIONS + (JSON_FORMAT_INSTRUCTIONS if output_format == 'json' else TEXT_FORMAT_INSTRUCTIONS)
+
+def build_posts_prompt(batch: List[Dict]) -> str:
+    """
+    Кодирует посты батча для сообщения пользователя.
+
+    Посты группируются по объектам (это помогает модели выдерживать
+    консистентность между похожими постами); название объекта пишется один
+    раз на группу, идентификатор - один раз на пост.
+
+    Args:
+        batch: Список постов для анализа.
+
+    Returns:
+        str: Текст сообщения пользователя.
+    """
+    object_groups: Dict[str, List[Dict]] = {}
+    for post in batch:
+        object_groups.setdefault(post.get('object', 'неизвестно'), []).append(post)
+
+    parts = []
+    for obj, posts in object_groups.items():
+        parts.append(f"=== Объект: {obj} ===\n")
+        for post in posts:
+            content = (post.get('content') or '').strip() or "Контент отсутствует"
+            parts.append(f"[{post.get('post_id', '')}]\n{content}\n\n")
+
+    return ''.join(parts)
@@ -1,33 +1,46 @@
-import json
+import math
 import traceback
 import time
-import re
 import os
-import hashlib
 import requests
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from datetime import datetime
 from loguru import logger
 from flask import current_app
+from sqlalchemy import bindparam, or_
 from celery_app import celery
-from celery import shared_task
 
 
 from models.database import db
 from models.post_model import Post
-from models.analysis_model import PostAnalysis, TonalityType
+from models.analysis_model import PostAnalysis, TonalityType, AnalysisFailure
+from services.lmm_cache import LmmResultCache
+from services.lmm_async import AsyncLmmEngine
+from services.batch_planner import create_batch_planner
+from services.lmm_stream import BlockSplitter, iter_sse_content
+from services.lmm_parser import parse_response, parse_json_response, ANALYSIS_SCHEMA
+from services.lmm_prompt import build_system_prompt, build_posts_prompt
+from services.content_normalizer import ContentNormalizer
+from utils.simhash_index import cluster_posts
+from utils.sql import dialect_insert, supports_upsert
 
 @celery.task(name='analyze_batch_task')
-def analyze_batch_task(batch, api_key, model, site_url, site_name):
+def analyze_batch_task(batch, api_key, model, site_url, site_name, duplicates=None, depth=0):
     """
     Celery-задача для асинхронного анализа батча постов.
     
+    Посты, для которых модель не вернула результат, отправляются повторно
+    меньшими батчами (не глубже LMM_MAX_RETRY_DEPTH), затем в таблицу
+    analysis_failures.
+    
     Args:
         batch: Список постов для анализа.
         api_key: API ключ для LMM.
         model: Название модели для LMM.
         site_url: URL сайта.
         site_name: Название сайта.
+        duplicates: Словарь почти-дубликатов: post_id представителя -> post_id копий.
+        depth: Глубина повторной отправки (0 - исходный батч).
         
     Returns:
         List[Dict]: Результаты анализа.
@@ -38,28 +51,92 @@ def analyze_batch_task(batch, api_key, model, site_url, site_name):
         # Создаем экземпляр сервиса LMM для анализа
         lmm_service = LmmService(api_key=api_key, model=model, site_url=site_url, site_name=site_name)
         
-        # Создаем промпт для текущего батча
-        prompt = lmm_service._create_prompt(batch)
+        def save_results(results):
+            # Отбрасываем результаты с post_id, которых не было в батче
+            results = lmm_service._filter_batch_results(batch, results)
+            
+            # Сохраняем результаты в постоянный кэш
+            lmm_service._update_cache(batch, results)
+            
+            # Копируем результаты представителей на их почти-дубликаты
+            if duplicates:
+                results = LmmService.expand_duplicate_results(results, duplicates)
+            
+            # Обрабатываем результаты и сохраняем в БД
+            # При использовании ContextTask в celery_app.py app.app_context() уже активен
+            lmm_service.process_results(results)
         
-        # Отправляем запрос в LMM
-        results = lmm_service._send_to_lmm(prompt)
+        if lmm_service.streaming:
+            # Каждый блок ответа сохраняется сразу по мере получения
+            results = lmm_service._stream_batch(batch, on_results=save_results)
+        else:
+            # Создаем промпт для текущего батча
+            prompt = lmm_service._create_prompt(batch)
+            
+            # Отправляем запрос в LMM
+            results = lmm_service._send_to_lmm(prompt)
+            save_results(results)
         
         logger.info(f"Задача завершена, получено {len(results)} результатов")
         
-        # Обрабатываем результаты и сохраняем в БД
-        # При использовании ContextTask в celery_app.py app.app_context() уже активен
-        lmm_service.process_results(results)
-        
+        # Повторно отправляем только посты, пропущенные моделью
+        lmm_service.requeue_missing(batch, results, duplicates, depth)
         return results
     except Exception as e:
         logger.error(f"Ошибка при выполнении задачи анализа батча: {e}")
         logger.error(traceback.format_exc())
         return []
 
+@celery.task(name='analyze_batches_async_task')
+def analyze_batches_async_task(batches, api_key, model, site_url, site_name, duplicates=None):
+    """
+    Celery-задача для анализа группы батчей с несколькими одновременными запросами к LMM.
+    
+    Args:
+        batches: Список батчей постов для анализа.
+        api_key: API ключ для LMM.
+        model: Название модели для LMM.
+        site_url: URL сайта.
+        site_name: Название сайта.
+        duplicates: Словарь почти-дубликатов: post_id представителя -> post_id копий.
+        
+    Returns:
+        int: Количество полученных результатов.
+    """
+    try:
+        logger.info(f"Запуск асинхронной задачи анализа {len(batches)} батчей")
+        
+        lmm_service = LmmService(api_key=api_key, model=model, site_url=site_url, site_name=site_name)
+        
+        def on_batch_done(batch, results):
+            # Результаты сохраняются по мере готовности батчей
+            results = lmm_service._filter_batch_results(batch, results)
+            lmm_service._update_cache(batch, results)
+            lmm_service.requeue_missing(batch, results, duplicates)
+            if duplicates:
+                results = LmmService.expand_duplicate_results(results, duplicates)
+            lmm_service.process_results(results)
+        
+        all_results = AsyncLmmEngine(lmm_service).run(batches, on_batch_done)
+        n_results = sum(len(results) for results in all_results)
+        
+        logger.info(f"Задача завершена, получено {n_results} результатов")
+        return n_results
+    except Exception as e:
+        logger.error(f"Ошибка при выполнении асинхронной задачи анализа батчей: {e}")
+        logger.error(traceback.format_exc())
+        return 0
+
 
 class LmmService:
     """Сервис для анализа текстов с помощью LLM через OpenRouter API."""
     
+    # Версия промпта: при изменении промпта или формата ответа старые результаты в кэше не используются
+    PROMPT_VERSION = '2'
+    
+    # Модели, которым точку кэширования префикса нужно указать явно (остальные кэшируют префикс сами)
+    CACHE_CONTROL_PREFIXES = ('anthropic/', 'google/')
+    
     def __init__(self, api_key=None, model=None, max_tokens_per_batch=30000, 
                  max_retries=3, retry_delay=5, site_url=None, site_name=None):
         """
@@ -83,14 +160,35 @@ class LmmService:
         self.site_name = site_name or "Epizode Analyzer"
         self.api_url = "https://openrouter.ai/api/v1/chat/completions"
         
-        # Кэш результатов для обеспечения консистентности между батчами
-        self.results_cache = {}
+        # Максимальная глубина повторной отправки постов, пропущенных моделью
+        self.max_retry_depth = current_app.config.get('LMM_MAX_RETRY_DEPTH', 2)
+        
+        # Формат ответа модели: text (размеченный текст) или json (ответ по JSON-схеме)
+        self.output_format = current_app.config.get('LMM_OUTPUT_FORMAT', 'text')
+        
+        # Потоковый режим: результаты разбираются и сохраняются по мере генерации ответа
+        # (блоки выделяются только в текстовом формате)
+        self.streaming = current_app.config.get('LMM_STREAMING', False) and self.output_format == 'text'
+        
+        # Максимальное расстояние Хэмминга simhash для почти-дубликатов (отрицательное - отключено)
+        self.simhash_distance = current_app.config.get('LMM_SIMHASH_DISTANCE', 3)
+        
+        # Очистка и обрезка текстов постов перед анализом
+        self.content_normalizer = ContentNormalizer()
+        
+        # Постоянный кэш результатов, общий для всех воркеров
+        try:
+            self.result_cache = LmmResultCache()
+        except Exception as e:
+            logger.error(f"Ошибка инициализации кэша LMM: {e}")
+            self.result_cache = None
         
         logger.info(f"Инициализация LMM Analyzer с моделью: {model}")
     
     def _create_batches(self, posts: List[Dict]) -> List[List[Dict]]:
         """
-        Разделяет список постов на батчи, учитывая ограничение по токенам.
+        Разделяет список постов на батчи планировщиком LMM_BATCH_PLANNER,
+        учитывая ограничение по входным токенам и ожидаемую длину ответа.
         
         Args:
             posts: Список постов для анализа.
@@ -98,50 +196,12 @@ class LmmService:
         Returns:
             List[List[Dict]]: Список батчей для отправки в LMM.
         """
-        batches = []
-        current_batch = []
-        current_batch_tokens = 0
-        
-        # Максимальное количество постов в одном батче даже если они малы
-        max_posts_per_batch = 20
-        
-        # Минимальный размер батча (для избежания избыточного количества запросов)
-        min_batch_tokens = self.max_tokens_per_batch // 5
-        
-        # Примерная оценка токенов (считаем 1 токен = 4 символа)
-        for post in posts:
-            # Подсчет приблизительного количества токенов в посте
-            post_content = post.get("content", "")
-            post_object = post.get("object", "")
-            
-            # Примерно считаем токены (4 символа ~ 1 токен)
-            post_tokens = (len(post_content) + len(post_object)) // 4
-            
-            # Установка минимального количества токенов на пост
-            post_tokens = max(50, post_tokens)  # Минимум 50 токенов на пост
-            
-            # Если текущий батч пуст или добавление поста не превысит лимит и не превысит макс. кол-во постов
-            if (not current_batch or 
-                (current_batch_tokens + post_tokens <= self.max_tokens_per_batch and 
-                len(current_batch) < max_posts_per_batch)):
-                current_batch.append(post)
-                current_batch_tokens += post_tokens
-            else:
-                # Если в текущем батче мало токенов, но много постов
-                # или если достигли макс. кол-во постов, добавляем текущий батч и начинаем новый
-                batches.append(current_batch)
-                current_batch = [post]
-                current_batch_tokens = post_tokens
-                
-            # Если текущий батч достиг оптимального размера, завершаем его
-            if current_batch_tokens >= min_batch_tokens and len(current_batch) >= 5:
-                batches.append(current_batch)
-                current_batch = []
-                current_batch_tokens = 0
+        planner = create_batch_planner(self.model, self.max_tokens_per_batch, self._system_prompt())
+        batches = planner.plan(posts)
         
-        # Добавляем последний батч, если он не пустой
-        if current_batch:
-            batches.append(current_batch)
+        plan = planner.describe(batches)
+        logger.info(f"Планировщик {type(planner).__name__}: {plan['requests']} запросов, "
+                    f"~{plan['input_tokens']} входных токенов, заполнение {plan['fill_ratio']:.0%}")
         
         # Логирование информации о созданных батчах
         batch_sizes = [len(batch) for batch in batches]
@@ -153,9 +213,16 @@ class LmmService:
         
         return batches
     
+    def _system_prompt(self, output_format: Optional[str] = None) -> str:
+        """Возвращает системную часть промпта: инструкции и формат ответа (одинаковы для всех батчей)."""
+        return build_system_prompt(output_format or self.output_format)
+    
     def _create_prompt(self, batch: List[Dict]) -> str:
         """
-        Создает промпт для анализа постов в LMM с акцентом на консистентность.
+        Создает сообщение пользователя с постами батча.
+        
+        Инструкции передаются отдельным системным сообщением (см. _build_payload),
+        посты кодируются компактно: объект один раз на группу, post_id один раз на пост.
         
         Args:
             batch: Список постов для анализа.
@@ -163,57 +230,7 @@ class LmmService:
         Returns:
             str: Промпт для отправки в LMM.
         """
-        prompt = """
-Проанализируй следующие посты. Для каждого поста:
-
-1. Определи тональность текста: "негативная", "нейтральная" или "позитивная".
-2. Проведи NER-анализ, где главная сущность указана в поле "object".
-3. Найди другие сущности в тексте и их отношения к главной сущности.
-4. Сгенерируй краткое описание из 3-5 предложений на основе NER-анализа.
-5. Создай заголовок для поста.
-
-КРИТИЧЕСКИ ВАЖНО: Для ОДИНАКОВЫХ наборов сущностей и отношений между ними нужно генерировать ПОЛНОСТЬЮ ИДЕНТИЧНЫЕ тональности, описания и заголовки.
-Например, если в двух постах упоминается "Скоч Андрей" и его благотворительная деятельность, описания и заголовки для этих постов должны быть идентичными.
-
-Если сходные (не обязательно идентичные) посты упоминают одинаковые объекты и действия, тональность и общий смысл описаний должны совпадать.
-Проанализируй посты как группу и установи общую схему именования и формулировок для похожих типов контента.
-
-ВАЖНО: Ответ должен быть строго в следующем формате (без отклонений):
-
-### АНАЛИЗ ПОСТА {post_id}
-Тональность: [негативная/нейтральная/позитивная]
-Краткое описание: [3-5 предложений]
-Заголовок: [заголовок]
-
-Анализируемые посты:
-"""
-        
-        # Сначала группируем посты по объектам, чтобы помочь модели видеть связанные посты
-        # Это помогает обеспечить консистентность между похожими постами
-        object_groups = {}
-        for post in batch:
-            obj = post.get('object', 'неизвестно')
-            if obj not in object_groups:
-                object_groups[obj] = []
-            object_groups[obj].append(post)
-        
-        # Теперь добавляем информацию о постах, группируя по объектам
-        post_counter = 1
-        
-        for obj, posts in object_groups.items():
-            prompt += f"\n--- Группа постов о '{obj}' ---\n"
-            
-            for post in posts:
-                prompt += f"\n--- Пост {post_counter} (ID: {post.get('post_id', '')}) ---\n"
-                prompt += f"post_id: {post.get('post_id', '')}\n"
-                prompt += f"object: {obj}\n"
-                content = post.get('content', '').strip()
-                if not content:
-                    content = "Контент отсутствует"
-                prompt += f"content: {content}\n"
-                post_counter += 1
-        
-        return prompt
+        return build_posts_prompt(batch)
     
     def analyze_posts(self, posts_data: List[Dict]) -> List[Dict]:
         """
@@ -228,38 +245,207 @@ class LmmService:
         # Инициируем асинхронные задачи для обработки постов
         task_ids = []
         
+        # В модель отправляется очищенный текст в пределах бюджета токенов на пост
+        posts_data = self.content_normalizer.prepare(posts_data)
+        
+        # В модель отправляется один представитель на кластер почти-дубликатов
+        duplicates = {}
+        if self.simhash_distance is not None and self.simhash_distance >= 0:
+            posts_data, duplicates = cluster_posts(posts_data, self.simhash_distance)
+            n_duplicates = sum(len(members) for members in duplicates.values())
+            logger.info(f"Найдено почти-дубликатов: {n_duplicates}, к анализу {len(posts_data)} постов")
+        
+        # Готовые результаты из кэша сохраняем сразу, без запроса к модели
+        cached_results, posts_data = self._lookup_cache(posts_data)
+        if cached_results:
+            self.process_results(self.expand_duplicate_results(cached_results, duplicates))
+        
         # Создаем батчи для обработки
         batches = self._create_batches(posts_data)
         logger.info(f"Начинаем анализ {len(posts_data)} постов в {len(batches)} батчах")
         
+        # При LMM_CONCURRENCY > 1 один воркер держит несколько запросов одновременно,
+        # поэтому батчи отправляются группами в асинхронную задачу
+        concurrency = current_app.config.get('LMM_CONCURRENCY', 1)
+        if concurrency > 1:
+            group_size = concurrency * 4
+            for start in range(0, len(batches), group_size):
+                group = batches[start:start + group_size]
+                logger.info(f"Запуск асинхронной задачи для батчей {start+1}-{start+len(group)}/{len(batches)}")
+                task = analyze_batches_async_task.delay(
+                    group, self.api_key, self.model, self.site_url, self.site_name,
+                    duplicates=self._batch_duplicates([post for batch in group for post in batch], duplicates)
+                )
+                task_ids.append(task.id)
+            return {"task_ids": task_ids, "cache_hits": len(cached_results)}
+        
         # Запускаем задачи для каждого батча
         for i, batch in enumerate(batches):
             logger.info(f"Запуск задачи для батча {i+1}/{len(batches)} ({len(batch)} постов)")
-            task = analyze_batch_task.delay(batch, self.api_key, self.model, self.site_url, self.site_name)
+            task = analyze_batch_task.delay(batch, self.api_key, self.model, self.site_url, self.site_name,
+                                            duplicates=self._batch_duplicates(batch, duplicates))
             task_ids.append(task.id)
         
-        return {"task_ids": task_ids}
+        return {"task_ids": task_ids, "cache_hits": len(cached_results)}
+    
+    @staticmethod
+    def _batch_duplicates(posts: List[Dict], duplicates: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Отбирает почти-дубликаты, представители которых входят в переданные посты."""
+        return {
+            str(post['post_id']): duplicates[str(post['post_id'])]
+            for post in posts
+            if str(post.get('post_id')) in duplicates
+        }
     
-    def process_results(self, results: List[Dict]):
+    @staticmethod
+    def expand_duplicate_results(results: List[Dict], duplicates: Dict[str, List[str]]) -> List[Dict]:
+        """
+        Копирует результаты анализа представителей на их почти-дубликаты.
+        
+        Args:
+            results: Результаты анализа представителей.
+            duplicates: Словарь, где ключ - post_id представителя, значение - post_id копий.
+            
+        Returns:
+            List[Dict]: Результаты анализа, дополненные копиями.
+        """
+        expanded = list(results)
+        for result in results:
+            for post_id in duplicates.get(str(result.get('post_id')), []):
+                expanded.append(dict(result, post_id=post_id))
+        
+        logger.info(f"Результаты скопированы на {len(expanded) - len(results)} почти-дубликатов")
+        return expanded
+    
+    def process_results(self, results: List[Dict]) -> Dict[str, Any]:
         """
         Обрабатывает результаты анализа LMM и сохраняет их в базу данных.
         
+        Все посты батча находятся одним запросом, анализы записываются одним
+        INSERT ... ON CONFLICT, пустые заголовки постов заполняются в той же
+        транзакции, коммит выполняется один раз на батч.
+        
         Args:
             results: Список результатов анализа.
+            
+        Returns:
+            Dict[str, Any]: Количество сохраненных (inserted, updated), пропущенных
+                (missing - пост не найден, invalid - нет post_id) результатов,
+                заполненных заголовков (titles) и время этапов в миллисекундах.
         """
         logger.info(f"Обработка {len(results)} результатов анализа")
+        started = time.perf_counter()
+        stats = {'inserted': 0, 'updated': 0, 'missing': 0, 'invalid': 0, 'titles': 0}
         
+        if not supports_upsert():
+            return self._process_results_rowwise(results, stats, started)
+        
+        # Последний результат для поста замещает предыдущие
+        by_post_id = {}
+        for result in results:
+            post_id = result.get('post_id')
+            if not post_id:
+                logger.warning(f"Результат без post_id: {result}")
+                stats['invalid'] += 1
+                continue
+            by_post_id[str(post_id)] = result
+        
+        try:
+            # Посты, их заголовки и наличие анализа - одним запросом
+            rows = db.session.query(Post.id, Post.post_id, Post.title, PostAnalysis.id) \
+                .outerjoin(PostAnalysis, PostAnalysis.post_id == Post.id) \
+                .filter(Post.post_id.in_(list(by_post_id))).all() if by_post_id else []
+            resolved = time.perf_counter()
+            
+            now = datetime.utcnow()
+            analysis_rows = []
+            title_rows = []
+            for post_pk, post_id, post_title, analysis_id in rows:
+                result = by_post_id[str(post_id)]
+                analysis_rows.append({
+                    'post_id': post_pk,
+                    'lmm_title': result.get('title', ''),
+                    'description': result.get('description', ''),
+                    'tonality': self._parse_tonality(result.get('tonality', '')),
+                    'analyzed_at': now,
+                    'model_used': self.model,
+                })
+                stats['updated' if analysis_id else 'inserted'] += 1
+                
+                # Если для поста нет заголовка, используем заголовок из LMM
+                if not post_title and result.get('title'):
+                    title_rows.append({'b_id': post_pk, 'b_title': result.get('title')})
+            
+            stats['missing'] = len(by_post_id) - len(rows)
+            if stats['missing']:
+                found = {str(row[1]) for row in rows}
+                logger.warning(f"Посты не найдены в базе данных: {[p for p in by_post_id if p not in found]}")
+            
+            if analysis_rows:
+                table = PostAnalysis.__table__
+                stmt = dialect_insert(table).values(analysis_rows)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[table.c.post_id],
+                    set_={column: stmt.excluded[column]
+                          for column in ('lmm_title', 'description', 'tonality', 'analyzed_at', 'model_used')}
+                )
+                db.session.execute(stmt)
+            
+            if title_rows:
+                posts_table = Post.__table__
+                db.session.execute(
+                    posts_table.update()
+                    .where(posts_table.c.id == bindparam('b_id'))
+                    .where(or_(posts_table.c.title.is_(None), posts_table.c.title == ''))
+                    .values(title=bindparam('b_title')),
+                    title_rows
+                )
+                stats['titles'] = len(title_rows)
+            
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении результатов анализа: {e}")
+            logger.error(traceback.format_exc())
+            db.session.rollback()
+            raise
+        
+        finished = time.perf_counter()
+        stats['resolve_ms'] = round((resolved - started) * 1000, 1)
+        stats['write_ms'] = round((finished - resolved) * 1000, 1)
+        stats['total_ms'] = round((finished - started) * 1000, 1)
+        
+        logger.info(f"Завершена обработка {len(results)} результатов анализа: "
+                    f"добавлено {stats['inserted']}, обновлено {stats['updated']}, "
+                    f"не найдено {stats['missing']}, заголовков {stats['titles']} "
+                    f"за {stats['total_ms']} мс")
+        return stats
+    
+    def _process_results_rowwise(self, results: List[Dict], stats: Dict[str, Any],
+                                 started: float) -> Dict[str, Any]:
+        """
+        Построчное сохранение результатов для БД без INSERT ... ON CONFLICT.
+        
+        Args:
+            results: Список результатов анализа.
+            stats: Словарь счетчиков для заполнения.
+            started: Время начала обработки (time.perf_counter()).
+            
+        Returns:
+            Dict[str, Any]: Счетчики и время обработки.
+        """
         for result in results:
             try:
                 post_id = result.get('post_id')
                 if not post_id:
                     logger.warning(f"Результат без post_id: {result}")
+                    stats['invalid'] += 1
                     continue
                 
                 # Ищем пост в базе данных
                 post = Post.query.filter_by(post_id=post_id).first()
                 if not post:
                     logger.warning(f"Пост с ID {post_id} не найден в базе данных")
+                    stats['missing'] += 1
                     continue
                 
                 # Ищем существующий анализ для обновления
@@ -271,6 +457,7 @@ class LmmService:
                     analysis.tonality = self._parse_tonality(result.get('tonality', ''))
                     analysis.analyzed_at = datetime.utcnow()
                     analysis.model_used = self.model
+                    stats['updated'] += 1
                 else:
                     # Создаем новый анализ
                     analysis = PostAnalysis(
@@ -282,27 +469,34 @@ class LmmService:
                         model_used=self.model
                     )
                     db.session.add(analysis)
+                    stats['inserted'] += 1
                 
                 # Если для поста нет заголовка, используем заголовок из LMM
                 if not post.title and result.get('title'):
                     post.title = result.get('title')
+                    stats['titles'] += 1
                 
                 db.session.commit()
-                logger.info(f"Результаты анализа для поста {post_id} сохранены в БД")
                 
             except Exception as e:
                 logger.error(f"Ошибка при обработке результата анализа: {e}")
                 logger.error(traceback.format_exc())
                 db.session.rollback()
         
-        logger.info(f"Завершена обработка {len(results)} результатов анализа")
+        stats['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Завершена обработка {len(results)} результатов анализа за {stats['total_ms']} мс")
+        return stats
     
-    def _send_to_lmm(self, prompt: str) -> List[Dict]:
+    def _send_to_lmm(self, prompt: str, output_format: Optional[str] = None) -> List[Dict]:
         """
         Отправляет запрос в LMM и обрабатывает ответ.
         
+        Если ответ в режиме JSON не соответствует схеме, батч запрашивается
+        повторно в текстовом формате.
+        
         Args:
             prompt: Промпт для отправки.
+            output_format: Формат ответа (по умолчанию LMM_OUTPUT_FORMAT).
             
         Returns:
             List[Dict]: Результаты анализа в виде списка словарей.
@@ -311,43 +505,15 @@ class LmmService:
             try:
                 logger.info(f"Отправка запроса в LMM (попытка {attempt+1})")
                 
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                    "HTTP-Referer": self.site_url,
-                    "X-Title": self.site_name
-                }
-                
-                # Проверяем длину промпта
-                prompt_length = len(prompt)
-                logger.info(f"Длина промпта: {prompt_length} символов")
-                
-                # Если промпт слишком длинный, возможно есть ограничения API
-                if prompt_length > 100000:  # Большинство API имеют лимиты на длину запроса
-                    logger.warning(f"Промпт очень длинный: {prompt_length} символов. Возможно превышение лимитов API.")
-                
-                # Логируем начало и конец промпта
-                logger.debug(f"Начало промпта: {prompt[:200]}...")
-                logger.debug(f"Конец промпта: ...{prompt[-200:]}")
-                
-                payload = {
-                    "model": self.model,
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ]
-                }
-                
-                # Проверяем размер JSON-запроса
-                json_payload = json.dumps(payload)
-                logger.info(f"Размер JSON-запроса: {len(json_payload)} байт")
+                payload = self._build_payload(prompt, output_format)
                 
                 # Устанавливаем более длительный таймаут для больших запросов
-                timeout = max(120, prompt_length // 1000)  # Адаптивный таймаут
+                timeout = self._request_timeout(prompt)
                 logger.info(f"Установлен таймаут запроса: {timeout} секунд")
                 
                 response = requests.post(
                     self.api_url,
-                    headers=headers,
+                    headers=self._build_headers(),
                     json=payload,
                     timeout=timeout
                 )
@@ -356,40 +522,15 @@ class LmmService:
                 logger.info(f"Статус ответа: {response.status_code}")
                 
                 response.raise_for_status()
-                response_data = response.json()
-                
-                # Проверка на наличие ошибок в ответе
-                if "error" in response_data:
-                    logger.error(f"Ошибка API: {response_data['error']}")
-                    raise Exception(f"API вернул ошибку: {response_data['error']}")
-                
-                # Извлекаем ответ модели
-                if "choices" not in response_data or not response_data["choices"]:
-                    logger.error(f"Неожиданный формат ответа: {response_data}")
-                    raise Exception("Неожиданный формат ответа API: отсутствует поле 'choices'")
-                    
-                content = response_data["choices"][0]["message"]["content"]
-                
-                # Логируем размер ответа
-                response_length = len(content)
-                logger.info(f"Длина ответа: {response_length} символов")
+                content = self._extract_content(response.json())
                 
                 # Сохраняем запрос и ответ для диагностики
-                debug_dir = "logs"
-                os.makedirs(debug_dir, exist_ok=True)
-                debug_file = os.path.join(debug_dir, f"lmm_debug_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
-                with open(debug_file, "w", encoding="utf-8") as f:
-                    f.write(f"==== LMM Request {datetime.now()} ====\n")
-                    f.write(f"Prompt length: {prompt_length}\n")
-                    f.write(f"Full prompt:\n{prompt}\n\n")
-                    f.write(f"==== LMM Response ====\n")
-                    f.write(f"Response length: {response_length}\n")
-                    f.write(f"Full response:\n{content}\n")
-                
-                logger.info(f"Запрос и ответ сохранены в файл: {debug_file}")
+                self._save_debug(prompt, content)
                 
                 # Парсим структурированный текст
-                results = self._parse_lmm_response(content)
+                results = self._parse_lmm_response(content, output_format)
+                if results is None:
+                    return self._send_to_lmm(prompt, output_format='text')
                 
                 # Проверка результатов
                 if not results:
@@ -411,161 +552,366 @@ class LmmService:
         
         return []
     
-    def _parse_lmm_response(self, response_text: str) -> List[Dict]:
+    def _stream_batch(self, batch: List[Dict],
+                      on_results: Optional[Callable[[List[Dict]], None]] = None) -> List[Dict]:
         """
-        Парсит ответ LMM в структурированном текстовом формате.
+        Анализирует батч в потоковом режиме (SSE).
+        
+        Каждый блок "### АНАЛИЗ ПОСТА" разбирается и передается в on_results, как
+        только он завершен. Если поток оборвался, полученные блоки сохраняются,
+        а повторная попытка отправляет в модель только оставшиеся посты.
         
         Args:
-            response_text: Текстовый ответ от LMM.
+            batch: Список постов для анализа.
+            on_results: Функция, вызываемая со списком результатов каждого завершенного блока.
             
         Returns:
-            List[Dict]: Список словарей с результатами анализа.
+            List[Dict]: Все полученные результаты анализа.
         """
-        try:
-            results = []
+        results = []
+        received = set()
+        
+        for attempt in range(self.max_retries):
+            remaining = [post for post in batch if str(post.get('post_id', '')) not in received]
+            if not remaining:
+                break
             
-            # Если ответ пустой или слишком короткий
-            if not response_text or len(response_text) < 50:
-                logger.warning(f"Слишком короткий ответ LMM: {response_text}")
-                return results
+            prompt = self._create_prompt(remaining)
+            splitter = BlockSplitter()
+            started = time.perf_counter()
+            first_result_at = None
             
-            # Проверка на нераспознанные форматы ответов
-            if "### АНАЛИЗ ПОСТА" not in response_text:
-                logger.warning("Ответ не содержит ожидаемого маркера '### АНАЛИЗ ПОСТА'")
+            def emit(blocks):
+                nonlocal first_result_at
+                for block in blocks:
+                    block_results = [result for result in self._parse_lmm_response(block, 'text')
+                                     if str(result.get('post_id')) not in received]
+                    if not block_results:
+                        continue
+                    if first_result_at is None:
+                        first_result_at = time.perf_counter() - started
+                        logger.info(f"Первый результат получен через {first_result_at:.1f} с")
+                    # Посты считаются полученными только после сохранения блока: если
+                    # on_results упал, они будут запрошены повторно
+                    if on_results is not None:
+                        on_results(block_results)
+                    received.update(str(result.get('post_id')) for result in block_results)
+                    results.extend(block_results)
+            
+            try:
+                logger.info(f"Потоковый запрос в LMM для {len(remaining)} постов (попытка {attempt+1})")
+                payload = dict(self._build_payload(prompt), stream=True)
                 
-                # Попробуем найти альтернативные маркеры
-                alternative_marker = False
-                for marker in ["Пост", "Анализ поста", "Post analysis"]:
-                    if marker in response_text:
-                        logger.info(f"Найден альтернативный маркер: {marker}")
-                        alternative_marker = True
-                        break
+                with requests.post(self.api_url, headers=self._build_headers(), json=payload,
+                                   timeout=(30, self._request_timeout(prompt)), stream=True) as response:
+                    logger.info(f"Статус ответа: {response.status_code}")
+                    response.raise_for_status()
+                    # SSE всегда в UTF-8, даже если сервер не указал кодировку
+                    response.encoding = 'utf-8'
+                    
+                    for fragment in iter_sse_content(response.iter_lines(decode_unicode=True)):
+                        emit(splitter.feed(fragment))
                 
-                if not alternative_marker:
-                    logger.error("Не удалось найти маркеры анализа поста в ответе")
-                    return results
+                emit(splitter.flush())
+                self._save_debug(prompt, splitter.content)
+                logger.info(f"Поток завершен за {time.perf_counter() - started:.1f} с, "
+                            f"получено {len(results)} результатов")
+                break
+                
+            except Exception as e:
+                logger.error(f"Ошибка при потоковом запросе к LMM: {e}")
+                logger.error(traceback.format_exc())
+                logger.info(f"До обрыва получено {len(results)} результатов из {len(batch)}")
+                
+                if attempt < self.max_retries - 1:
+                    logger.info(f"Повторная попытка через {self.retry_delay} секунд...")
+                    time.sleep(self.retry_delay)
+                else:
+                    logger.error("Исчерпаны все попытки")
+        
+        return results
+    
+    def _build_headers(self) -> Dict[str, str]:
+        """Формирует заголовки запроса к OpenRouter."""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": self.site_url,
+            "X-Title": self.site_name
+        }
+    
+    def _build_payload(self, prompt: str, output_format: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Формирует тело запроса к chat completions.
+        
+        Args:
+            prompt: Промпт для отправки.
+            output_format: Формат ответа (по умолчанию LMM_OUTPUT_FORMAT).
             
-            # Регулярные выражения для извлечения данных
-            post_blocks = re.split(r'###\s+АНАЛИЗ\s+ПОСТА\s+|Анализ\s+поста\s+|Пост\s+\d+:|Post\s+analysis\s+', response_text)
+        Returns:
+            Dict[str, Any]: Тело запроса.
+        """
+        # Проверяем длину промпта
+        prompt_length = len(prompt)
+        logger.info(f"Длина промпта: {prompt_length} символов")
+        
+        # Если промпт слишком длинный, возможно есть ограничения API
+        if prompt_length > 100000:  # Большинство API имеют лимиты на длину запроса
+            logger.warning(f"Промпт очень длинный: {prompt_length} символов. Возможно превышение лимитов API.")
+        
+        # Логируем начало и конец промпта
+        logger.debug(f"Начало промпта: {prompt[:200]}...")
+        logger.debug(f"Конец промпта: ...{prompt[-200:]}")
+        
+        # Инструкции - стабильный префикс запроса, который провайдер может кэшировать
+        output_format = output_format or self.output_format
+        system_content = self._system_prompt(output_format)
+        if self.model.startswith(self.CACHE_CONTROL_PREFIXES):
+            system_content = [{"type": "text", "text": system_content, "cache_control": {"type": "ephemeral"}}]
+        
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_content},
+                {"role": "user", "content": prompt}
+            ]
+        }
+        
+        # Ответ, ограниченный JSON-схемой
+        if output_format == 'json':
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "post_analysis", "strict": True, "schema": ANALYSIS_SCHEMA}
+            }
+        return payload
+    
+    @staticmethod
+    def _request_timeout(prompt: str) -> int:
+        """Адаптивный таймаут запроса в секундах в зависимости от длины промпта."""
+        return max(120, len(prompt) // 1000)
+    
+    @staticmethod
+    def _extract_content(response_data: Dict[str, Any]) -> str:
+        """
+        Извлекает текст ответа модели из ответа API.
+        
+        Args:
+            response_data: Распарсенный JSON-ответ API.
             
-            # Пропускаем первый элемент, если он пустой (перед первым ###)
-            if post_blocks and not post_blocks[0].strip():
-                post_blocks = post_blocks[1:]
+        Returns:
+            str: Текст ответа модели.
+        """
+        # Проверка на наличие ошибок в ответе
+        if "error" in response_data:
+            logger.error(f"Ошибка API: {response_data['error']}")
+            raise Exception(f"API вернул ошибку: {response_data['error']}")
+        
+        # Извлекаем ответ модели
+        if "choices" not in response_data or not response_data["choices"]:
+            logger.error(f"Неожиданный формат ответа: {response_data}")
+            raise Exception("Неожиданный формат ответа API: отсутствует поле 'choices'")
             
-            for block in post_blocks:
-                if not block.strip():
-                    continue
-                    
-                try:
-                    # Извлекаем post_id из первой строки разными способами
-                    post_id_patterns = [
-                        r'([^\n]+)',  # Любая строка до первого перевода строки
-                        r'(\d+)',     # Любое число
-                        r'post_id:\s*([^\n]+)',  # Явно указанный post_id
-                        r'ID:\s*([^\n]+)'  # Альтернативное указание ID
-                    ]
-                    
-                    post_id = "unknown"
-                    for pattern in post_id_patterns:
-                        match = re.search(pattern, block.strip())
-                        if match:
-                            post_id = match.group(1).strip()
-                            break
-                    
-                    # Извлекаем тональность разными способами
-                    tonality_patterns = [
-                        r'Тональность:\s*([^\n]+)',
-                        r'Тональность\s*[-:]\s*([^\n]+)',
-                        r'Тон[^:]*:\s*([^\n]+)',
-                        r'Sentiment:\s*([^\n]+)'
-                    ]
-                    
-                    tonality = ""
-                    for pattern in tonality_patterns:
-                        match = re.search(pattern, block)
-                        if match:
-                            tonality = match.group(1).strip()
-                            break
-                    
-                    # Извлекаем краткое описание разными способами
-                    description_patterns = [
-                        r'Краткое описание:\s*([^\n]+(?:\n[^\n]+)*?)(?=\nЗаголовок:|$)',
-                        r'Описание:\s*([^\n]+(?:\n[^\n]+)*?)(?=\nЗаголовок:|$)',
-                        r'Краткое содержание:\s*([^\n]+(?:\n[^\n]+)*?)(?=\nЗаголовок:|$)',
-                        r'Description:\s*([^\n]+(?:\n[^\n]+)*?)(?=\nTitle:|$)'
-                    ]
-                    
-                    description = ""
-                    for pattern in description_patterns:
-                        match = re.search(pattern, block, re.DOTALL)
-                        if match:
-                            description = match.group(1).strip()
-                            break
-                    
-                    # Извлекаем заголовок разными способами
-                    title_patterns = [
-                        r'Заголовок:\s*([^\n]+)',
-                        r'Заголовок\s*[-:]\s*([^\n]+)',
-                        r'Тема:\s*([^\n]+)',
-                        r'Title:\s*([^\n]+)'
-                    ]
-                    
-                    title = ""
-                    for pattern in title_patterns:
-                        match = re.search(pattern, block)
-                        if match:
-                            title = match.group(1).strip()
-                            break
-                    
-                    # Проверяем, что получены хотя бы некоторые данные
-                    if any([tonality, description, title]) or post_id != "unknown":
-                        results.append({
-                            "post_id": post_id,
-                            "tonality": tonality,
-                            "description": description,
-                            "title": title
-                        })
-                    else:
-                        logger.warning(f"Не удалось извлечь данные из блока: {block[:100]}...")
-                    
-                except Exception as e:
-                    logger.error(f"Ошибка при парсинге блока ответа: {e}")
-                    logger.error(f"Содержимое блока: {block[:200]}...")
-                    logger.error(traceback.format_exc())
+        content = response_data["choices"][0]["message"]["content"]
+        
+        # Логируем размер ответа
+        logger.info(f"Длина ответа: {len(content)} символов")
+        return content
+    
+    @staticmethod
+    def _save_debug(prompt: str, content: str):
+        """Сохраняет запрос и ответ в файл для диагностики."""
+        debug_dir = "logs"
+        os.makedirs(debug_dir, exist_ok=True)
+        debug_file = os.path.join(debug_dir, f"lmm_debug_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.txt")
+        with open(debug_file, "w", encoding="utf-8") as f:
+            f.write(f"==== LMM Request {datetime.now()} ====\n")
+            f.write(f"Prompt length: {len(prompt)}\n")
+            f.write(f"Full prompt:\n{prompt}\n\n")
+            f.write(f"==== LMM Response ====\n")
+            f.write(f"Response length: {len(content)}\n")
+            f.write(f"Full response:\n{content}\n")
+        
+        logger.info(f"Запрос и ответ сохранены в файл: {debug_file}")
+    
+    def _parse_lmm_response(self, response_text: str, output_format: Optional[str] = None) -> Optional[List[Dict]]:
+        """
+        Парсит ответ LMM в формате, в котором он был запрошен.
+        
+        Args:
+            response_text: Текстовый ответ от LMM.
+            output_format: Формат запроса (по умолчанию LMM_OUTPUT_FORMAT).
             
+        Returns:
+            Optional[List[Dict]]: Список словарей с результатами анализа или None,
+                если ответ в режиме JSON не соответствует схеме (батч нужно
+                запросить повторно в текстовом формате).
+        """
+        if (output_format or self.output_format) == 'json':
+            results = parse_json_response(response_text)
+            if results is None:
+                logger.warning("Ответ LMM не соответствует JSON-схеме, батч будет запрошен в текстовом формате")
             return results
-        except Exception as e:
-            logger.error(f"Ошибка при парсинге ответа LMM: {e}")
-            logger.error(traceback.format_exc())
-            return []
+        return parse_response(response_text)
 
-    def _get_content_hash(self, content: str) -> str:
-        """Создаёт простой хэш контента для использования в кэше."""
-        # Используем простое хеширование для нахождения похожих постов
-        # Берем только первые 200 символов, чтобы похожие посты имели одинаковый хэш
-        content_sample = content[:200].lower()
-        return hashlib.md5(content_sample.encode('utf-8')).hexdigest()
+    def _cache_key(self, post: Dict) -> str:
+        """Создаёт ключ постоянного кэша по полному тексту поста, объекту, модели и версии промпта."""
+        return LmmResultCache.make_key(post.get('content', ''), post.get('object', ''),
+                                       self.model, self.PROMPT_VERSION)
+
+    def _lookup_cache(self, posts: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Ищет готовые результаты анализа постов в постоянном кэше.
+        
+        Args:
+            posts: Список постов для анализа.
+            
+        Returns:
+            Tuple[List[Dict], List[Dict]]: Результаты из кэша и посты, которых в кэше нет.
+        """
+        if self.result_cache is None or not posts:
+            return [], posts
+        
+        keys = [self._cache_key(post) for post in posts]
+        found = self.result_cache.get_many(keys)
+        
+        cached_results = []
+        misses = []
+        for post, key in zip(posts, keys):
+            if key in found:
+                cached_results.append(dict(found[key], post_id=str(post.get('post_id', ''))))
+            else:
+                misses.append(post)
+        
+        logger.info(f"Кэш LMM: попаданий {len(cached_results)}, промахов {len(misses)}, "
+                    f"статистика {self.result_cache.stats()}")
+        return cached_results, misses
 
     def _update_cache(self, batch: List[Dict], results: List[Dict]):
-        """Обновляет кэш результатов для обеспечения консистентности."""
-        for i, post in enumerate(batch):
-            if i >= len(results) or not post or not results[i]:
+        """Сохраняет результаты анализа батча в постоянный кэш."""
+        if self.result_cache is None:
+            return
+        
+        posts_by_id = {str(post.get('post_id', '')): post for post in batch}
+        items = {}
+        for result in results:
+            post = posts_by_id.get(str(result.get('post_id', '')))
+            if post is None:
                 continue
+            # Сохраняем результат в кэш без post_id
+            items[self._cache_key(post)] = {
+                'tonality': result.get('tonality', ''),
+                'description': result.get('description', ''),
+                'title': result.get('title', '')
+            }
+        
+        self.result_cache.set_many(items)
+    
+    @staticmethod
+    def _filter_batch_results(batch: List[Dict], results: List[Dict]) -> List[Dict]:
+        """Оставляет только результаты для постов батча (модель могла исказить post_id)."""
+        requested = {str(post.get('post_id', '')) for post in batch}
+        kept = [result for result in results if str(result.get('post_id')) in requested]
+        if len(kept) < len(results):
+            unknown = [result.get('post_id') for result in results if str(result.get('post_id')) not in requested]
+            logger.warning(f"Отброшены результаты с post_id не из батча: {unknown}")
+        return kept
+    
+    def requeue_missing(self, batch: List[Dict], results: List[Dict],
+                        duplicates: Optional[Dict[str, List[str]]] = None, depth: int = 0) -> Dict[str, int]:
+        """
+        Повторно отправляет на анализ посты батча, для которых нет результата.
+        
+        Пропущенные посты делятся пополам на новые батчи. После max_retry_depth
+        повторов посты записываются в таблицу analysis_failures. Посты,
+        успешно проанализированные сейчас, из этой таблицы удаляются.
+        
+        Args:
+            batch: Отправленный батч постов.
+            results: Полученные результаты анализа.
+            duplicates: Словарь почти-дубликатов: post_id представителя -> post_id копий.
+            depth: Глубина повторной отправки батча.
+            
+        Returns:
+            Dict[str, int]: Количество пропущенных (missing), отправленных повторно
+                (requeued) и записанных в analysis_failures (failed) постов.
+        """
+        received = {str(result.get('post_id')) for result in results}
+        missing = [post for post in batch if str(post.get('post_id', '')) not in received]
+        stats = {'missing': len(missing), 'requeued': 0, 'failed': 0}
+        
+        try:
+            if received:
+                AnalysisFailure.query.filter(AnalysisFailure.post_id.in_(list(received))) \
+                    .delete(synchronize_session=False)
+                db.session.commit()
             
-            result = results[i]
-            obj = post.get('object', '')
-            content_hash = self._get_content_hash(post.get('content', ''))
-            cache_key = f"{obj}:{content_hash}"
+            if not missing:
+                return stats
             
-            # Сохраняем результат в кэш без post_id
-            cached_result = result.copy()
-            # Используем только нужные поля
-            self.results_cache[cache_key] = {
-                'post_id': cached_result.get('post_id', ''),
-                'tonality': cached_result.get('tonality', ''),
-                'description': cached_result.get('description', ''),
-                'title': cached_result.get('title', '')
+            if depth < self.max_retry_depth:
+                size = math.ceil(len(missing) / 2)
+                for start in range(0, len(missing), size):
+                    part = missing[start:start + size]
+                    analyze_batch_task.delay(part, self.api_key, self.model, self.site_url, self.site_name,
+                                             duplicates=self._batch_duplicates(part, duplicates or {}),
+                                             depth=depth + 1)
+                    stats['requeued'] += len(part)
+                logger.warning(f"Модель пропустила {len(missing)} из {len(batch)} постов, "
+                               f"повторная отправка (глубина {depth + 1})")
+            else:
+                self._record_failures(missing, f"Нет результата после {depth} повторных отправок")
+                stats['failed'] = len(missing)
+                logger.error(f"{len(missing)} постов записаны в analysis_failures: "
+                             f"{[post.get('post_id') for post in missing]}")
+        except Exception as e:
+            logger.error(f"Ошибка при повторной отправке пропущенных постов: {e}")
+            logger.error(traceback.format_exc())
+            db.session.rollback()
+        
+        return stats
+    
+    def _record_failures(self, posts: List[Dict], reason: str):
+        """Записывает посты в таблицу analysis_failures (увеличивая счетчик попыток)."""
+        now = datetime.utcnow()
+        rows = {
+            str(post.get('post_id', '')): {
+                'post_id': str(post.get('post_id', '')),
+                'object_name': post.get('object', ''),
+                'reason': reason,
+                'attempts': 1,
+                'model_used': self.model,
+                'created_at': now,
+                'updated_at': now,
             }
+            for post in posts
+        }
+        
+        if supports_upsert():
+            table = AnalysisFailure.__table__
+            stmt = dialect_insert(table).values(list(rows.values()))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.post_id],
+                set_={
+                    'reason': stmt.excluded.reason,
+                    'model_used': stmt.excluded.model_used,
+                    'attempts': table.c.attempts + 1,
+                    'updated_at': stmt.excluded.updated_at,
+                }
+            )
+            db.session.execute(stmt)
+        else:
+            existing = {failure.post_id: failure for failure in
+                        AnalysisFailure.query.filter(AnalysisFailure.post_id.in_(list(rows))).all()}
+            for post_id, row in rows.items():
+                failure = existing.get(post_id)
+                if failure:
+                    failure.reason = reason
+                    failure.model_used = self.model
+                    failure.attempts = (failure.attempts or 0) + 1
+                else:
+                    db.session.add(AnalysisFailure(**row))
+        
+        db.session.commit()
     
     def _parse_tonality(self, tonality_str: str) -> TonalityType:
         """
@@ -587,42 +933,3 @@ class LmmService:
         else:
             return TonalityType.UNKNOWN
 
-
-@shared_task
-def analyze_batch_task(batch, api_key, model, site_url, site_name):
-    """
-    Celery-задача для асинхронного анализа батча постов.
-    
-    Args:
-        batch: Список постов для анализа.
-        api_key: API ключ для LMM.
-        model: Название модели для LMM.
-        site_url: URL сайта.
-        site_name: Название сайта.
-        
-    Returns:
-        List[Dict]: Результаты анализа.
-    """
-    try:
-        logger.info(f"Запуск асинхронной задачи анализа батча из {len(batch)} постов")
-        
-        # Создаем экземпляр сервиса LMM для анализа
-        lmm_service = LmmService(api_key=api_key, model=model, site_url=site_url, site_name=site_name)
-        
-        # Создаем промпт для текущего батча
-        prompt = lmm_service._create_prompt(batch)
-        
-        # Отправляем запрос в LMM
-        results = lmm_service._send_to_lmm(prompt)
-        
-        logger.info(f"Задача завершена, получено {len(results)} результатов")
-        
-        # Обрабатываем результаты и сохраняем в БД
-        with app.app_context():
-            lmm_service.process_results(results)
-        
-        return results
-    except Exception as e:
-        logger.error(f"Ошибка при выполнении задачи анализа батча: {e}")
-        logger.error(traceback.format_exc())
-        return []
\ No newline at end of file
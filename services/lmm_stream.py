@@ -0,0 +1,111 @@
+import json
+import re
+from typing import Iterable, Iterator, List
+from loguru import logger
+
+# Начало блока анализа поста в ответе модели
+BLOCK_MARKER_PATTERN = re.compile(r'###\s+АНАЛИЗ\s+ПОСТА')
+# Завершенная строка заголовка - последнего поля блока
+TITLE_LINE_PATTERN = re.compile(r'\n[ \t]*Заголовок\s*[-:][ \t]*\S[^\n]*\n')
+
+def iter_sse_content(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Извлекает фрагменты текста ответа из потока Server-Sent Events OpenRouter.
+
+    Args:
+        lines: Строки потока SSE (например, response.iter_lines(decode_unicode=True)).
+
+    Yields:
+        str: Очередной фрагмент текста ответа модели.
+    """
+    for line in lines:
+        # Пустые строки разделяют события, строки с ":" - служебные комментарии
+        if not line or line.startswith(':'):
+            continue
+        if not line.startswith('data:'):
+            continue
+
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            return
+
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            logger.warning(f"Некорректный фрагмент потока LMM: {data[:200]}")
+            continue
+
+        if 'error' in chunk:
+            raise Exception(f"API вернул ошибку в потоке: {chunk['error']}")
+
+        for choice in chunk.get('choices') or []:
+            content = (choice.get('delta') or {}).get('content')
+            if content:
+                yield content
+
+
+class BlockSplitter:
+    """
+    Выделяет завершенные блоки "### АНАЛИЗ ПОСТА" из потока текста.
+
+    Блок считается завершенным, когда в потоке начался следующий блок
+    или когда дописана строка заголовка (последнее поле блока по формату
+    промпта).
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.text = []
+
+    def feed(self, fragment: str) -> List[str]:
+        """
+        Добавляет фрагмент ответа и возвращает завершенные блоки.
+
+        Args:
+            fragment: Очередной фрагмент текста ответа.
+
+        Returns:
+            List[str]: Тексты завершенных блоков.
+        """
+        self.text.append(fragment)
+        self.buffer += fragment
+        blocks = []
+
+        while True:
+            start = BLOCK_MARKER_PATTERN.search(self.buffer)
+            if start is None:
+                # Оставляем хвост, в котором может начинаться маркер
+                self.buffer = self.buffer[-32:]
+                break
+
+            next_start = BLOCK_MARKER_PATTERN.search(self.buffer, start.end())
+            title = TITLE_LINE_PATTERN.search(self.buffer, start.end())
+            if title is not None and (next_start is None or title.end() <= next_start.start()):
+                end = title.end()
+            elif next_start is not None:
+                end = next_start.start()
+            else:
+                self.buffer = self.buffer[start.start():]
+                break
+
+            blocks.append(self.buffer[start.start():end])
+            self.buffer = self.buffer[end:]
+
+        return blocks
+
+    def flush(self) -> List[str]:
+        """
+        Возвращает последний блок после окончания потока.
+
+        Returns:
+            List[str]: Текст оставшегося блока (если он есть).
+        """
+        start = BLOCK_MARKER_PATTERN.search(self.buffer)
+        rest = self.buffer[start.start():] if start is not None else ''
+        self.buffer = ''
+        return [rest] if rest.strip() else []
+
+    @property
+    def content(self) -> str:
+        """Полный полученный текст ответа."""
+        return ''.join(self.text)
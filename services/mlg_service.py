@@ -1,20 +1,91 @@
+import math
+import os
+import threading
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from zoneinfo import ZoneInfo
 
+import requests
 import zeep
+from requests.adapters import HTTPAdapter
+from zeep.cache import SqliteCache
+from zeep.transports import Transport
 from loguru import logger
 from flask import current_app
 
 from models.database import db
 from models.post_model import Post, BlogHostType
 from services.object_service import ObjectService
+from utils.sql import dialect_insert, supports_upsert
+
+# Клиенты zeep, созданные в текущем процессе (ключ - pid и URL WSDL)
+_clients: Dict[Tuple[int, str], zeep.Client] = {}
+_clients_lock = threading.Lock()
+
+def get_mlg_client(wsdl: str, pool_size: int = 4, cache_path: Optional[str] = None,
+                   cache_timeout: Optional[int] = None) -> zeep.Client:
+    """
+    Возвращает общий для процесса клиент zeep, создавая его при первом обращении.
+
+    WSDL разбирается один раз на процесс, клиент используется всеми потоками.
+    Загруженные WSDL/XSD сохраняются в дисковый кэш, поэтому при холодном
+    старте клиент создается без обращения к сети.
+
+    Args:
+        wsdl: URL WSDL API Медиалогии.
+        pool_size: Размер пула HTTP-соединений.
+        cache_path: Путь к файлу дискового кэша WSDL/XSD (None - без кэша).
+        cache_timeout: Время жизни записей кэша в секундах (None - без ограничения).
+
+    Returns:
+        zeep.Client: Клиент API Медиалогии.
+    """
+    # После fork процесса соединения родителя не используются
+    key = (os.getpid(), wsdl)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            started = time.perf_counter()
+
+            # Общая HTTP-сессия с пулом соединений на все потоки загрузки
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+
+            cache = None
+            if cache_path:
+                os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+                cache = SqliteCache(path=cache_path, timeout=cache_timeout)
+
+            client = zeep.Client(wsdl=wsdl, transport=Transport(session=session, cache=cache))
+            _clients[key] = client
+
+            logger.info(f"Клиент Медиалогии создан за {time.perf_counter() - started:.3f} с (WSDL {wsdl})")
+    return client
+
+def reset_mlg_clients():
+    """Сбрасывает клиенты zeep текущего процесса (следующий вызов создаст клиент заново)."""
+    with _clients_lock:
+        _clients.clear()
 
 class MlgService:
     """Сервис для работы с API Медиалогии."""
     
-    def __init__(self, username=None, password=None, wsdl=None):
+    # Колонки поста, которые приходят из Медиалогии и сравниваются при обновлении
+    POST_COMPARE_COLUMNS = (
+        'post_id', 'title', 'content', 'blog_host', 'blog_host_type',
+        'published_on', 'simhash', 'url', 'object_ids',
+    )
+
+    def __init__(self, username=None, password=None, wsdl=None, fetch_workers=None):
         """
         Инициализация сервиса с данными для доступа к API.
         
@@ -22,14 +93,21 @@ class MlgService:
             username (str, optional): Имя пользователя для API Медиалогии.
             password (str, optional): Пароль для API Медиалогии.
             wsdl (str, optional): URL WSDL API Медиалогии.
+            fetch_workers (int, optional): Количество параллельно загружаемых страниц.
         """
         self.username = username or current_app.config['MEDIALOGIA_USERNAME']
         self.password = password or current_app.config['MEDIALOGIA_PASSWORD']
         self.wsdl = wsdl or current_app.config['MEDIALOGIA_WSDL_URL']
+        self.fetch_workers = fetch_workers or current_app.config.get('MEDIALOGIA_FETCH_WORKERS', 4)
         self.batch_size = 200
         
         try:
-            self.client = zeep.Client(wsdl=self.wsdl)
+            self.client = get_mlg_client(
+                self.wsdl,
+                pool_size=self.fetch_workers,
+                cache_path=current_app.config.get('MEDIALOGIA_WSDL_CACHE'),
+                cache_timeout=current_app.config.get('MEDIALOGIA_WSDL_CACHE_TIMEOUT'),
+            )
             logger.info(f"Инициализация Медиалогии: WSDL {self.wsdl}")
         except Exception as e:
             logger.error(f"Ошибка инициализации клиента Медиалогии: {e}")
@@ -64,7 +142,7 @@ class MlgService:
             logger.error(traceback.format_exc())
             raise
     
-    def get_posts(self, report_id: str, date_from: datetime, date_to: datetime, page: int = 1) -> List[Post]:
+    def get_posts(self, report_id: str, date_from: datetime, date_to: datetime) -> List[Post]:
         """
         Получение постов из Медиалогии за указанный период.
         
@@ -72,7 +150,6 @@ class MlgService:
             report_id: ID отчета в Медиалогии.
             date_from: Начальная дата периода.
             date_to: Конечная дата периода.
-            page: Номер страницы (для пагинации).
         
         Returns:
             List[Post]: Список объектов Post.
@@ -80,20 +157,74 @@ class MlgService:
         logger.info(f"Получение постов: report_id={report_id}, date_from={date_from}, date_to={date_to}")
         
         try:
-            posts = self.get_posts_page(report_id, date_from, date_to, page, self.batch_size)
-            
-            logger.info(f"Получено постов на первой странице: {len(posts)}")
-            
-            if len(posts) == self.batch_size:
-                logger.info("Загрузка следующих страниц...")
-                posts += self.get_posts(report_id, date_from, date_to, page + 1)
-
+            posts = []
+            for cubus_posts in self.iter_post_pages(report_id, date_from, date_to):
+                posts += self.parse_posts(cubus_posts)
             return posts
         except Exception as e:
             logger.error(f"Ошибка получения постов: {e}")
             logger.error(traceback.format_exc())
             return []
     
+    def iter_post_pages(self, report_id: str, date_from: datetime, date_to: datetime,
+                        max_workers: Optional[int] = None) -> Iterator[list]:
+        """
+        Параллельная загрузка страниц постов с выдачей по одной странице.
+        
+        Количество страниц вычисляется заранее по GetPostsStatsByDate, страницы
+        загружаются пулом потоков, одновременно в памяти находится не больше
+        max_workers страниц. Страницы выдаются в порядке завершения загрузки.
+        
+        Args:
+            report_id: ID отчета в Медиалогии.
+            date_from: Начальная дата периода.
+            date_to: Конечная дата периода.
+            max_workers: Количество параллельных загрузок.
+        
+        Yields:
+            list: Посты одной страницы в формате API Медиалогии.
+        """
+        max_workers = max_workers or self.fetch_workers
+        n_posts = self.get_n_posts(report_id, date_from, date_to)
+        n_pages = max(1, math.ceil(n_posts / self.batch_size))
+        logger.info(f"Загрузка {n_pages} страниц в {max_workers} потоков")
+        
+        last_page_size = 0
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mlg-fetch') as executor:
+            pending = {}
+            next_page = 1
+            
+            def submit_next():
+                nonlocal next_page
+                future = executor.submit(
+                    self.fetch_page, report_id, date_from, date_to, next_page, self.batch_size
+                )
+                pending[future] = next_page
+                next_page += 1
+            
+            while next_page <= n_pages and len(pending) < max_workers:
+                submit_next()
+            
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page_index = pending.pop(future)
+                    cubus_posts = future.result()
+                    if page_index == n_pages:
+                        last_page_size = len(cubus_posts)
+                    if next_page <= n_pages:
+                        submit_next()
+                    yield cubus_posts
+        
+        # Статистика могла отстать от реального количества постов - догружаем остаток
+        page_index = n_pages
+        while last_page_size == self.batch_size:
+            page_index += 1
+            logger.info(f"Загрузка дополнительной страницы {page_index}")
+            cubus_posts = self.fetch_page(report_id, date_from, date_to, page_index, self.batch_size)
+            last_page_size = len(cubus_posts)
+            yield cubus_posts
+    
     def get_posts_page(self, report_id: str, date_from: datetime, date_to: datetime, 
                        page_index: int, page_size: Optional[int] = None) -> List[Post]:
         """
@@ -109,33 +240,80 @@ class MlgService:
         Returns:
             List[Post]: Список объектов Post.
         """
-        if not page_size:
-            page_size = self.batch_size
-        
-        logger.info(f"Получение страницы {page_index} по {page_size} постов")
-        
         try:
-            reply = self.call_api(
-                "GetPosts",
-                credentials={"Login": self.username, "Password": self.password},
-                reportId=report_id,
-                dateFrom=date_from,
-                dateTo=date_to,
-                pageIndex=page_index,
-                pageSize=page_size,
-            )
-
-            # Обработка ответа с учетом структуры Zeep
-            cubus_posts = getattr(reply.Posts, 'CubusPost', []) if hasattr(reply, 'Posts') else []
-            
-            logger.info(f"Получено постов на странице {page_index}: {len(cubus_posts)}")
-            
+            cubus_posts = self.fetch_page(report_id, date_from, date_to, page_index, page_size)
             return self.parse_posts(cubus_posts)
         except Exception as e:
             logger.error(f"Ошибка получения страницы постов: {e}")
             logger.error(traceback.format_exc())
             return []
     
+    def fetch_page(self, report_id: str, date_from: datetime, date_to: datetime,
+                   page_index: int, page_size: Optional[int] = None) -> list:
+        """
+        Загрузка одной страницы постов из Медиалогии без сохранения в БД.
+        
+        Args:
+            report_id: ID отчета в Медиалогии.
+            date_from: Начальная дата периода.
+            date_to: Конечная дата периода.
+            page_index: Номер страницы.
+            page_size: Размер страницы (кол-во постов).
+        
+        Returns:
+            list: Посты в формате API Медиалогии.
+        """
+        if not page_size:
+            page_size = self.batch_size
+        
+        logger.info(f"Получение страницы {page_index} по {page_size} постов")
+        
+        reply = self.call_api(
+            "GetPosts",
+            credentials={"Login": self.username, "Password": self.password},
+            reportId=report_id,
+            dateFrom=date_from,
+            dateTo=date_to,
+            pageIndex=page_index,
+            pageSize=page_size,
+        )
+
+        # Обработка ответа с учетом структуры Zeep
+        cubus_posts = getattr(reply.Posts, 'CubusPost', []) if hasattr(reply, 'Posts') else []
+        
+        logger.info(f"Получено постов на странице {page_index}: {len(cubus_posts)}")
+        return cubus_posts
+    
+    def ingest_posts(self, report_id: str, date_from: datetime, date_to: datetime) -> Dict[str, Any]:
+        """
+        Загрузка постов из Медиалогии за период с пакетным сохранением по страницам.
+        
+        Страницы загружаются параллельно и сохраняются по мере поступления.
+        
+        Args:
+            report_id: ID отчета в Медиалогии.
+            date_from: Начальная дата периода.
+            date_to: Конечная дата периода.
+        
+        Returns:
+            Dict[str, Any]: Суммарное количество вставленных, обновленных и неизмененных постов
+                и максимальная дата публикации (max_published_on).
+        """
+        logger.info(f"Пакетная загрузка постов: report_id={report_id}, date_from={date_from}, date_to={date_to}")
+        
+        totals = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'max_published_on': None}
+        
+        for cubus_posts in self.iter_post_pages(report_id, date_from, date_to):
+            page_stats = self.upsert_posts(cubus_posts)
+            for key in ('inserted', 'updated', 'unchanged'):
+                totals[key] += page_stats[key]
+            if page_stats['max_published_on'] and (
+                    totals['max_published_on'] is None or page_stats['max_published_on'] > totals['max_published_on']):
+                totals['max_published_on'] = page_stats['max_published_on']
+        
+        logger.info(f"Пакетная загрузка завершена: {totals}")
+        return totals
+    
     def get_n_posts(self, report_id: str, date_from: datetime, date_to: datetime) -> int:
         """
         Получение количества постов за указанный период.
@@ -149,19 +327,7 @@ class MlgService:
             int: Количество постов.
         """
         try:
-            reply = self.call_api(
-                "GetPostsStatsByDate",
-                credentials={"Login": self.username, "Password": self.password},
-                reportId=report_id,
-                dateFrom=date_from,
-                dateTo=date_to,
-            )
-
-            # Обработка с учетом структуры Zeep
-            count = sum(
-                entry.PostsCount
-                for entry in getattr(reply.Entries, 'CubusDateStats', [])
-            )
+            count = sum(posts_count for _, posts_count in self.get_posts_stats(report_id, date_from, date_to))
             
             logger.info(f"Количество постов: {count}")
             return count
@@ -170,6 +336,32 @@ class MlgService:
             logger.error(traceback.format_exc())
             return 0
     
+    def get_posts_stats(self, report_id: str, date_from: datetime, date_to: datetime) -> List[Tuple[datetime, int]]:
+        """
+        Получение количества постов по дням за указанный период.
+        
+        Args:
+            report_id: ID отчета в Медиалогии.
+            date_from: Начальная дата периода.
+            date_to: Конечная дата периода.
+        
+        Returns:
+            List[Tuple[datetime, int]]: Список пар (дата, количество постов).
+        """
+        reply = self.call_api(
+            "GetPostsStatsByDate",
+            credentials={"Login": self.username, "Password": self.password},
+            reportId=report_id,
+            dateFrom=date_from,
+            dateTo=date_to,
+        )
+
+        # Обработка с учетом структуры Zeep
+        return [
+            (getattr(entry, 'Date', None), entry.PostsCount)
+            for entry in getattr(reply.Entries, 'CubusDateStats', [])
+        ]
+    
     def parse_posts(self, cubus_posts) -> List[Post]:
         """
         Преобразование постов из формата Медиалогии в модели Post.
@@ -207,7 +399,7 @@ class MlgService:
                     existing_post.content = content
                     existing_post.blog_host = cubus_dict.get("BlogHost", "")
                     existing_post.blog_host_type = self.parse_blog_host_type(cubus_dict.get("BlogHostType"))
-                    existing_post.published_on = cubus_dict.get("PublishDate")
+                    existing_post.published_on = self.normalize_published_on(cubus_dict.get("PublishDate"))
                     existing_post.simhash = str(cubus_dict.get("Simhash", ""))
                     existing_post.url = cubus_dict.get("Url", "")
                     existing_post.object_ids_list = object_ids
@@ -222,7 +414,7 @@ class MlgService:
                         content=content,
                         blog_host=cubus_dict.get("BlogHost", ""),
                         blog_host_type=self.parse_blog_host_type(cubus_dict.get("BlogHostType")),
-                        published_on=cubus_dict.get("PublishDate"),
+                        published_on=self.normalize_published_on(cubus_dict.get("PublishDate")),
                         simhash=str(cubus_dict.get("Simhash", "")),
                         url=cubus_dict.get("Url", ""),
                         created_at=datetime.utcnow(),
@@ -246,7 +438,205 @@ class MlgService:
         
         logger.info(f"Успешно обработано постов: {len(posts)}")
         return posts
-    
+
+    def upsert_posts(self, cubus_posts) -> Dict[str, Any]:
+        """
+        Пакетное сохранение страницы постов из Медиалогии.
+
+        Существующие посты страницы загружаются одним запросом, новые и
+        измененные строки записываются одним INSERT ... ON CONFLICT,
+        связи с объектами - одним INSERT, коммит выполняется один раз.
+
+        Args:
+            cubus_posts: Посты в формате API Медиалогии.
+
+        Returns:
+            Dict[str, Any]: Количество вставленных, обновленных и неизмененных постов
+                и максимальная дата публикации на странице (max_published_on).
+        """
+        stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'max_published_on': None}
+
+        if not supports_upsert():
+            logger.warning("БД не поддерживает INSERT ... ON CONFLICT, используется построчная обработка")
+            return self._parse_posts_with_stats(cubus_posts, stats)
+
+        # Преобразуем посты в строки таблицы, последний дубликат post_id побеждает
+        rows = {}
+        for cubus_post in cubus_posts:
+            try:
+                row = self.build_post_row(cubus_post)
+                if row['post_id']:
+                    rows[row['post_id']] = row
+            except Exception as e:
+                logger.error(f"Ошибка при обработке поста: {e}")
+                logger.error(traceback.format_exc())
+
+        if not rows:
+            return stats
+
+        # Один запрос на все существующие посты страницы
+        existing = {
+            row.post_id: row
+            for row in db.session.query(*[getattr(Post, column) for column in self.POST_COMPARE_COLUMNS])
+            .filter(Post.post_id.in_(rows.keys()))
+        }
+
+        published = [row['published_on'] for row in rows.values() if isinstance(row['published_on'], datetime)]
+        stats['max_published_on'] = max(published) if published else None
+
+        now = datetime.utcnow()
+        changed_rows = []
+        for post_id, row in rows.items():
+            current = existing.get(post_id)
+            if current is None:
+                stats['inserted'] += 1
+            elif self._is_post_row_unchanged(current, row):
+                stats['unchanged'] += 1
+                continue
+            else:
+                stats['updated'] += 1
+            changed_rows.append(dict(row, created_at=now, updated_at=now))
+
+        try:
+            if changed_rows:
+                stmt = dialect_insert(Post.__table__).values(changed_rows)
+                update_columns = [column for column in self.POST_COMPARE_COLUMNS if column != 'post_id']
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['post_id'],
+                    set_={column: stmt.excluded[column] for column in update_columns + ['updated_at']}
+                )
+                db.session.execute(stmt)
+
+                # Связываем новые и измененные посты с объектами (прежние связи заменяются)
+                changed_ids = [row['post_id'] for row in changed_rows]
+                post_pks = dict(
+                    db.session.query(Post.post_id, Post.id).filter(Post.post_id.in_(changed_ids))
+                )
+                post_object_ids = {
+                    post_pks[row['post_id']]: row['object_ids'].split(', ') if row['object_ids'] else []
+                    for row in changed_rows
+                    if row['post_id'] in post_pks
+                }
+                ObjectService().link_objects_with_posts(post_object_ids, replace=True)
+
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Ошибка пакетного сохранения постов: {e}")
+            logger.error(traceback.format_exc())
+            db.session.rollback()
+            raise
+
+        logger.info(
+            f"Пакетно сохранено постов: вставлено {stats['inserted']}, "
+            f"обновлено {stats['updated']}, без изменений {stats['unchanged']}"
+        )
+        return stats
+
+    def _parse_posts_with_stats(self, cubus_posts, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Построчное сохранение страницы постов (parse_posts) с подсчетом статистики upsert_posts.
+
+        Построчная обработка перезаписывает все существующие посты, поэтому
+        они считаются обновленными, а неизмененных постов не бывает.
+
+        Args:
+            cubus_posts: Посты в формате API Медиалогии.
+            stats: Статистика для заполнения.
+
+        Returns:
+            Dict[str, Any]: Статистика (см. upsert_posts).
+        """
+        cubus_posts = list(cubus_posts)
+        post_ids = set()
+        for cubus_post in cubus_posts:
+            cubus_dict = dict(cubus_post.__values__) if hasattr(cubus_post, '__values__') else cubus_post
+            post_ids.add(str(cubus_dict.get('PostId', '')))
+        existing_ids = {
+            post_id for (post_id,) in db.session.query(Post.post_id).filter(Post.post_id.in_(post_ids))
+        }
+
+        posts = self.parse_posts(cubus_posts)
+        saved_ids = {post.post_id for post in posts}
+        stats['inserted'] = len(saved_ids - existing_ids)
+        stats['updated'] = len(saved_ids & existing_ids)
+        published = [post.published_on for post in posts if isinstance(post.published_on, datetime)]
+        stats['max_published_on'] = max(published) if published else None
+        return stats
+
+    @classmethod
+    def build_post_row(cls, cubus_post) -> Dict[str, Any]:
+        """
+        Преобразование поста из формата Медиалогии в строку таблицы posts.
+
+        Args:
+            cubus_post: Пост в формате API Медиалогии.
+
+        Returns:
+            Dict[str, Any]: Значения колонок поста.
+        """
+        # Преобразование объекта Zeep в словарь
+        if hasattr(cubus_post, '__values__'):
+            cubus_dict = dict(cubus_post.__values__)
+        else:
+            cubus_dict = cubus_post
+
+        content = cls.get_content(cubus_dict)
+        object_ids = cls.get_object_ids(cubus_dict)
+        published_on = cls.normalize_published_on(cubus_dict.get("PublishDate"))
+
+        return {
+            'post_id': str(cubus_dict.get('PostId', '')),
+            'title': cls.get_title(cubus_dict, content),
+            'content': content,
+            'blog_host': cubus_dict.get("BlogHost", ""),
+            'blog_host_type': cls.parse_blog_host_type(cubus_dict.get("BlogHostType")),
+            'published_on': published_on,
+            'simhash': str(cubus_dict.get("Simhash", "")),
+            'url': cubus_dict.get("Url", ""),
+            'object_ids': ", ".join(str(obj_id) for obj_id in object_ids),
+        }
+
+    @staticmethod
+    def _is_post_row_unchanged(current, row: Dict[str, Any]) -> bool:
+        """
+        Проверка, совпадает ли сохраненный пост с пришедшими данными.
+        
+        Пост считается неизмененным, если совпадают контент, simhash и набор объектов.
+
+        Args:
+            current: Строка поста из БД.
+            row: Новые значения колонок поста.
+
+        Returns:
+            bool: True, если обновление не требуется.
+        """
+        def object_set(object_ids):
+            return {obj_id.strip() for obj_id in (object_ids or '').split(',') if obj_id.strip()}
+
+        return (
+            (current.content or '') == (row['content'] or '')
+            and (current.simhash or '') == (row['simhash'] or '')
+            and object_set(current.object_ids) == object_set(row['object_ids'])
+        )
+
+    @staticmethod
+    def normalize_published_on(published_on):
+        """
+        Приведение даты публикации к московскому времени без временной зоны.
+
+        Посты хранятся в московском времени, как и до инкрементальной
+        синхронизации: по нему работают фильтры дат и отображение постов.
+
+        Args:
+            published_on: Дата публикации из API.
+
+        Returns:
+            Дата публикации в московском времени без временной зоны.
+        """
+        if isinstance(published_on, datetime) and published_on.tzinfo is not None:
+            return published_on.astimezone(ZoneInfo('Europe/Moscow')).replace(tzinfo=None)
+        return published_on
+
     @staticmethod
     def parse_blog_host_type(blog_host_type_value) -> BlogHostType:
         """
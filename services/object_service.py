@@ -1,10 +1,13 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterable, Optional
 from loguru import logger
 
 from models.database import db
 from models.object_model import Object, post_objects
 from models.post_model import Post
 
+# Число публикаций объекта, до которого его посты выбираются по индексу объекта
+SPARSE_OBJECT_LINKS = 5000
+
 class ObjectService:
     """Сервис для работы с объектами."""
     
@@ -12,6 +15,8 @@ class ObjectService:
         """Инициализация сервиса."""
         # Загружаем словарь соответствия ID объектов и их названий
         self.object_mapping = self._load_object_mapping()
+        # ID объектов, которых нет в БД (повторно не запрашиваются)
+        self.missing_object_ids = set()
     
     def _load_object_mapping(self) -> Dict[str, str]:
         """
@@ -122,14 +127,9 @@ class ObjectService:
                 if obj:
                     objects.append(obj)
                 else:
-                    # Если объект не найден, проверяем словарь
-                    name = self.object_mapping.get(obj_id)
-                    if name:
-                        # Создаем объект, если есть информация о нем
-                        obj = self.create_object(obj_id, name)
-                        objects.append(obj)
-                    else:
-                        logger.warning(f"Объект с ID {obj_id} не найден в БД и словаре")
+                    # Если объект не найден, создаем его по словарю или заглушку с именем, равным ID
+                    obj = self.create_object(obj_id, self._new_object_name(obj_id))
+                    objects.append(obj)
             
             # Очищаем текущие связи с объектами
             # db.session.execute(post_objects.delete().where(post_objects.c.post_id == post.id))
@@ -151,6 +151,150 @@ class ObjectService:
             logger.error(f"Ошибка при связывании объектов с постом: {e}")
             db.session.rollback()
     
+    def link_objects_with_posts(self, post_object_ids: Dict[int, List[str]], replace: bool = False) -> int:
+        """
+        Связывает набор постов с объектами набором запросов (без коммита).
+
+        Объекты разрешаются одним запросом, недостающие создаются из словаря
+        (неизвестные - заглушками с именем, равным ID) через INSERT ... ON CONFLICT
+        DO NOTHING, связи вставляются так же. Коммит выполняет вызывающий код.
+
+        Args:
+            post_object_ids: Словарь, где ключ - первичный ключ поста, значение - список ID объектов.
+            replace: Удалить прежние связи постов (если набор объектов поста изменился).
+
+        Returns:
+            int: Количество связей, переданных на вставку.
+        """
+        from utils.sql import dialect_insert
+
+        if replace and post_object_ids:
+            db.session.execute(post_objects.delete().where(post_objects.c.post_id.in_(list(post_object_ids))))
+
+        wanted_ids = {obj_id for ids in post_object_ids.values() for obj_id in ids}
+        if not wanted_ids:
+            return 0
+
+        # Получаем первичные ключи нужных объектов одним запросом
+        object_pks = self._object_pks(wanted_ids)
+
+        # Создаем недостающие объекты: по словарю или заглушки с именем, равным ID.
+        # Слайсы загрузки выполняются параллельно и могут создавать один и тот же объект,
+        # поэтому уже созданный другой транзакцией объект пропускается, а ключи перечитываются
+        missing_ids = wanted_ids - object_pks.keys()
+        if missing_ids:
+            stmt = dialect_insert(Object.__table__).values([
+                {'object_id': obj_id, 'name': self._new_object_name(obj_id)}
+                for obj_id in sorted(missing_ids)
+            ]).on_conflict_do_nothing(index_elements=['object_id'])
+            created = db.session.execute(stmt).rowcount
+            object_pks = self._object_pks(wanted_ids)
+            logger.info(f"Создано {created} новых объектов")
+
+        links = [
+            {'post_id': post_pk, 'object_id': object_pks[obj_id]}
+            for post_pk, ids in post_object_ids.items()
+            for obj_id in set(ids)
+            if obj_id in object_pks
+        ]
+
+        if links:
+            stmt = dialect_insert(post_objects).values(links).on_conflict_do_nothing()
+            db.session.execute(stmt)
+
+        logger.info(f"Передано на связывание {len(links)} связей для {len(post_object_ids)} постов")
+        return len(links)
+
+    def _object_pks(self, object_ids: Iterable[str]) -> Dict[str, int]:
+        """Первичные ключи объектов по их ID (одним запросом)."""
+        return dict(db.session.query(Object.object_id, Object.id).filter(Object.object_id.in_(list(object_ids))))
+
+    def _new_object_name(self, obj_id: str) -> str:
+        """
+        Имя для нового объекта: из словаря, а для неизвестного объекта - его ID.
+
+        Неизвестный объект создается заглушкой, чтобы пост был связан со всеми
+        своими объектами и находился фильтром по любому из них.
+        """
+        name = self.object_mapping.get(obj_id)
+        if not name:
+            logger.warning(f"Объект с ID {obj_id} не найден в БД и словаре, создается объект-заглушка")
+            name = obj_id
+        return name
+
+    def filter_posts_by_object(self, query, object_id: str):
+        """
+        Фильтрует запрос постов по объекту через индексы таблицы post_objects.
+
+        Посты объекта с небольшим числом публикаций выбираются по индексу
+        (object_id, post_id) и досортировываются. Для объекта с большим числом
+        публикаций посты читаются в порядке индекса даты публикации с
+        проверкой связи по первичному ключу post_objects: первая страница
+        находится сразу, без сортировки всех постов объекта.
+
+        Args:
+            query: Запрос постов.
+            object_id: ID объекта в Медиалогии.
+
+        Returns:
+            Query: Запрос постов, связанных с объектом (пустой, если объект неизвестен).
+        """
+        object_pk = db.session.query(Object.id).filter(Object.object_id == str(object_id).strip()).scalar()
+        if object_pk is None:
+            return query.filter(db.false())
+
+        object_posts = db.session.query(post_objects.c.post_id).filter(post_objects.c.object_id == object_pk)
+
+        # Подсчет ограничен порогом и читает не больше SPARSE_OBJECT_LINKS записей индекса
+        links = object_posts.limit(SPARSE_OBJECT_LINKS).count()
+        if links < SPARSE_OBJECT_LINKS:
+            return query.filter(Post.id.in_(object_posts))
+
+        return query.filter(object_posts.filter(post_objects.c.post_id == Post.id).exists())
+
+    def backfill_post_objects(self, batch_size: int = 5000) -> Dict[str, int]:
+        """
+        Заполняет таблицу post_objects по текстовому полю posts.object_ids.
+
+        Посты обрабатываются порциями по первичному ключу, связи каждой порции
+        заменяются целиком, коммит выполняется на порцию. Повторный запуск
+        безопасен. Заодно создается индекс (object_id, post_id), если его нет.
+
+        Args:
+            batch_size: Количество постов в порции.
+
+        Returns:
+            Dict[str, int]: Количество обработанных постов и переданных на вставку связей.
+        """
+        for index in post_objects.indexes:
+            index.create(db.engine, checkfirst=True)
+
+        stats = {'posts': 0, 'links': 0}
+        last_pk = 0
+        while True:
+            rows = (
+                db.session.query(Post.id, Post.object_ids)
+                .filter(Post.id > last_pk)
+                .order_by(Post.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+
+            post_object_ids = {
+                post_pk: [obj_id.strip() for obj_id in (object_ids or '').split(',') if obj_id.strip()]
+                for post_pk, object_ids in rows
+            }
+            stats['links'] += self.link_objects_with_posts(post_object_ids, replace=True)
+            db.session.commit()
+
+            stats['posts'] += len(rows)
+            last_pk = rows[-1][0]
+            logger.info(f"Заполнение post_objects: обработано {stats['posts']} постов, связей {stats['links']}")
+
+        return stats
+
     def get_object_names(self, object_ids_str: str) -> str:
         """
         Получает имена объектов по строке с их ID.
@@ -167,24 +311,60 @@ class ObjectService:
         # Разделение строки идентификаторов на отдельные id
         object_ids = [obj_id.strip() for obj_id in object_ids_str.split(',') if obj_id.strip()]
         
+        # ID, которых нет в кэше, загружаются из БД одним запросом
+        self._load_missing_objects(object_ids)
+        
         # Поиск соответствующих имен объектов
         object_names = []
         for obj_id in object_ids:
-            # Пробуем сопоставить как строку
-            if obj_id in self.object_mapping:
-                object_names.append(self.object_mapping[obj_id])
-            # Пробуем как числовое значение (для ID, которые могут быть числами)
-            elif obj_id.isdigit() and str(int(obj_id)) in self.object_mapping:
-                object_names.append(self.object_mapping[str(int(obj_id))])
+            name = self._cached_name(obj_id)
+            if name is not None:
+                object_names.append(name)
             else:
-                # Если не нашли в кэше, пробуем найти в БД
-                obj = self.get_object_by_id(obj_id)
-                if obj:
-                    object_names.append(obj.name)
-                    # Обновляем кэш
-                    self.object_mapping[obj_id] = obj.name
-                else:
-                    # Если не нашли точное соответствие, логируем это для отладки
-                    logger.debug(f"Не найдено соответствие для ID объекта: {obj_id}")
+                # Если не нашли точное соответствие, логируем это для отладки
+                logger.debug(f"Не найдено соответствие для ID объекта: {obj_id}")
+        
+        return ", ".join(object_names)
+    
+    def get_object_names_batch(self, object_ids_strs: Iterable[Optional[str]]) -> Dict[Optional[str], str]:
+        """
+        Получает имена объектов для набора строк с ID (например, для страницы постов).
+        
+        Все ID, которых нет в кэше, загружаются из БД одним запросом.
+        
+        Args:
+            object_ids_strs: Строки с ID объектов, разделенными запятыми.
+            
+        Returns:
+            Dict[Optional[str], str]: Имена объектов через запятую по исходной строке ID.
+        """
+        object_ids_strs = set(object_ids_strs)
+        self._load_missing_objects(
+            obj_id.strip()
+            for object_ids_str in object_ids_strs if object_ids_str
+            for obj_id in object_ids_str.split(',') if obj_id.strip()
+        )
+        return {object_ids_str: self.get_object_names(object_ids_str) for object_ids_str in object_ids_strs}
+    
+    def _cached_name(self, obj_id: str) -> Optional[str]:
+        """Имя объекта из кэша: ID сопоставляется как строка и как число."""
+        if obj_id in self.object_mapping:
+            return self.object_mapping[obj_id]
+        if obj_id.isdigit():
+            return self.object_mapping.get(str(int(obj_id)))
+        return None
+    
+    def _load_missing_objects(self, object_ids: Iterable[str]):
+        """Загружает в кэш одним запросом объекты, которых в нем нет."""
+        missing = {
+            obj_id for obj_id in object_ids
+            if obj_id not in self.missing_object_ids and self._cached_name(obj_id) is None
+        }
+        if not missing:
+            return
+        
+        lookup_ids = missing | {str(int(obj_id)) for obj_id in missing if obj_id.isdigit()}
+        for object_id, name in db.session.query(Object.object_id, Object.name).filter(Object.object_id.in_(lookup_ids)):
+            self.object_mapping[object_id] = name
         
-        return ", ".join(object_names)
\ No newline at end of file
+        self.missing_object_ids.update(obj_id for obj_id in missing if self._cached_name(obj_id) is None)
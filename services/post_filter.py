@@ -0,0 +1,170 @@
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from flask import current_app
+from sqlalchemy.orm import selectinload
+
+from models.database import db
+from models.post_model import Post
+from models.analysis_model import PostAnalysis, TonalityType
+from models.object_model import post_objects
+from services.object_service import ObjectService
+from services.search_service import SearchService
+from utils.pagination import KeysetPage, count_rows, keyset_paginate
+
+# Параметры фильтра постов (общие для списка постов, анализа и выгрузки)
+FILTER_FIELDS = ('search_query', 'tonality', 'object_id', 'date_from', 'date_to')
+DATE_FORMAT = '%Y-%m-%d'
+DATE_LABELS = {'date_from': 'начала', 'date_to': 'окончания'}
+
+class PostFilter:
+    """
+    Построение запроса постов по параметрам фильтра.
+
+    Каждому фильтру соответствует индекс:
+    - дата публикации и сортировка - ix_posts_published_on_id;
+    - тональность - ix_post_analyses_tonality_post_id;
+    - объект - ix_post_objects_object_id_post_id (посты объекта за период
+      выбираются по нему вместе с индексом даты публикации);
+    - поисковая строка - полнотекстовый индекс (см. SearchService).
+    """
+
+    # Таблицы, индексы которых используются фильтром
+    INDEXED_TABLES = (Post.__table__, PostAnalysis.__table__, post_objects)
+
+    def __init__(self):
+        """Инициализация построителя запросов."""
+        self.object_service = ObjectService()
+        self.search_service = SearchService()
+
+    @staticmethod
+    def parse(values: Mapping[str, Any], search_key: str = 'search_query') -> Tuple[Dict[str, str], List[str]]:
+        """
+        Разбирает параметры фильтра из запроса.
+
+        Некорректные значения отбрасываются, сообщения о них возвращаются
+        для показа пользователю.
+
+        Args:
+            values: Параметры запроса (request.args или request.form).
+            search_key: Имя параметра поисковой строки.
+
+        Returns:
+            Tuple[Dict[str, str], List[str]]: Параметры фильтра и сообщения об ошибках.
+        """
+        params = {field: (values.get(field) or '').strip() for field in FILTER_FIELDS}
+        params['search_query'] = (values.get(search_key) or '').strip()
+        errors = []
+
+        if params['tonality'] and params['tonality'] not in TonalityType.__members__:
+            errors.append('Неизвестная тональность')
+            params['tonality'] = ''
+
+        for field, label in DATE_LABELS.items():
+            if params[field]:
+                try:
+                    datetime.strptime(params[field], DATE_FORMAT)
+                except ValueError:
+                    errors.append(f'Неверный формат даты {label}')
+                    params[field] = ''
+
+        return params, errors
+
+    def build_query(self, params: Dict[str, Any], include_analysis: bool = False):
+        """
+        Строит запрос постов по параметрам фильтра.
+
+        Args:
+            params: Параметры фильтра (см. parse).
+            include_analysis: Присоединить результаты анализа (посты без анализа остаются в выборке).
+
+        Returns:
+            Query: Запрос постов, отсортированный по дате публикации (сначала новые;
+                при поиске - после релевантности).
+        """
+        query, relevance = self.filter_query(params, include_analysis)
+        if relevance is not None:
+            query = query.order_by(relevance.desc())
+
+        # Порядок совпадает с индексом (published_on, id): страницы читаются из индекса без сортировки
+        return query.order_by(Post.published_on.desc(), Post.id.desc())
+
+    def filter_query(self, params: Dict[str, Any], include_analysis: bool = False) -> Tuple[Any, Optional[Any]]:
+        """
+        Строит запрос постов по параметрам фильтра без сортировки.
+
+        Args:
+            params: Параметры фильтра (см. parse).
+            include_analysis: Присоединить результаты анализа.
+
+        Returns:
+            Tuple[Query, Optional[ColumnElement]]: Запрос и выражение релевантности
+                поиска (None без поисковой строки или без полнотекстового индекса).
+        """
+        query = db.session.query(Post)
+        relevance = None
+
+        if include_analysis:
+            query = query.outerjoin(PostAnalysis, PostAnalysis.post_id == Post.id)
+
+        if params.get('search_query'):
+            query, relevance = self.search_service.search(query, params['search_query'])
+
+        if params.get('tonality'):
+            if not include_analysis:
+                query = query.join(PostAnalysis, PostAnalysis.post_id == Post.id)
+            query = query.filter(PostAnalysis.tonality == TonalityType[params['tonality']])
+
+        if params.get('object_id'):
+            query = self.object_service.filter_posts_by_object(query, params['object_id'])
+
+        if params.get('date_from'):
+            query = query.filter(Post.published_on >= datetime.strptime(params['date_from'], DATE_FORMAT))
+
+        if params.get('date_to'):
+            date_to = datetime.strptime(params['date_to'], DATE_FORMAT).replace(hour=23, minute=59, second=59)
+            query = query.filter(Post.published_on <= date_to)
+
+        return query, relevance
+
+    def paginate(self, params: Dict[str, Any], per_page: int, cursor: Optional[str] = None) -> KeysetPage:
+        """
+        Страница списка постов по курсору.
+
+        Посты упорядочены по (published_on, id), сначала новые, при поиске -
+        по (релевантность, id). Общее количество постов по фильтру
+        подсчитывается не дальше POSTS_COUNT_LIMIT и кэшируется на
+        POSTS_COUNT_CACHE_TTL секунд (0 - не подсчитывается).
+
+        Args:
+            params: Параметры фильтра (см. parse).
+            per_page: Количество постов на странице.
+            cursor: Курсор страницы (None - первая страница).
+
+        Returns:
+            KeysetPage: Страница постов.
+
+        Raises:
+            ValueError: Курсор поврежден или относится к другой сортировке.
+        """
+        query, relevance = self.filter_query(params)
+        # Результаты анализа страницы загружаются одним запросом, а не при обращении к каждому посту
+        page_query = query.options(selectinload(Post.analysis))
+        if relevance is None:
+            page = keyset_paginate(page_query, [Post.published_on, Post.id], per_page, cursor,
+                                   nullable_first=True, name='date')
+        else:
+            page = keyset_paginate(page_query, [relevance, Post.id], per_page, cursor, name='relevance')
+
+        ttl = current_app.config.get('POSTS_COUNT_CACHE_TTL', 300)
+        if ttl:
+            cache_key = ('posts',) + tuple(params.get(field, '') for field in FILTER_FIELDS)
+            page.total, page.total_exceeded = count_rows(query, cache_key, ttl,
+                                                         current_app.config.get('POSTS_COUNT_LIMIT', 10000))
+        return page
+
+    @classmethod
+    def ensure_indexes(cls):
+        """Создает недостающие индексы фильтра в существующей БД."""
+        for table in cls.INDEXED_TABLES:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
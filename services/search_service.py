@@ -0,0 +1,193 @@
+import re
+import traceback
+from typing import Any, Dict, Optional, Tuple
+from loguru import logger
+from flask import current_app
+from sqlalchemy import Double, cast, column, func, inspect, literal_column, select, table, text
+
+from models.database import db
+from models.post_model import Post
+
+# Слова поискового запроса
+SEARCH_WORD_PATTERN = re.compile(r'\w+')
+# Название конфигурации текстового поиска PostgreSQL подставляется в DDL
+LANGUAGE_PATTERN = re.compile(r'\w+')
+
+# SQLite: индекс FTS5 с внешним содержимым (хранит только токены, тексты читаются из posts),
+# синхронизируется триггерами при любой вставке, изменении и удалении постов
+SQLITE_FTS_TABLE = 'posts_fts'
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5("
+    "title, content, content='posts', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN "
+    "INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN "
+    "INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, content ON posts BEGIN "
+    "INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+)
+# Вес совпадений в заголовке относительно текста при ранжировании bm25
+SQLITE_TITLE_WEIGHT = 10.0
+
+# PostgreSQL: вычисляемый столбец tsvector (заголовок - вес A, текст - вес B) с индексом GIN,
+# пересчитывается самой БД при изменении поста
+POSTGRES_VECTOR_COLUMN = 'search_vector'
+POSTGRES_DDL = (
+    "ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('{language}'::regconfig, coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('{language}'::regconfig, coalesce(content, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_posts_search_vector ON posts USING GIN (search_vector)",
+)
+
+# Базы, в которых индекс уже проверен (отрицательный результат не кэшируется)
+_index_ready: Dict[str, bool] = {}
+
+class SearchService:
+    """
+    Полнотекстовый поиск по заголовку и тексту постов.
+
+    В SQLite используется FTS5, в PostgreSQL - tsvector со стеммингом и
+    индексом GIN. Поиск возвращает выражение релевантности, по которому
+    сортирует вызывающий код (PostFilter). Если индекс не создан или БД его
+    не поддерживает, выполняется прежний поиск ILIKE.
+    """
+
+    def __init__(self, language: str = None):
+        """
+        Инициализация сервиса поиска.
+
+        Args:
+            language: Конфигурация текстового поиска PostgreSQL (по умолчанию - SEARCH_LANGUAGE).
+        """
+        self.language = language or current_app.config.get('SEARCH_LANGUAGE', 'russian')
+        if not LANGUAGE_PATTERN.fullmatch(self.language):
+            raise ValueError(f"Недопустимая конфигурация текстового поиска: {self.language}")
+
+    def ensure_index(self, rebuild: bool = False) -> bool:
+        """
+        Создает полнотекстовый индекс постов, если его нет.
+
+        Повторный вызов безопасен. В SQLite индекс заполняется существующими
+        постами при создании, в PostgreSQL столбец вычисляется при добавлении.
+
+        Args:
+            rebuild: Пересоздать индекс (после смены SEARCH_LANGUAGE или для восстановления).
+
+        Returns:
+            bool: True, если индекс доступен.
+        """
+        dialect_name = db.engine.dialect.name
+        try:
+            if dialect_name == 'sqlite':
+                created = not inspect(db.engine).has_table(SQLITE_FTS_TABLE)
+                for statement in SQLITE_DDL:
+                    db.session.execute(text(statement))
+                if created or rebuild:
+                    db.session.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"))
+            elif dialect_name == 'postgresql':
+                if rebuild:
+                    db.session.execute(text("ALTER TABLE posts DROP COLUMN IF EXISTS search_vector"))
+                for statement in POSTGRES_DDL:
+                    db.session.execute(text(statement.format(language=self.language)))
+            else:
+                logger.warning(f"Полнотекстовый поиск не поддерживается для {dialect_name}, используется ILIKE")
+                return False
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Ошибка создания полнотекстового индекса: {e}")
+            logger.error(traceback.format_exc())
+            db.session.rollback()
+            return False
+
+        _index_ready[str(db.engine.url)] = True
+        logger.info(f"Полнотекстовый индекс постов готов ({dialect_name})")
+        return True
+
+    def has_index(self) -> bool:
+        """
+        Проверяет, создан ли полнотекстовый индекс в текущей БД.
+
+        Returns:
+            bool: True, если поиск может использовать индекс.
+        """
+        url = str(db.engine.url)
+        if _index_ready.get(url):
+            return True
+
+        dialect_name = db.engine.dialect.name
+        inspector = inspect(db.engine)
+        if dialect_name == 'sqlite':
+            ready = inspector.has_table(SQLITE_FTS_TABLE)
+        elif dialect_name == 'postgresql':
+            ready = any(col['name'] == POSTGRES_VECTOR_COLUMN for col in inspector.get_columns('posts'))
+        else:
+            ready = False
+
+        if ready:
+            _index_ready[url] = True
+        return ready
+
+    def search(self, query, search_query: str) -> Tuple[Any, Optional[Any]]:
+        """
+        Фильтрует запрос постов по поисковой строке без сортировки.
+
+        Args:
+            query: Запрос постов.
+            search_query: Поисковая строка пользователя.
+
+        Returns:
+            Tuple[Query, Optional[ColumnElement]]: Запрос с условием поиска и
+                выражение релевантности (больше - релевантнее; None, если
+                поиск выполняется без индекса или строка пуста).
+        """
+        words = SEARCH_WORD_PATTERN.findall(search_query or '')
+        if not words:
+            return query, None
+
+        dialect_name = db.engine.dialect.name
+        if dialect_name not in ('sqlite', 'postgresql') or not self.has_index():
+            return query.filter(
+                db.or_(
+                    Post.title.ilike(f'%{search_query}%'),
+                    Post.content.ilike(f'%{search_query}%')
+                )
+            ), None
+
+        if dialect_name == 'postgresql':
+            vector = literal_column(f'posts.{POSTGRES_VECTOR_COLUMN}')
+            tsquery = func.websearch_to_tsquery(self.language, search_query)
+            # ts_rank_cd возвращает float4, который не восстанавливается точно из значения
+            # курсора страницы (float Python), поэтому релевантность сравнивается как float8
+            return query.filter(vector.op('@@')(tsquery)), cast(func.ts_rank_cd(vector, tsquery), Double)
+
+        fts = table(SQLITE_FTS_TABLE, column('rowid'))
+        fts_match = literal_column(SQLITE_FTS_TABLE)
+        matches = (
+            select(fts.c.rowid.label('post_pk'), func.bm25(fts_match, SQLITE_TITLE_WEIGHT, 1.0).label('rank'))
+            .where(fts_match.op('MATCH')(self.sqlite_match_expression(words)))
+            .subquery()
+        )
+        # bm25 возвращает тем меньшее значение, чем релевантнее пост
+        return query.join(matches, matches.c.post_pk == Post.id), -matches.c.rank
+
+    @staticmethod
+    def sqlite_match_expression(words) -> str:
+        """
+        Строит запрос FTS5: все слова обязательны, каждое ищется по началу.
+
+        В FTS5 нет стемминга для русского языка, поэтому у длинных слов
+        отбрасываются две последние буквы и ищутся словоформы с этим началом:
+        "губернатора" находит "губернатор" и "губернатору".
+
+        Args:
+            words: Слова поискового запроса.
+
+        Returns:
+            str: Выражение для MATCH.
+        """
+        terms = []
+        for word in words:
+            word = word.lower()
+            terms.append(f'"{word[:-2] if len(word) > 5 else word}"*')
+        return ' '.join(terms)
@@ -0,0 +1,99 @@
+"""
+Общие фикстуры тестов: приложение (main.create_app) на временной БД SQLite
+с синтетическими постами, результатами анализа и связями с объектами.
+"""
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import TestingConfig
+from models.database import db
+from models.user_model import User
+from models.post_model import Post
+from models.analysis_model import PostAnalysis, TonalityType
+from models.object_model import Object, post_objects
+from services.post_filter import PostFilter
+
+N_POSTS = 5000
+N_OBJECTS = 20
+
+WORDS = ('администрация губернатор область проект строительство жители дорога школа больница '
+         'программа бюджет решение совещание развитие предприятие регион город района поддержка').split()
+
+def seed(n_posts=N_POSTS, seed_value=42):
+    """
+    Синтетические посты, результаты анализа и связи с объектами.
+
+    Каждый пост связан с двумя объектами; в posts.object_ids у поста есть еще
+    ID, которого нет в таблице объектов. Результат анализа есть у каждого
+    второго поста.
+    """
+    rnd = random.Random(seed_value)
+    objects = [Object(object_id=str(9000 + i), name=f'Объект {i}') for i in range(N_OBJECTS)]
+    db.session.add_all(objects)
+    db.session.commit()
+
+    start = datetime(2024, 1, 1)
+    posts = []
+    links = []
+    for i in range(n_posts):
+        post_objects_ids = rnd.sample(objects, 2)
+        posts.append({
+            'post_id': str(100000000 + i),
+            'title': ' '.join(rnd.choices(WORDS, k=6)),
+            'content': ' '.join(rnd.choices(WORDS, k=40)),
+            'published_on': start + timedelta(seconds=rnd.randint(0, 365 * 86400)),
+            'object_ids': ', '.join([obj.object_id for obj in post_objects_ids] + [str(100 + i)]),
+        })
+        links += [{'post_id': i + 1, 'object_id': obj.id} for obj in post_objects_ids]
+
+    db.session.execute(Post.__table__.insert(), posts)
+    db.session.execute(post_objects.insert(), links)
+    db.session.execute(PostAnalysis.__table__.insert(), [
+        {'post_id': i + 1, 'tonality': rnd.choice(list(TonalityType)).name, 'lmm_title': 'заголовок'}
+        for i in range(0, n_posts, 2)
+    ])
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """Приложение с заполненной временной БД (общее для всех тестов)."""
+    work_dir = tmp_path_factory.mktemp('app')
+    database_url = f"sqlite:///{work_dir / 'test.db'}"
+
+    # Приложение создает каталоги логов, загрузок и выгрузок в текущем каталоге
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    os.environ['DATABASE_URL'] = database_url
+    from main import create_app, init_db
+
+    class Config(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = database_url
+
+    app = create_app(Config)
+    init_db(app)
+
+    with app.app_context():
+        seed()
+        yield app
+        db.session.remove()
+    os.chdir(cwd)
+
+@pytest.fixture
+def client(app):
+    """Тестовый клиент с вошедшим пользователем admin (создается init_db)."""
+    client = app.test_client()
+    user = User.query.filter_by(username='admin').one()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+    return client
+
+@pytest.fixture
+def post_filter(app):
+    """Построитель запросов постов."""
+    return PostFilter()
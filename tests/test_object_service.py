@@ -0,0 +1,56 @@
+"""
+Связывание постов с объектами: создание неизвестных объектов параллельными слайсами загрузки.
+"""
+import pytest
+from sqlalchemy.orm import Session
+
+from models.database import db
+from models.object_model import Object, post_objects
+from services.object_service import ObjectService
+
+UNKNOWN_OBJECT_ID = '777000777'
+POST_PKS = (1, 2)
+
+@pytest.fixture
+def unknown_object(app):
+    """ID объекта, которого нет в БД; созданные тестом объект и связи удаляются."""
+    yield UNKNOWN_OBJECT_ID
+    db.session.rollback()
+    object_pks = db.session.query(Object.id).filter(Object.object_id == UNKNOWN_OBJECT_ID)
+    db.session.execute(post_objects.delete().where(post_objects.c.object_id.in_(object_pks.scalar_subquery())))
+    db.session.execute(Object.__table__.delete().where(Object.object_id == UNKNOWN_OBJECT_ID))
+    db.session.commit()
+
+def test_unknown_object_created_by_other_session(app, monkeypatch, unknown_object):
+    service = ObjectService()
+    object_pks = service._object_pks
+
+    def object_pks_with_race(object_ids):
+        # Между поиском объектов и их созданием другой слайс создает тот же объект
+        found = object_pks(object_ids)
+        with Session(db.engine) as other:
+            other.add(Object(object_id=unknown_object, name=unknown_object))
+            other.commit()
+        monkeypatch.setattr(service, '_object_pks', object_pks)
+        return found
+
+    monkeypatch.setattr(service, '_object_pks', object_pks_with_race)
+    links = service.link_objects_with_posts({POST_PKS[0]: [unknown_object, '9000']})
+    db.session.commit()
+
+    assert links == 2
+    object_pk = db.session.query(Object.id).filter(Object.object_id == unknown_object).scalar()
+    linked = db.session.query(post_objects.c.post_id).filter(post_objects.c.object_id == object_pk).all()
+    assert linked == [(POST_PKS[0],)]
+
+def test_unknown_object_linked_from_two_sessions(app, unknown_object):
+    for post_pk in POST_PKS:
+        # Каждый слайс работает в своей сессии
+        db.session.remove()
+        ObjectService().link_objects_with_posts({post_pk: [unknown_object]})
+        db.session.commit()
+
+    object_pks = db.session.query(Object.id).filter(Object.object_id == unknown_object).all()
+    assert len(object_pks) == 1
+    linked = db.session.query(post_objects.c.post_id).filter(post_objects.c.object_id == object_pks[0][0])
+    assert sorted(post_pk for post_pk, in linked) == list(POST_PKS)
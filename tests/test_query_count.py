@@ -0,0 +1,62 @@
+"""
+Количество SQL-запросов при отображении списка постов и панели управления.
+
+Количество запросов страницы не должно зависеть от числа постов на ней:
+ленивая загрузка analysis или поиск имени объекта для каждого поста
+увеличили бы его вместе с размером страницы.
+"""
+import pytest
+from sqlalchemy import event
+
+from models.database import db
+from services.post_filter import PostFilter
+
+# Бюджет запросов на страницу (объекты, страница постов, анализ, количество, имена объектов, ...)
+POSTS_QUERY_BUDGET = 10
+DASHBOARD_QUERY_BUDGET = 6
+PAGE_SIZES = (5, 50, 100)
+
+@pytest.fixture
+def statements(app):
+    """Список SQL-запросов, выполненных во время теста."""
+    executed = []
+
+    def count(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', count)
+
+@pytest.fixture
+def measure(client, statements):
+    """Выполняет GET-запрос и возвращает количество SQL-запросов при его обработке."""
+    def measure(url):
+        # Первый запрос загружает пользователя сессии и кэширует количество постов по фильтру
+        assert client.get(url).status_code == 200
+        statements.clear()
+        response = client.get(url)
+        assert response.status_code == 200
+        return len(statements)
+    return measure
+
+def test_posts_page_query_count_does_not_depend_on_page_size(app, measure):
+    app.config['POSTS_PER_PAGE_MAX'] = max(PAGE_SIZES)
+    counts = {per_page: measure(f'/posts/posts?per_page={per_page}') for per_page in PAGE_SIZES}
+    assert len(set(counts.values())) == 1, counts
+    assert counts[PAGE_SIZES[0]] <= POSTS_QUERY_BUDGET, counts
+
+@pytest.mark.parametrize('query_string', (
+    'per_page=50&q=губернатор&object_id=9001&tonality=NEGATIVE',
+    'per_page=50&date_from=2024-03-01&date_to=2024-06-30',
+), ids=('search+object+tonality', 'period'))
+def test_filtered_posts_page_query_count(measure, query_string):
+    assert measure(f'/posts/posts?{query_string}') <= POSTS_QUERY_BUDGET
+
+def test_next_page_query_count(app, measure):
+    first_page = measure('/posts/posts?per_page=50')
+    next_cursor = PostFilter().paginate(PostFilter.parse({})[0], 50).next_cursor
+    assert measure(f'/posts/posts?per_page=50&cursor={next_cursor}') == first_page
+
+def test_dashboard_query_count(measure):
+    assert measure('/posts/dashboard') <= DASHBOARD_QUERY_BUDGET
@@ -0,0 +1,89 @@
+"""
+Планы запросов PostFilter: каждое сочетание фильтров читает таблицы по индексам.
+
+Для запроса страницы списка постов и выгрузки с результатами анализа строится
+EXPLAIN QUERY PLAN; строка "SCAN <таблица>" без индекса считается полным
+просмотром таблицы.
+"""
+import itertools
+import re
+
+import pytest
+
+from models.database import db
+from models.post_model import Post
+from models.analysis_model import PostAnalysis, TonalityType
+from models.object_model import Object, post_objects
+import services.object_service as object_service
+
+# Полный просмотр таблицы в плане (подзапросы и виртуальные таблицы FTS не учитываются)
+CHECKED_TABLES = {Post.__tablename__, PostAnalysis.__tablename__, Object.__tablename__, post_objects.name}
+FULL_SCAN_PATTERN = re.compile(r'\bSCAN (?:TABLE )?(\w+)(?!.*\bUSING\b)(?!.*\bVIRTUAL TABLE\b)')
+
+FILTER_VALUES = {
+    'search_query': 'губернатор',
+    'tonality': TonalityType.NEGATIVE.name,
+    'object_id': '9000',
+    'period': ('2024-03-01', '2024-03-31'),
+}
+
+def make_params(names):
+    """Параметры фильтра с заданными фильтрами."""
+    params = {'search_query': '', 'tonality': '', 'object_id': '', 'date_from': '', 'date_to': ''}
+    for name in names:
+        if name == 'period':
+            params['date_from'], params['date_to'] = FILTER_VALUES[name]
+        else:
+            params[name] = FILTER_VALUES[name]
+    return params
+
+def explain(query):
+    """Строки плана запроса."""
+    sql = str(query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}'))]
+
+def full_scans(plan):
+    """Таблицы, которые план читает целиком."""
+    return sorted({
+        match.group(1) for line in plan for match in [FULL_SCAN_PATTERN.search(line)]
+        if match and match.group(1) in CHECKED_TABLES
+    })
+
+def filter_combinations(names):
+    """Все сочетания фильтров из names (включая пустое)."""
+    return [combo for size in range(len(names) + 1) for combo in itertools.combinations(names, size)]
+
+@pytest.mark.parametrize('include_analysis', (False, True), ids=('list', 'export'))
+@pytest.mark.parametrize('names', filter_combinations(tuple(FILTER_VALUES)),
+                         ids=lambda names: '+'.join(names) or 'none')
+def test_filter_combination_uses_indexes(post_filter, names, include_analysis):
+    query = post_filter.build_query(make_params(names), include_analysis=include_analysis).limit(20)
+    plan = explain(query)
+    assert not full_scans(plan), plan
+
+@pytest.mark.parametrize('dense', (False, True), ids=('sparse', 'dense'))
+@pytest.mark.parametrize('include_analysis', (False, True), ids=('list', 'export'))
+@pytest.mark.parametrize('names', filter_combinations(('search_query', 'tonality', 'period')),
+                         ids=lambda names: '+'.join(names) or 'none')
+def test_object_filter_plans_use_indexes(post_filter, monkeypatch, names, include_analysis, dense):
+    # У каждого объекта около 500 связей: с порогом 1 объект считается крупным
+    if dense:
+        monkeypatch.setattr(object_service, 'SPARSE_OBJECT_LINKS', 1)
+
+    query = post_filter.build_query(make_params(('object_id',) + names), include_analysis=include_analysis)
+    sql = str(query.statement)
+    # Крупный объект проверяется по первичному ключу post_objects (EXISTS),
+    # небольшой - выбирается по индексу (object_id, post_id) (IN)
+    assert ('EXISTS' in sql) == dense
+    assert ('IN (SELECT post_objects.post_id' in sql) != dense
+
+    plan = explain(query.limit(20))
+    assert not full_scans(plan), plan
+    assert any('post_objects' in line and 'USING' in line for line in plan), plan
+
+def test_object_filter_returns_same_posts_for_both_plans(post_filter, monkeypatch):
+    params = make_params(('object_id', 'period'))
+    sparse = [post.id for post in post_filter.build_query(params).all()]
+    monkeypatch.setattr(object_service, 'SPARSE_OBJECT_LINKS', 1)
+    dense = [post.id for post in post_filter.build_query(params).all()]
+    assert sparse and sparse == dense
@@ -6,6 +6,8 @@ from typing import Tuple, Optional
 from flask import current_app
 from datetime import datetime, timedelta
 
+from utils.text_cleaning import clean_text
+
 def clean_html_and_emoji(text):
     """
     Удаление HTML-тегов и эмодзи из текста.
@@ -16,34 +18,7 @@ def clean_html_and_emoji(text):
     Returns:
         str: Очищенный текст.
     """
-    if text is None:
-        return ""
-    
-    # Удаление HTML-тегов
-    text = re.sub(r'<[^>]+>', '', text)
-    
-    # Удаление эмодзи
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # смайлики
-        "\U0001F300-\U0001F5FF"  # символы и пиктограммы
-        "\U0001F680-\U0001F6FF"  # транспорт и символы карт
-        "\U0001F700-\U0001F77F"  # алхимические символы
-        "\U0001F780-\U0001F7FF"  # геометрические фигуры
-        "\U0001F800-\U0001F8FF"  # дополнительные стрелки
-        "\U0001F900-\U0001F9FF"  # дополнительные символы и пиктограммы
-        "\U0001FA00-\U0001FA6F"  # символы шахмат
-        "\U0001FA70-\U0001FAFF"  # символы эмодзи
-        "\U00002702-\U000027B0"  # разные символы
-        "\U000024C2-\U0001F251" 
-        "]+", flags=re.UNICODE)
-    
-    text = emoji_pattern.sub(r'', text)
-    
-    # Удаление лишних пробелов
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text
+    return clean_text(text)
 
 def parse_date(date_str):
     """
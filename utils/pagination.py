@@ -0,0 +1,209 @@
+import base64
+import binascii
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+
+from models.database import db
+
+# Кэш количества записей по фильтру: ключ -> (время истечения, количество, превышен ли предел)
+_count_cache: Dict[Hashable, Tuple[float, int, bool]] = {}
+COUNT_CACHE_MAX_ENTRIES = 1000
+
+# Диалекты, в которых NULL при сортировке больше любого значения (в остальных - меньше)
+NULLS_LARGEST_DIALECTS = ('postgresql', 'oracle')
+
+def encode_cursor(name: str, values: Sequence[Any], direction: str) -> str:
+    """
+    Кодирует позицию страницы в непрозрачный курсор.
+
+    Args:
+        name: Название сортировки (курсор другой сортировки не принимается).
+        values: Значения ключей сортировки граничной записи.
+        direction: next - записи после позиции, prev - записи перед ней.
+
+    Returns:
+        str: Курсор для параметра запроса.
+    """
+    encoded = [
+        {'dt': value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    payload = json.dumps({'s': name, 'd': direction, 'v': encoded}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str, name: str, size: int) -> Tuple[List[Any], str]:
+    """
+    Разбирает курсор страницы.
+
+    Args:
+        cursor: Курсор из параметра запроса.
+        name: Ожидаемое название сортировки.
+        size: Ожидаемое количество ключей.
+
+    Returns:
+        Tuple[List[Any], str]: Значения ключей и направление.
+
+    Raises:
+        ValueError: Курсор поврежден или относится к другой сортировке.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        values = [
+            datetime.fromisoformat(value['dt']) if isinstance(value, dict) else value
+            for value in payload['v']
+        ]
+        direction = payload['d']
+    except (binascii.Error, UnicodeDecodeError, TypeError, KeyError, ValueError) as e:
+        raise ValueError(f"Некорректный курсор страницы: {e}")
+
+    if payload.get('s') != name or len(values) != size or direction not in ('next', 'prev'):
+        raise ValueError("Курсор относится к другой сортировке")
+    return values, direction
+
+def nulls_first(descending: bool) -> bool:
+    """Находятся ли NULL в начале сортировки в текущей БД."""
+    return (db.engine.dialect.name in NULLS_LARGEST_DIALECTS) == descending
+
+class KeysetPage:
+    """Страница записей с курсорами соседних страниц."""
+
+    def __init__(self, items: List[Any], per_page: int, has_prev: bool, has_next: bool,
+                 prev_cursor: Optional[str] = None, next_cursor: Optional[str] = None):
+        self.items = items
+        self.per_page = per_page
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.prev_cursor = prev_cursor
+        self.next_cursor = next_cursor
+        # Общее количество записей (None - не подсчитывалось) и признак, что подсчет остановлен на пределе
+        self.total = None
+        self.total_exceeded = False
+
+def keyset_paginate(query, columns: Sequence[Any], per_page: int, cursor: Optional[str] = None,
+                    descending: bool = True, nullable_first: bool = False, name: str = '') -> KeysetPage:
+    """
+    Постраничная выборка по ключу сортировки (keyset) вместо OFFSET.
+
+    Страница выбирается условием "ключ после граничной записи" и читается
+    из индекса по ключу, поэтому любая страница стоит столько же, сколько
+    первая. Последний столбец ключа должен быть уникальным.
+
+    Первый столбец может содержать NULL: записи с NULL выбираются отдельным
+    запросом и ставятся в начало или конец так же, как их сортирует БД
+    (PostgreSQL считает NULL наибольшим значением, SQLite - наименьшим).
+
+    Args:
+        query: Запрос без сортировки.
+        columns: Столбцы ключа сортировки.
+        per_page: Количество записей на странице.
+        cursor: Курсор страницы (None - первая страница).
+        descending: Сортировка по убыванию.
+        nullable_first: Первый столбец может содержать NULL.
+        name: Название сортировки для проверки курсора.
+
+    Returns:
+        KeysetPage: Страница записей.
+
+    Raises:
+        ValueError: Курсор поврежден или относится к другой сортировке.
+    """
+    values, direction = decode_cursor(cursor, name, len(columns)) if cursor else (None, 'next')
+    backward = direction == 'prev'
+
+    rows = _fetch(query, columns, per_page + 1, values, descending != backward, nullable_first)
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backward:
+        rows.reverse()
+
+    keys = [tuple(row[1:]) for row in rows]
+    has_prev = has_more if backward else cursor is not None
+    has_next = True if backward else has_more
+    return KeysetPage(
+        items=[row[0] for row in rows],
+        per_page=per_page,
+        has_prev=has_prev and bool(rows),
+        has_next=has_next and bool(rows),
+        prev_cursor=encode_cursor(name, keys[0], 'prev') if has_prev and rows else None,
+        next_cursor=encode_cursor(name, keys[-1], 'next') if has_next and rows else None,
+    )
+
+def _fetch(query, columns: Sequence[Any], limit: int, after: Optional[List[Any]],
+           descending: bool, nullable_first: bool) -> List[Any]:
+    """Выбирает до limit записей после позиции after в заданном направлении."""
+    query = query.order_by(None).add_columns(*columns)
+
+    def ordered(segment_query, segment_columns):
+        return segment_query.order_by(*(column.desc() if descending else column.asc()
+                                        for column in segment_columns))
+
+    def beyond(segment_columns, segment_values):
+        if len(segment_columns) == 1:
+            left, right = segment_columns[0], segment_values[0]
+        else:
+            left, right = tuple_(*segment_columns), tuple_(*segment_values)
+        return left < right if descending else left > right
+
+    if not nullable_first:
+        if after is not None:
+            query = query.filter(beyond(columns, after))
+        return ordered(query, columns).limit(limit).all()
+
+    # Записи с NULL в первом столбце и остальные записи - два участка сортировки
+    first, rest = columns[0], columns[1:]
+    segments = [
+        ('null', query.filter(first.is_(None)), rest),
+        ('value', query.filter(first.isnot(None)), columns),
+    ]
+    if not nulls_first(descending):
+        segments.reverse()
+
+    if after is not None:
+        start = 'null' if after[0] is None else 'value'
+        while segments[0][0] != start:
+            segments.pop(0)
+        kind, segment_query, segment_columns = segments[0]
+        segment_values = after[1:] if kind == 'null' else after
+        segments[0] = (kind, segment_query.filter(beyond(segment_columns, segment_values)), segment_columns)
+
+    rows = []
+    for _, segment_query, segment_columns in segments:
+        rows += ordered(segment_query, segment_columns).limit(limit - len(rows)).all()
+        if len(rows) >= limit:
+            break
+    return rows
+
+def count_rows(query, cache_key: Hashable, ttl: int, limit: int = 0) -> Tuple[int, bool]:
+    """
+    Подсчитывает записи запроса с кэшированием и ограничением.
+
+    Args:
+        query: Запрос.
+        cache_key: Ключ кэша (например, параметры фильтра).
+        ttl: Время хранения результата в секундах.
+        limit: Предел подсчета (0 - считать все записи).
+
+    Returns:
+        Tuple[int, bool]: Количество записей (не больше limit) и признак превышения предела.
+    """
+    now = time.monotonic()
+    cached = _count_cache.get(cache_key)
+    if cached and cached[0] > now:
+        return cached[1], cached[2]
+
+    counted = query.order_by(None)
+    if limit:
+        counted = counted.limit(limit + 1)
+    total = counted.count()
+    exceeded = bool(limit) and total > limit
+    if exceeded:
+        total = limit
+
+    if len(_count_cache) >= COUNT_CACHE_MAX_ENTRIES:
+        _count_cache.clear()
+    _count_cache[cache_key] = (now + ttl, total, exceeded)
+    return total, exceeded
@@ -0,0 +1,125 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+SIMHASH_BITS = 64
+SIMHASH_MASK = (1 << SIMHASH_BITS) - 1
+
+def parse_simhash(value) -> Optional[int]:
+    """
+    Преобразование simhash из строки БД в 64-битное целое.
+
+    Args:
+        value: Значение simhash (строка или число).
+
+    Returns:
+        Optional[int]: Simhash или None, если значение пустое, нулевое или некорректное.
+    """
+    if value is None or value == '':
+        return None
+    try:
+        # Нулевой simhash означает отсутствие значения
+        return (int(value) & SIMHASH_MASK) or None
+    except (ValueError, TypeError):
+        return None
+
+def hamming_distance(a: int, b: int) -> int:
+    """Расстояние Хэмминга между двумя simhash."""
+    return (a ^ b).bit_count()
+
+class SimhashIndex:
+    """
+    Индекс simhash для поиска почти-дубликатов по расстоянию Хэмминга.
+
+    Simhash делится на (max_distance + 1) полос. Если расстояние между двумя
+    хэшами не больше max_distance, хотя бы одна полоса у них совпадает
+    полностью, поэтому кандидаты ищутся точным совпадением полос.
+    """
+
+    def __init__(self, max_distance: int = 3):
+        """
+        Инициализация индекса.
+
+        Args:
+            max_distance: Максимальное расстояние Хэмминга для почти-дубликатов.
+        """
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = math.ceil(SIMHASH_BITS / self.bands)
+        self.band_mask = (1 << self.band_bits) - 1
+        self.tables: List[Dict[int, List[Tuple[int, str]]]] = [{} for _ in range(self.bands)]
+
+    def _band_values(self, simhash: int):
+        """Возвращает значения полос simhash."""
+        for band in range(self.bands):
+            yield band, (simhash >> (band * self.band_bits)) & self.band_mask
+
+    def add(self, simhash: int, key: str):
+        """
+        Добавляет simhash в индекс.
+
+        Args:
+            simhash: Значение simhash.
+            key: Ключ записи (например, post_id).
+        """
+        for band, value in self._band_values(simhash):
+            self.tables[band].setdefault(value, []).append((simhash, key))
+
+    def find(self, simhash: int) -> Optional[str]:
+        """
+        Ищет ближайшую запись в пределах max_distance.
+
+        Args:
+            simhash: Значение simhash.
+
+        Returns:
+            Optional[str]: Ключ найденной записи или None.
+        """
+        best_key = None
+        best_distance = self.max_distance + 1
+        for band, value in self._band_values(simhash):
+            for candidate, key in self.tables[band].get(value, ()):
+                distance = hamming_distance(simhash, candidate)
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+                    if distance == 0:
+                        return best_key
+        return best_key
+
+def cluster_posts(posts: List[Dict], max_distance: int = 3) -> Tuple[List[Dict], Dict[str, List[str]]]:
+    """
+    Группирует почти-дубликаты постов по simhash в пределах одного объекта.
+
+    Первый пост кластера становится представителем, остальные посты
+    кластера присоединяются к нему.
+
+    Args:
+        posts: Список постов с ключами post_id, object и simhash.
+        max_distance: Максимальное расстояние Хэмминга для почти-дубликатов.
+
+    Returns:
+        Tuple[List[Dict], Dict[str, List[str]]]: Представители кластеров и словарь,
+            где ключ - post_id представителя, значение - post_id остальных постов кластера.
+    """
+    indexes: Dict[str, SimhashIndex] = {}
+    representatives = []
+    duplicates: Dict[str, List[str]] = {}
+
+    for post in posts:
+        simhash = parse_simhash(post.get('simhash'))
+        post_id = str(post.get('post_id', ''))
+        if simhash is None:
+            representatives.append(post)
+            continue
+
+        obj = post.get('object', '')
+        if obj not in indexes:
+            indexes[obj] = SimhashIndex(max_distance)
+        index = indexes[obj]
+        representative_id = index.find(simhash)
+        if representative_id is None:
+            index.add(simhash, post_id)
+            representatives.append(post)
+        else:
+            duplicates.setdefault(representative_id, []).append(post_id)
+
+    return representatives, duplicates
@@ -0,0 +1,33 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models.database import db
+
+# Диалекты, поддерживающие INSERT ... ON CONFLICT
+UPSERT_DIALECTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+def supports_upsert() -> bool:
+    """
+    Проверка, поддерживает ли текущая БД INSERT ... ON CONFLICT.
+
+    Returns:
+        bool: True для SQLite и PostgreSQL, иначе False.
+    """
+    return db.engine.dialect.name in UPSERT_DIALECTS
+
+def dialect_insert(table):
+    """
+    Создает конструкцию INSERT для диалекта текущей БД с поддержкой ON CONFLICT.
+
+    Args:
+        table: Таблица SQLAlchemy (Table или модель).
+
+    Returns:
+        Insert: Конструкция INSERT с методами on_conflict_do_update/on_conflict_do_nothing.
+    """
+    dialect_name = db.engine.dialect.name
+    if dialect_name not in UPSERT_DIALECTS:
+        raise NotImplementedError(f"Диалект {dialect_name} не поддерживает INSERT ... ON CONFLICT")
+    return UPSERT_DIALECTS[dialect_name](table)